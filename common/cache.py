@@ -0,0 +1,360 @@
+import math
+import os
+import random
+import struct
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+
+import orjson
+import redis
+from django.conf import settings
+
+from common.redis_connection import get_cache_client, redis_manager
+
+KEY_PREFIX = 'qt:tiered'
+INVALIDATION_CHANNEL = f'{KEY_PREFIX}:invalidate'
+RECONNECT_DELAY = 1  # seconds
+PUBSUB_POLL_INTERVAL = 1  # seconds, shorter than the socket timeout
+LOCK_POLL_INTERVAL = 0.05  # seconds
+# Soft expiry (unix time) and build duration (seconds) in front of every stored value
+ENTRY_HEADER = struct.Struct('!dd')
+
+Entry = tuple[bytes, float, float]
+
+
+# One subscriber thread per process drops local entries that another worker invalidated. Messages published while
+# it is (re)connecting are lost, so it starts every subscription by clearing the local tiers.
+class _Invalidator:
+    def __init__(self):
+        self._caches: dict[str, list['TieredCache']] = {}
+        self._lock = threading.Lock()
+        self._pid: int | None = None
+
+    def register(self, cache: 'TieredCache') -> None:
+        with self._lock:
+            self._caches.setdefault(cache.name, []).append(cache)
+
+    def ensure_started(self) -> None:
+        # Started lazily and again after a fork, threads do not survive it
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._clear_all()
+            threading.Thread(target=self._listen, name='tiered-cache-invalidator', daemon=True).start()
+
+    def publish(self, name: str, keys: list[str] | None) -> None:
+        try:
+            get_cache_client().publish(INVALIDATION_CHANNEL, orjson.dumps({'cache': name, 'keys': keys}))
+        except redis.RedisError:
+            pass
+
+    def _listen(self) -> None:
+        while True:
+            pubsub = get_cache_client().pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                self._clear_all()
+                while True:
+                    if (message := pubsub.get_message(timeout=PUBSUB_POLL_INTERVAL)) is not None:
+                        self._dispatch(orjson.loads(message['data']))
+            except redis.RedisError:
+                self._clear_all()
+                time.sleep(RECONNECT_DELAY)
+            finally:
+                # Gives its connection back to the pool
+                pubsub.close()
+
+    def _dispatch(self, message: dict) -> None:
+        for cache in self._caches.get(message['cache'], []):
+            cache.delete_local(message['keys'])
+
+    def _clear_all(self) -> None:
+        for caches in list(self._caches.values()):
+            for cache in caches:
+                cache.delete_local(None)
+
+
+_invalidator = _Invalidator()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: bytes | None = None
+        self.error: BaseException | None = None
+
+
+def _pack(value: bytes, expires: float, delta: float) -> bytes:
+    return ENTRY_HEADER.pack(expires, delta) + value
+
+
+def _unpack(raw: bytes) -> Entry:
+    expires, delta = ENTRY_HEADER.unpack_from(raw)
+    return raw[ENTRY_HEADER.size:], expires, delta
+
+
+# Bytes cache with a bounded per-process LRU/TTL tier in front of Redis. Values are stored raw (no pickling), local
+# copies of a deleted key are dropped in every process through a pub/sub message, the local TTL only covers
+# messages lost during a reconnect.
+# Every entry carries its soft expiry and how long it took to build. get_or_set() keeps serving an expired entry
+# for stale_ttl more seconds while the one caller holding the key's Redis lock rebuilds it, and starts that rebuild
+# early with a probability growing towards the expiry (XFetch, scaled by beta and the build time).
+class TieredCache:
+    def __init__(
+            self,
+            name: str,
+            maxsize: int,
+            local_ttl: int,
+            ttl: int | None = None,
+            stale_ttl: int = 0,
+            beta: float = 1.0,
+            lock_timeout: int = 10,
+    ):
+        self.name = name
+        self.maxsize = maxsize
+        self.local_ttl = local_ttl
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.beta = beta
+        self.lock_timeout = lock_timeout
+        self._local: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        _invalidator.register(self)
+
+    @property
+    def local_enabled(self) -> bool:
+        return bool(self.maxsize and self.local_ttl)
+
+    def redis_key(self, key: str) -> str:
+        return f'{KEY_PREFIX}:{self.name}:{key}'
+
+    def refresh_lock(self, key: str) -> redis.lock.Lock:
+        return get_cache_client().lock(
+            f'{KEY_PREFIX}:{self.name}:lock:{key}',
+            timeout=self.lock_timeout,
+            blocking=False,
+        )
+
+    def get(self, key: str) -> bytes | None:
+        # Expired entries still within stale_ttl are returned as well
+        entry = self._get_entry(key)
+        return entry and entry[0]
+
+    def get_many(self, keys: t.Iterable[str]) -> dict[str, bytes]:
+        # Keys found and not expired, local misses go to Redis in a single MGET. Unlike get_or_set() nothing is
+        # served stale, the caller rebuilds expired entries together with the missing ones
+        now = time.time()
+        found: dict[str, bytes] = {}
+        missing: list[str] = []
+        for key in keys:
+            if (raw := self._get_local(key)) is not None and (entry := _unpack(raw))[1] > now:
+                self.local_hits += 1
+                found[key] = entry[0]
+            else:
+                missing.append(key)
+        if not missing:
+            return found
+
+        try:
+            raws = redis_manager.get_many(settings.REDIS_DB_INDEX, [self.redis_key(key) for key in missing])
+        except redis.RedisError:
+            raws = [None] * len(missing)
+        for key, raw in zip(missing, raws):
+            if raw is None or (entry := _unpack(raw))[1] <= now:
+                self.misses += 1
+                continue
+            self.redis_hits += 1
+            self._set_local(key, raw)
+            found[key] = entry[0]
+        return found
+
+    def get_or_set(self, key: str, build: t.Callable[[], bytes | None]) -> bytes | None:
+        # build() returning None means there is nothing to cache, the None is passed through
+        if (entry := self._get_entry(key)) is None:
+            return self._fill(key, build)
+
+        value, expires, delta = entry
+        if not self._should_refresh(expires, delta):
+            return value
+        lock = self.refresh_lock(key)
+        if not self._acquire(lock):
+            self.stale_hits += 1
+            return value
+        try:
+            return self._build(key, build)
+        finally:
+            self._release(lock)
+
+    def set(self, key: str, value: bytes, timeout: int | None = None) -> None:  # noqa: A003
+        self.set_many({key: value}, timeout)
+
+    def set_many(self, values: dict[str, bytes], timeout: int | None = None, delta: float = 0.0) -> None:
+        timeout = self.ttl if timeout is None else timeout
+        expires = time.time() + timeout if timeout is not None else math.inf
+        entries = {key: _pack(value, expires, delta) for key, value in values.items()}
+        try:
+            redis_manager.set_many(
+                settings.REDIS_DB_INDEX,
+                {self.redis_key(key): raw for key, raw in entries.items()},
+                ex=None if timeout is None else max(timeout + self.stale_ttl, 1),
+            )
+        except redis.RedisError:
+            return
+        for key, raw in entries.items():
+            self._set_local(key, raw)
+
+    def delete_many(self, keys: t.Iterable[str]) -> None:
+        if not (keys := list(keys)):
+            return
+        self.delete_local(keys)
+        try:
+            redis_manager.delete_many(settings.REDIS_DB_INDEX, [self.redis_key(key) for key in keys])
+        except redis.RedisError:
+            pass
+        _invalidator.publish(self.name, keys)
+
+    def delete_local(self, keys: t.Iterable[str] | None) -> None:
+        # None drops the whole local tier
+        with self._lock:
+            if keys is None:
+                self._local.clear()
+                return
+            for key in keys:
+                self._local.pop(key, None)
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            'size': len(self._local),
+            'maxsize': self.maxsize,
+            'local_hits': self.local_hits,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'stale_hits': self.stale_hits,
+            'local_hit_ratio': self.local_hits / lookups if lookups else 0.0,
+            'hit_ratio': (self.local_hits + self.redis_hits) / lookups if lookups else 0.0,
+        }
+
+    def reset_stats(self) -> None:
+        self.local_hits = self.redis_hits = self.misses = self.stale_hits = 0
+
+    def _should_refresh(self, expires: float, delta: float) -> bool:
+        return time.time() - delta * self.beta * math.log(1.0 - random.random()) >= expires  # noqa: S311
+
+    def _fill(self, key: str, build: t.Callable[[], bytes | None]) -> bytes | None:
+        # Concurrent misses in this process wait for the first one, which waits for other processes on the Redis lock
+        with self._lock:
+            flight = self._flights.get(key)
+            if leader := flight is None:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            flight.done.wait(self.lock_timeout)
+            if not flight.done.is_set():
+                return build()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._fill_once(key, build)
+            return flight.value
+        except BaseException as e:
+            # Followers fail with the leader rather than returning its missing value
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _fill_once(self, key: str, build: t.Callable[[], bytes | None]) -> bytes | None:
+        lock = self.refresh_lock(key)
+        if self._acquire(lock):
+            try:
+                return self._build(key, build)
+            finally:
+                self._release(lock)
+
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            if (entry := self._get_entry(key)) is not None:
+                return entry[0]
+            try:
+                if not lock.locked():
+                    break
+            except redis.RedisError:
+                break
+        return self._build(key, build)
+
+    def _build(self, key: str, build: t.Callable[[], bytes | None]) -> bytes | None:
+        started = time.monotonic()
+        if (value := build()) is not None:
+            self.set_many({key: value}, delta=time.monotonic() - started)
+        return value
+
+    @staticmethod
+    def _acquire(lock: redis.lock.Lock) -> bool:
+        # Without Redis every caller builds for itself
+        try:
+            return lock.acquire()
+        except redis.RedisError:
+            return True
+
+    @staticmethod
+    def _release(lock: redis.lock.Lock) -> None:
+        try:
+            lock.release()
+        except redis.RedisError:
+            pass
+
+    def _get_entry(self, key: str) -> Entry | None:
+        if (raw := self._get_local(key)) is not None:
+            entry = _unpack(raw)
+            if entry[1] > time.time():
+                self.local_hits += 1
+                return entry
+            # Expired locally, another process may have refreshed it already
+
+        try:
+            raw = get_cache_client().get(self.redis_key(key))
+        except redis.RedisError:
+            raw = None
+        if raw is None:
+            self.misses += 1
+            self.delete_local([key])
+            return None
+        self.redis_hits += 1
+        self._set_local(key, raw)
+        return _unpack(raw)
+
+    def _get_local(self, key: str) -> bytes | None:
+        with self._lock:
+            if (item := self._local.get(key)) is None:
+                return None
+            local_expires, raw = item
+            if local_expires < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return raw
+
+    def _set_local(self, key: str, raw: bytes) -> None:
+        if not self.local_enabled:
+            return
+        _invalidator.ensure_started()
+        with self._lock:
+            self._local[key] = (time.monotonic() + self.local_ttl, raw)
+            self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
@@ -0,0 +1,64 @@
+import functools
+import os
+import threading
+
+from django.db.backends.postgresql import base
+from django.utils.asyncio import async_unsafe
+
+from common.db_pool.creation import DatabaseCreation
+from common.db_pool.pool import ConnectionPool
+
+_pools: dict[tuple[int, str, str | None], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+# PostgreSQL backend taking its connections from a ConnectionPool shared by all threads of the worker, configured by
+# the POOL entry of the database settings. Closing the connection hands it back to the pool, so with CONN_MAX_AGE = 0
+# a request holds one only while it runs, also under ASGI where every request gets its own thread.
+class DatabaseWrapper(base.DatabaseWrapper):
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The pool the open connection belongs to, it may have been closed and replaced since
+        self._connection_pool: ConnectionPool | None = None
+
+    @property
+    def pool(self) -> ConnectionPool:
+        with _pools_lock:
+            if (pool := _pools.get(key := self._pool_key())) is None:
+                options = self.settings_dict['POOL']
+                pool = _pools[key] = ConnectionPool(
+                    size=options['SIZE'],
+                    timeout=options['TIMEOUT'],
+                    max_lifetime=options['MAX_LIFETIME'],
+                )
+            return pool
+
+    def close_pool(self) -> None:
+        with _pools_lock:
+            pool = _pools.pop(self._pool_key(), None)
+        if pool is not None:
+            pool.close()
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        connection = pool.acquire(functools.partial(super().get_new_connection, conn_params))
+        self._connection_pool = pool
+        return connection
+
+    def _close(self):
+        if (pool := self._connection_pool) is None:
+            return
+        self._connection_pool = None
+        with self.wrap_database_errors:
+            # Inside an atomic block the wrapper keeps the connection object, another thread must not get it
+            if self.in_atomic_block:
+                pool.discard(self.connection)
+            else:
+                pool.release(self.connection)
+
+    def _pool_key(self) -> tuple[int, str, str | None]:
+        # Per process as well, a forked worker must not share its parent's sockets
+        return os.getpid(), self.alias, self.settings_dict['NAME']
@@ -0,0 +1,12 @@
+from django.db.backends.postgresql import creation
+
+
+# Idle pooled connections would keep the test database in use, so the pool is closed before it is copied or dropped
+class DatabaseCreation(creation.DatabaseCreation):
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        self.connection.close_pool()
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        self.connection.close_pool()
+        super()._destroy_test_db(test_database_name, verbosity)
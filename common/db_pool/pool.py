@@ -0,0 +1,153 @@
+import threading
+import time
+import typing as t
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+PING_AFTER_IDLE = 30  # seconds in the pool after which a connection is pinged before it is handed out
+
+Connection = extensions.connection
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    pass
+
+
+# Bounded, thread-safe pool of psycopg2 connections shared by every thread of a worker. Idle connections are handed
+# out last in, first out so the ones in use stay warm; closed or older than max_lifetime ones are dropped instead,
+# and those idle for longer than PING_AFTER_IDLE are pinged first. Callers wait up to timeout seconds for a free slot.
+class ConnectionPool:
+    def __init__(self, size: int, timeout: float, max_lifetime: float):
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self._idle: deque[tuple[Connection, float]] = deque()
+        self._opened_at: dict[Connection, float] = {}
+        self._cond = threading.Condition()
+        self._shut_down = False
+        # Handed out or being opened
+        self.in_use = 0
+        self.waiting = 0
+        self.created = 0
+        self.closed = 0
+        self.timeouts = 0
+
+    def acquire(self, connect: t.Callable[[], Connection]) -> Connection:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if (checked_out := self._checkout(deadline)) is None:
+                return self._open(connect)
+            connection, idle_for = checked_out
+            if self._usable(connection, ping=idle_for > PING_AFTER_IDLE):
+                return connection
+            self.discard(connection)
+
+    def release(self, connection: Connection) -> None:
+        # Connections left in a transaction are rolled back, broken or expired ones closed
+        if not connection.closed and connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                pass
+        if (
+            connection.closed
+            or connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE
+            or self._expired(connection)
+            or self._shut_down
+        ):
+            self.discard(connection)
+            return
+        with self._cond:
+            self.in_use -= 1
+            self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    def discard(self, connection: Connection) -> None:
+        with self._cond:
+            self.in_use -= 1
+            self.closed += 1
+            self._opened_at.pop(connection, None)
+            self._cond.notify()
+        self._close(connection)
+
+    def close(self) -> None:
+        # Closes the idle connections, the ones in use are closed when they are released
+        with self._cond:
+            self._shut_down = True
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            for connection in idle:
+                self._opened_at.pop(connection, None)
+            self.closed += len(idle)
+        for connection in idle:
+            self._close(connection)
+
+    def stats(self) -> dict[str, int]:
+        with self._cond:
+            return {
+                'size': self.size,
+                'in_use': self.in_use,
+                'idle': len(self._idle),
+                'waiting': self.waiting,
+                'created': self.created,
+                'closed': self.closed,
+                'timeouts': self.timeouts,
+            }
+
+    def _checkout(self, deadline: float) -> tuple[Connection, float] | None:
+        # An idle connection and for how long it was idle, or None once a slot is reserved for a new one
+        with self._cond:
+            while not self._idle and self.in_use >= self.size:
+                if (remaining := deadline - time.monotonic()) <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f'No database connection free after {self.timeout} s ({self.size} in use)')
+                self.waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.in_use += 1
+            if not self._idle:
+                return None
+            connection, released_at = self._idle.pop()
+        return connection, time.monotonic() - released_at
+
+    def _open(self, connect: t.Callable[[], Connection]) -> Connection:
+        try:
+            connection = connect()
+        except BaseException:
+            with self._cond:
+                self.in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+            self._opened_at[connection] = time.monotonic()
+        return connection
+
+    def _usable(self, connection: Connection, ping: bool) -> bool:
+        if connection.closed or self._expired(connection):
+            return False
+        if not ping:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if connection.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _expired(self, connection: Connection) -> bool:
+        opened_at = self._opened_at.get(connection)
+        return opened_at is None or time.monotonic() - opened_at >= self.max_lifetime
+
+    @staticmethod
+    def _close(connection: Connection) -> None:
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
@@ -129,12 +129,12 @@ class DistributionSourceModel(BaseModel):
 
 
 DynamicImagesModel = create_model(
-    'ImagesModel',
+    'DynamicImagesModel',
     **{part.lower(): (list[ImageSourceModel], []) for part in Specie.PlantPartsChoices.values},
 )
 
 DynamicDistributionModel = create_model(
-    'DistributionModel',
+    'DynamicDistributionModel',
     **{dist: (list[DistributionSourceModel], []) for dist in DistributionSpecie.DistributionTypesChoices.values}
 )
 
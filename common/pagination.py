@@ -0,0 +1,144 @@
+import abc
+import base64
+import typing as t
+
+import orjson
+from django.db import connections
+from django.db.models import Q, QuerySet
+from ninja import Field, Schema
+from ninja.errors import ValidationError
+from ninja.pagination import PaginationBase
+
+TotalMode = t.Literal['exact', 'approx', 'none']
+
+
+def encode_cursor(values: t.Sequence[t.Any]) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(list(values))).decode('ascii').rstrip('=')
+
+
+def invalid_cursor_error() -> ValidationError:
+    return ValidationError([{'loc': ('cursor',), 'msg': 'Invalid cursor'}])
+
+
+def decode_cursor(cursor: str, size: int) -> list[t.Any]:
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError as e:
+        raise invalid_cursor_error() from e
+
+    if not isinstance(values, list) or len(values) != size:
+        raise invalid_cursor_error()
+    return values
+
+
+def estimate_count(queryset: QuerySet) -> int:
+    # Planner estimate instead of COUNT(*), good enough for "about N results"
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)  # noqa: S608
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = orjson.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def get_keyset_ordering(queryset: QuerySet, default: tuple[str, ...] = ('id',)) -> tuple[str, ...]:
+    # The id makes the order total, so a cursor always points between two rows
+    ordering = tuple(queryset.query.order_by) or default
+    if not {'id', '-id', 'pk', '-pk'} & set(ordering):
+        ordering += ('id',)
+    return ordering
+
+
+def get_keyset_q(ordering: tuple[str, ...], values: list[t.Any]) -> Q:
+    # (a, b, c) > (x, y, z)  =>  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    q = Q()
+    equal: dict[str, t.Any] = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        q |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return q
+
+
+# Pre-ordered result (e.g. an in-memory index or a cached listing) that KeysetPagination pages through
+class KeysetSequence(abc.ABC):
+    ordering: tuple[str, ...] = ('id',)
+
+    @abc.abstractmethod
+    def count(self) -> int:
+        ...
+
+    def estimate_count(self) -> int:
+        # For total=approx, sequences that know their exact size cheaply just count
+        return self.count()
+
+    @abc.abstractmethod
+    def fetch(self, offset: int, limit: int) -> list[t.Any]:
+        ...
+
+    @abc.abstractmethod
+    def fetch_after(self, values: list[t.Any], limit: int) -> list[t.Any]:
+        ...
+
+
+# Page number pagination with an opt-in keyset mode: sending `cursor` (empty for the first page) replaces
+# OFFSET with a `(order keys) > (cursor keys)` condition and skips COUNT(*) unless `total` asks for it
+class KeysetPagination(PaginationBase):
+    class Input(Schema):
+        page: int = Field(1, ge=1)
+        cursor: str | None = None
+        page_size: int | None = Field(None, ge=1)
+        total: TotalMode | None = None
+
+    class Output(Schema):
+        items: list[t.Any]
+        count: int | None = None
+        next_cursor: str | None = None
+
+    def __init__(
+            self,
+            page_size: int = 20,
+            max_page_size: int = 100,
+            **kwargs,
+    ):
+        self.page_size = page_size
+        self.max_page_size = max_page_size
+        super().__init__(**kwargs)
+
+    def paginate_queryset(self, queryset: KeysetSequence, pagination: Input, **params) -> dict:
+        page_size = min(pagination.page_size or self.page_size, self.max_page_size)
+        if pagination.cursor is None:
+            items = queryset.fetch((pagination.page - 1) * page_size, page_size + 1)
+            total = pagination.total or 'exact'
+        elif pagination.cursor:
+            values = decode_cursor(pagination.cursor, len(queryset.ordering))
+            try:
+                items = queryset.fetch_after(values, page_size + 1)
+            except (TypeError, ValueError) as e:
+                raise invalid_cursor_error() from e
+            total = pagination.total or 'none'
+        else:
+            items = queryset.fetch(0, page_size + 1)
+            total = pagination.total or 'none'
+
+        has_next = len(items) > page_size
+        items = items[:page_size]
+        return {
+            'items': items,
+            'count': self._count(queryset, total),
+            'next_cursor': self._make_cursor(items[-1], queryset.ordering) if has_next else None,
+        }
+
+    @staticmethod
+    def _count(sequence: KeysetSequence, total: TotalMode) -> int | None:
+        if total == 'exact':
+            return sequence.count()
+        if total == 'approx':
+            return sequence.estimate_count()
+        return None
+
+    @staticmethod
+    def _make_cursor(item: t.Any, ordering: tuple[str, ...]) -> str:
+        return encode_cursor([getattr(item, field.lstrip('-')) for field in ordering])
@@ -1,6 +1,158 @@
+import asyncio
+import os
+import threading
+import weakref
+
 import redis
+import redis.asyncio
 from django.conf import settings
+from django_redis.pool import ConnectionFactory
+from redis.asyncio.retry import Retry as AsyncRetry
+from redis.backoff import ExponentialBackoff
+from redis.connection import parse_url
+from redis.retry import Retry
+
+RETRY_BACKOFF_BASE = 0.05  # seconds, doubled on every retry
+RETRY_BACKOFF_CAP = 1  # seconds
+
+AsyncClients = dict[int, redis.asyncio.StrictRedis]
+
+
+# Every Redis connection of the process comes from here: the Django cache through RedisConnectionFactory, the tiered
+# caches and the auth stores. Each database gets one blocking pool, callers wait up to pool_timeout seconds for a free
+# connection rather than opening more than max_connections. Commands are retried on connection errors and timeouts
+# with an exponential backoff, and connections idle for health_check_interval seconds are pinged before use.
+# A forked child drops the pools it inherited, so preloaded workers never share their parent's sockets.
+class RedisConnectionManager:
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            max_connections: int,
+            pool_timeout: int,
+            socket_timeout: int,
+            socket_connect_timeout: int,
+            retries: int,
+            health_check_interval: int,
+    ):
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self.socket_timeout = socket_timeout
+        self.socket_connect_timeout = socket_connect_timeout
+        self.retries = retries
+        self.health_check_interval = health_check_interval
+        self._clients: dict[int, redis.StrictRedis] = {}
+        self._async_clients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple[AsyncClients, asyncio.Task]] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def get_client(self, db: int) -> redis.StrictRedis:
+        self._check_pid()
+        if (client := self._clients.get(db)) is None:
+            with self._lock:
+                if (client := self._clients.get(db)) is None:
+                    pool = redis.BlockingConnectionPool(
+                        max_connections=self.max_connections,
+                        timeout=self.pool_timeout,
+                        retry=Retry(ExponentialBackoff(cap=RETRY_BACKOFF_CAP, base=RETRY_BACKOFF_BASE), self.retries),
+                        **self._connection_kwargs(db),
+                    )
+                    client = self._clients[db] = redis.StrictRedis(connection_pool=pool)
+        return client
+
+    def get_async_client(self, db: int) -> redis.asyncio.StrictRedis:
+        # redis.asyncio connections belong to the event loop that opened them, so every loop gets its own pools: one
+        # per ASGI worker, or one per request when async views run under WSGI. They are closed when the loop cancels
+        # its remaining tasks on shutdown, as both asyncio.run() and async_to_sync() do.
+        loop = asyncio.get_running_loop()
+        if (entry := self._async_clients.get(loop)) is None:
+            entry = self._async_clients[loop] = ({}, loop.create_task(self._close_on_shutdown(loop)))
+        clients = entry[0]
+        if (client := clients.get(db)) is None:
+            pool = redis.asyncio.BlockingConnectionPool(
+                max_connections=self.max_connections,
+                timeout=self.pool_timeout,
+                retry=AsyncRetry(ExponentialBackoff(cap=RETRY_BACKOFF_CAP, base=RETRY_BACKOFF_BASE), self.retries),
+                **self._connection_kwargs(db),
+            )
+            client = clients[db] = redis.asyncio.StrictRedis.from_pool(pool)
+        return client
+
+    # One round trip per call
+    def get_many(self, db: int, keys: list[str]) -> list[bytes | None]:
+        return self.get_client(db).mget(keys) if keys else []
+
+    def set_many(self, db: int, values: dict[str, bytes], ex: int | None = None) -> None:
+        # MSET takes no expiry, so the SETs go in one pipeline, without MULTI/EXEC
+        if not values:
+            return
+        with self.get_client(db).pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                pipe.set(key, value, ex=ex)
+            pipe.execute()
+
+    def delete_many(self, db: int, keys: list[str]) -> int:
+        return self.get_client(db).delete(*keys) if keys else 0
+
+    def _connection_kwargs(self, db: int) -> dict:
+        return {
+            'host': self.host,
+            'port': self.port,
+            'db': db,
+            'socket_timeout': self.socket_timeout,
+            'socket_connect_timeout': self.socket_connect_timeout,
+            'socket_keepalive': True,
+            'health_check_interval': self.health_check_interval,
+        }
+
+    def _check_pid(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._clients = {}
+                self._async_clients = weakref.WeakKeyDictionary()
+                self._pid = os.getpid()
+
+    async def _close_on_shutdown(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            await loop.create_future()
+        finally:
+            clients, _ = self._async_clients.pop(loop, ({}, None))
+            for client in clients.values():
+                await client.aclose()
+
+
+redis_manager = RedisConnectionManager(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    pool_timeout=settings.REDIS_POOL_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+    retries=settings.REDIS_RETRIES,
+    health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+)
+
+
+# django-redis clients on the manager's pools. Only the database index of the cache LOCATION is used, the server and
+# the connection settings are the manager's
+class RedisConnectionFactory(ConnectionFactory):
+    def connect(self, url: str) -> redis.StrictRedis:
+        return redis_manager.get_client(parse_url(url).get('db', 0))
+
+
+def get_cache_client() -> redis.StrictRedis:
+    return redis_manager.get_client(settings.REDIS_DB_INDEX)
+
+
+def get_persistent_client() -> redis.StrictRedis:
+    return redis_manager.get_client(settings.REDIS_PERSISTENT_DB_INDEX)
 
-PER_REDIS_DB = '2'
 
-persistent_client = redis.StrictRedis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=PER_REDIS_DB)
+def get_async_persistent_client() -> redis.asyncio.StrictRedis:
+    return redis_manager.get_async_client(settings.REDIS_PERSISTENT_DB_INDEX)
@@ -0,0 +1,28 @@
+import typing as t
+
+import orjson
+from django.http import HttpRequest
+from ninja.parser import Parser
+from ninja.renderers import BaseRenderer
+from ninja.responses import NinjaJSONEncoder
+
+# Dates, times and Decimals are left to the encoder ninja used before, so their format does not change (milliseconds,
+# "Z" for UTC, Decimal as a string). Pydantic models are dumped by it too; UUIDs, enums and dataclasses are native.
+_encoder = NinjaJSONEncoder()
+DUMPS_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def json_dumps(data: t.Any) -> bytes:
+    return orjson.dumps(data, default=_encoder.default, option=DUMPS_OPTIONS)
+
+
+class ORJSONRenderer(BaseRenderer):
+    media_type = 'application/json'
+
+    def render(self, request: HttpRequest, data: t.Any, *, response_status: int) -> bytes:
+        return json_dumps(data)
+
+
+class ORJSONParser(Parser):
+    def parse_body(self, request: HttpRequest) -> dict[str, t.Any]:
+        return orjson.loads(request.body)
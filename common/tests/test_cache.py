@@ -0,0 +1,112 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+from django_redis import get_redis_connection
+
+from common.cache import TieredCache
+
+
+class TieredCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        self.cache = TieredCache('tests', maxsize=2, local_ttl=60, ttl=60, stale_ttl=60)
+        self.other_worker = TieredCache('tests', maxsize=2, local_ttl=60, ttl=60, stale_ttl=60)
+        self.cache.delete_many(['a', 'b', 'c'])
+
+    def test_tiers(self):
+        self.cache.set('a', b'first')
+        self.assertTrue(get_redis_connection('default').get(self.cache.redis_key('a')).endswith(b'first'))
+        self.assertEqual(self.cache.get('a'), b'first')
+
+        self.cache.delete_local(None)
+        self.assertEqual(self.cache.get('a'), b'first')
+        self.assertIsNone(self.cache.get('b'))
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['local_hits'], stats['redis_hits'], stats['misses']), (1, 1, 1))
+        self.assertAlmostEqual(stats['hit_ratio'], 2 / 3)
+
+    def test_local_tier_is_bounded(self):
+        self.cache.set_many({'a': b'1', 'b': b'2', 'c': b'3'})
+        self.assertEqual(self.cache.stats()['size'], 2)
+        self.assertEqual(self.cache.get('a'), b'1')
+        self.assertEqual(self.cache.stats()['redis_hits'], 1)
+
+    def test_invalidation_reaches_other_workers(self):
+        self.cache.set('a', b'first')
+        self.assertEqual(self.other_worker.get('a'), b'first')
+
+        self.cache.delete_many(['a'])
+        deadline = time.monotonic() + 5
+        while self.other_worker.stats()['size'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIsNone(self.other_worker.get('a'))
+
+    def test_stale_while_revalidate(self):
+        self.cache.set('a', b'old', timeout=0)
+        lock = self.cache.refresh_lock('a')
+        self.assertTrue(lock.acquire())
+        try:
+            self.assertEqual(self.cache.get_or_set('a', lambda: b'new'), b'old')
+        finally:
+            lock.release()
+
+        self.assertEqual(self.cache.get_or_set('a', lambda: b'new'), b'new')
+        self.assertEqual(self.cache.get_or_set('a', lambda: b'newer'), b'new')
+        self.assertEqual(self.cache.stats()['stale_hits'], 1)
+
+    def test_concurrent_misses_build_once(self):
+        calls = []
+
+        def build() -> bytes:
+            calls.append(1)
+            time.sleep(0.2)
+            return b'built'
+
+        with ThreadPoolExecutor(5) as pool:
+            results = list(pool.map(lambda _: self.cache.get_or_set('a', build), range(5)))
+        self.assertListEqual(results, [b'built'] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_concurrent_misses_share_build_error(self):
+        calls = []
+
+        def build() -> bytes:
+            calls.append(1)
+            time.sleep(0.2)
+            raise RuntimeError('db down')
+
+        def get(_) -> tuple[str, str]:
+            try:
+                return 'ok', self.cache.get_or_set('a', build)
+            except RuntimeError as e:
+                return 'error', str(e)
+
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(get, range(4)))
+        self.assertListEqual(results, [('error', 'db down')] * 4)
+        self.assertEqual(len(calls), 1)
+
+    def test_waits_for_other_process(self):
+        locked = threading.Event()
+
+        def other_process():
+            lock = self.other_worker.refresh_lock('a')
+            lock.acquire()
+            locked.set()
+            time.sleep(0.2)
+            self.other_worker.set('a', b'theirs')
+            lock.release()
+
+        thread = threading.Thread(target=other_process)
+        thread.start()
+        locked.wait()
+        self.assertEqual(self.cache.get_or_set('a', lambda: b'mine'), b'theirs')
+        thread.join()
+
+    def test_early_refresh(self):
+        self.assertFalse(self.cache._should_refresh(time.time() + 60, 0))
+        self.assertTrue(self.cache._should_refresh(time.time() - 1, 0))
+        # The slower the build, the earlier some caller starts refreshing
+        self.assertTrue(any(self.cache._should_refresh(time.time() + 1, 10) for _ in range(100)))
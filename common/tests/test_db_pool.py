@@ -0,0 +1,89 @@
+import threading
+import time
+
+from django.db import OperationalError, connection
+from django.test import TestCase
+
+from common.db_pool.base import DatabaseWrapper as PooledDatabaseWrapper
+
+
+class DatabasePoolTestCase(TestCase):
+    def get_wrapper(self, size: int = 2, timeout: float = 5) -> PooledDatabaseWrapper:
+        # Wrappers share the pool of their alias, the first one configures it
+        pool = {'SIZE': size, 'TIMEOUT': timeout, 'MAX_LIFETIME': 60}
+        settings_dict = {**connection.settings_dict, 'CONN_MAX_AGE': 0, 'POOL': pool}
+        wrapper = PooledDatabaseWrapper(settings_dict, alias=connection.alias)
+        self.addCleanup(wrapper.close_pool)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_reuse(self):
+        wrapper = self.get_wrapper()
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        self.assertDictEqual(
+            wrapper.pool.stats(),
+            {'size': 2, 'in_use': 0, 'idle': 1, 'waiting': 0, 'created': 1, 'closed': 0, 'timeouts': 0},
+        )
+
+        other = self.get_wrapper()
+        with other.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIs(other.connection, raw)
+        self.assertEqual(wrapper.pool.stats()['in_use'], 1)
+
+    def test_wait_and_timeout(self):
+        first = self.get_wrapper(size=1, timeout=0.05)
+        first.ensure_connection()
+        with self.assertRaises(OperationalError):
+            self.get_wrapper(size=1).ensure_connection()
+        self.assertEqual(first.pool.stats()['timeouts'], 1)
+
+        first.pool.timeout = 5
+        waited = []
+
+        def wait_for_connection():
+            wrapper = PooledDatabaseWrapper(first.settings_dict, alias=connection.alias)
+            wrapper.ensure_connection()
+            waited.append(wrapper.connection)
+            wrapper.close()
+
+        thread = threading.Thread(target=wait_for_connection)
+        raw = first.connection
+        thread.start()
+        deadline = time.monotonic() + 5
+        while not first.pool.stats()['waiting'] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(first.pool.stats()['waiting'], 1)
+        first.close()
+        thread.join()
+        self.assertListEqual(waited, [raw])
+
+    def test_unusable_connections_are_replaced(self):
+        wrapper = self.get_wrapper()
+        wrapper.ensure_connection()
+        wrapper.connection.autocommit = False
+        with wrapper.connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        wrapper.close()
+        # Rolled back and kept
+        wrapper.ensure_connection()
+        self.assertEqual(wrapper.pool.stats()['created'], 1)
+
+        wrapper.connection.close()
+        wrapper.close()
+        wrapper.ensure_connection()
+        wrapper.pool.max_lifetime = 0
+        wrapper.close()
+        stats = wrapper.pool.stats()
+        self.assertEqual((stats['idle'], stats['created'], stats['closed']), (0, 2, 2))
+
+    def test_close_in_atomic_block(self):
+        wrapper = self.get_wrapper()
+        wrapper.ensure_connection()
+        wrapper.set_autocommit(False)
+        wrapper.in_atomic_block = True
+        wrapper.close()
+        self.assertTrue(wrapper.connection.closed)
+        self.assertEqual(wrapper.pool.stats()['closed'], 1)
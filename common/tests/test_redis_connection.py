@@ -0,0 +1,61 @@
+import asyncio
+
+import redis
+from django.conf import settings
+from django.test import SimpleTestCase
+from django_redis import get_redis_connection
+
+from common.redis_connection import RedisConnectionManager, redis_manager
+
+
+class RedisConnectionManagerTestCase(SimpleTestCase):
+    def setUp(self):
+        self.manager = RedisConnectionManager(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            max_connections=1,
+            pool_timeout=0,
+            socket_timeout=5,
+            socket_connect_timeout=2,
+            retries=1,
+            health_check_interval=30,
+        )
+        self.keys = ['qt:tests:manager:a', 'qt:tests:manager:b']
+        redis_manager.delete_many(settings.REDIS_DB_INDEX, self.keys)
+
+    def test_cache_shares_pool(self):
+        client = redis_manager.get_client(settings.REDIS_DB_INDEX)
+        self.assertIs(get_redis_connection('default').connection_pool, client.connection_pool)
+        self.assertIsInstance(client.connection_pool, redis.BlockingConnectionPool)
+
+    def test_batch(self):
+        self.manager.set_many(settings.REDIS_DB_INDEX, {self.keys[0]: b'1', self.keys[1]: b'2'}, ex=60)
+        values = self.manager.get_many(settings.REDIS_DB_INDEX, [*self.keys, 'qt:tests:none'])
+        self.assertListEqual(values, [b'1', b'2', None])
+        self.assertTrue(0 < get_redis_connection('default').ttl(self.keys[0]) <= 60)
+        self.assertEqual(self.manager.delete_many(settings.REDIS_DB_INDEX, self.keys), 2)
+        self.assertListEqual(self.manager.get_many(settings.REDIS_DB_INDEX, []), [])
+
+    def test_pool_limit(self):
+        client = self.manager.get_client(settings.REDIS_DB_INDEX)
+        connection = client.connection_pool.get_connection('GET')
+        with self.assertRaises(redis.ConnectionError):
+            client.get(self.keys[0])
+        client.connection_pool.release(connection)
+        self.assertIsNone(client.get(self.keys[0]))
+
+    def test_fork(self):
+        client = self.manager.get_client(settings.REDIS_DB_INDEX)
+        self.assertIs(self.manager.get_client(settings.REDIS_DB_INDEX), client)
+        self.manager._pid = -1
+        self.assertIsNot(self.manager.get_client(settings.REDIS_DB_INDEX), client)
+
+    def test_async_client_per_loop(self):
+        async def set_and_get() -> bytes:
+            client = self.manager.get_async_client(settings.REDIS_DB_INDEX)
+            self.assertIs(self.manager.get_async_client(settings.REDIS_DB_INDEX), client)
+            await client.set(self.keys[0], b'async', ex=60)
+            return await client.get(self.keys[0])
+
+        self.assertEqual(asyncio.run(set_and_get()), b'async')
+        self.assertEqual(len(self.manager._async_clients), 0)
@@ -0,0 +1,32 @@
+import datetime
+import decimal
+import json
+import uuid
+
+import orjson
+from django.test import RequestFactory, SimpleTestCase
+from ninja.renderers import JSONRenderer
+
+from common.models import IntervalValueModel
+from common.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTestCase(SimpleTestCase):
+    def test_matches_json_renderer(self):
+        data = {
+            'created': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2024, 5, 1),
+            'uid': uuid.UUID('1b4e28ba-2fa1-11d2-883f-0016d3cca427'),
+            'price': decimal.Decimal('12.50'),
+            'interval': IntervalValueModel(from_value=1, to_value=None),
+            1: 'int key',
+        }
+        request = RequestFactory().get('/')
+        rendered = ORJSONRenderer().render(request, data, response_status=200)
+        expected = JSONRenderer().render(request, data, response_status=200)
+        self.assertEqual(orjson.loads(rendered), json.loads(expected))
+        self.assertIn(b'"2024-05-01T12:30:15.123Z"', rendered)
+
+    def test_invalid_body(self):
+        resp = self.client.post('/api/search/species/batch', b'{"slugs": [', content_type='application/json')
+        self.assertEqual(resp.status_code, 400)
@@ -1,3 +1,6 @@
+import hashlib
+
+import orjson
 from django.db.utils import IntegrityError
 
 from common.models import SpeciesModel
@@ -39,32 +42,41 @@ def get_bit_flag(flags, mask):
     return new_value
 
 
+def get_content_hash(sp: SpeciesModel) -> str:
+    return hashlib.sha256(orjson.dumps(sp.model_dump(mode='json'), option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def get_specie_fields(sp: SpeciesModel) -> dict:
+    return {
+        'image_url': sp.image_url,
+        'latin_name': sp.latin_name,
+        'genus_description': sp.genus_description,
+        'soil_type': get_bit_flag(sp.soil.type, Specie.SoilTypeChoices.labels),
+        'duration': duration_choice_dict.get(sp.duration),
+        'edible': sp.edible,
+        'edible_part': get_bit_flag(sp.edible_part, Specie.PlantPartsChoices.labels),
+        'rating': sp.rank,
+        'soil_moisture': get_bit_flag(sp.soil.moisture, Specie.SoilMoistureChoices.labels),
+        'soil_ph': get_bit_flag(sp.soil.ph, Specie.SoilPhChoices.labels),
+        'position_sunlight': get_bit_flag(sp.position.sunlight, Specie.PositionSunlightChoices.labels),
+        'position_side': get_bit_flag(sp.position.side, Specie.PositionSideChoices.labels),
+        'exposure': exposure_choice_dict.get(sp.position.exposure),
+        'hardiness_zone': sp.position.hardiness_zone,
+        'fragrance': get_bit_flag(sp.colour_and_scent.fragrance, Specie.PlantPartsChoices.labels),
+        'cultivation': sp.how_to_grow.cultivation,
+        'harvest': get_bit_flag(sp.events.harvest, Specie.SeasonsMaxChoices.labels),
+        'planting': get_bit_flag(sp.events.planting, Specie.SeasonsMaxChoices.labels),
+        'toxicity': get_bit_flag(sp.toxicity, Specie.ToxicTypesChoices.labels),
+        'foliage': get_bit_flag(sp.botanical_details.foliage, Specie.FoliageTypesChoices.labels),
+        'habit': get_bit_flag(sp.botanical_details.habit, Specie.HabitTypesChoices.labels),
+        'misc': sp.misc,
+        'content_hash': get_content_hash(sp),
+    }
+
+
 def create_db_specie(sp: SpeciesModel):  # noqa: C901
     try:
-        specie = Specie.objects.create(
-            image_url=sp.image_url,
-            latin_name=sp.latin_name,
-            genus_description=sp.genus_description,
-            soil_type=get_bit_flag(sp.soil.type, Specie.SoilTypeChoices.labels),
-            duration=duration_choice_dict.get(sp.duration),
-            edible=sp.edible,
-            edible_part=get_bit_flag(sp.edible_part, Specie.PlantPartsChoices.labels),
-            rating=sp.rank,
-            soil_moisture=get_bit_flag(sp.soil.moisture, Specie.SoilMoistureChoices.labels),
-            soil_ph=get_bit_flag(sp.soil.ph, Specie.SoilPhChoices.labels),
-            position_sunlight=get_bit_flag(sp.position.sunlight, Specie.PositionSunlightChoices.labels),
-            position_side=get_bit_flag(sp.position.side, Specie.PositionSideChoices.labels),
-            exposure=exposure_choice_dict.get(sp.position.exposure),
-            hardiness_zone=sp.position.hardiness_zone,
-            fragrance=get_bit_flag(sp.colour_and_scent.fragrance, Specie.PlantPartsChoices.labels),
-            cultivation=sp.how_to_grow.cultivation,
-            harvest=get_bit_flag(sp.events.harvest, Specie.SeasonsMaxChoices.labels),
-            planting=get_bit_flag(sp.events.planting, Specie.SeasonsMaxChoices.labels),
-            toxicity=get_bit_flag(sp.toxicity, Specie.ToxicTypesChoices.labels),
-            foliage=get_bit_flag(sp.botanical_details.foliage, Specie.FoliageTypesChoices.labels),
-            habit=get_bit_flag(sp.botanical_details.habit, Specie.HabitTypesChoices.labels),
-            misc=sp.misc,
-        )
+        specie = Specie.objects.create(**get_specie_fields(sp))
     except IntegrityError:
         return
 
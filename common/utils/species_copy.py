@@ -0,0 +1,338 @@
+import csv
+import io
+import typing as t
+
+import orjson
+from bitfield import BitField
+from django.db import connection, models, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from common.models import SpeciesModel
+from common.utils.mock_species import get_bit_flag, get_specie_fields
+from common.utils.species_import import ImportStats, SpeciesImportError
+from qt_search.logic.facet_index import rebuild_facet_index
+from qt_search.logic.listing import bump_catalogue_version
+from qt_search.logic.search import refresh_search_documents
+from qt_search.logic.summary import refresh_specie_summaries
+from qt_search.models import (
+    Color,
+    CommonName,
+    Distribution,
+    DistributionSpecie,
+    GrowthTip,
+    Image,
+    IntervalValue,
+    Order,
+    PartColor,
+    Pathogen,
+    RegularEvent,
+    ScientificClassification,
+    Source,
+    Specie,
+    SpecieSearchDocument,
+    SpecieSummary,
+    Synonym,
+    Tag,
+)
+
+COPY_NULL = r'\N'
+ID_BLOCK_SIZE = 10000
+LOOKUP_MODELS = (Tag, Color, Pathogen, Distribution, GrowthTip)
+LOADED_MODELS = (
+    Specie,
+    SpecieSearchDocument,
+    SpecieSummary,
+    IntervalValue,
+    ScientificClassification,
+    Order,
+    CommonName,
+    Synonym,
+    Image,
+    Source,
+    RegularEvent,
+    Tag,
+    Tag.specie.through,
+    Pathogen,
+    Pathogen.specie.through,
+    GrowthTip,
+    GrowthTip.specie.through,
+    Distribution,
+    DistributionSpecie,
+    PartColor,
+    Color,
+    Color.color.through,
+)
+
+# Secondary indexes of the tables the loader writes to, constraint-backed (primary key/unique) ones stay
+SECONDARY_INDEXES_SQL = '''
+    SELECT i.indexname, i.indexdef
+    FROM pg_indexes i
+    WHERE i.schemaname = current_schema()
+        AND i.tablename = ANY(%s)
+        AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conname = i.indexname)
+'''
+
+Row = dict[str, t.Any]
+
+
+def _copy_value(value: t.Any) -> t.Any:
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (dict, list)):
+        return orjson.dumps(value).decode()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+# Initial catalogue build: SpeciesModel objects are turned straight into per-table COPY buffers, no model instances
+# involved. Primary keys come from blocks reserved on the table sequences, the whole load is one transaction with
+# deferred constraints, and the secondary indexes are dropped before and rebuilt after it.
+class SpeciesCopyLoader:
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+        self.stats = ImportStats()
+        self._rows: dict[type[models.Model], list[Row]] = {}
+        self._id_blocks: dict[type[models.Model], tuple[int, int]] = {}
+        self._lookups: dict[type[models.Model], dict[str, int]] = {}
+        self._unique_names: dict[type[models.Model], set[str]] = {CommonName: set(), Synonym: set()}
+        self._species_names: set[str] = set()
+        self._now = timezone.now()
+
+    def load(self, species: t.Iterable[SpeciesModel], on_batch: t.Callable | None = None) -> ImportStats:
+        if Specie.objects.exists():
+            raise SpeciesImportError('The COPY loader only fills an empty catalogue, use create_all_species instead')
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+            indexes = self._drop_secondary_indexes()
+            self._lookups = {
+                model: dict(model.objects.values_list('name', 'id')) for model in LOOKUP_MODELS
+            }
+
+            specie_ids, batch = [], []
+            for sp in species:
+                batch.append(sp)
+                if len(batch) >= self.batch_size:
+                    specie_ids.extend(self._load_batch(batch, on_batch))
+                    batch = []
+            if batch:
+                specie_ids.extend(self._load_batch(batch, on_batch))
+
+            self._release_id_blocks()
+            with connection.cursor() as cursor:
+                # Runs the deferred foreign key checks, Postgres won't build an index on a table with pending ones
+                cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+                for _, definition in indexes:
+                    cursor.execute(definition)
+            # Documents and summaries aggregate names by specie_id, which needs the indexes back
+            refresh_search_documents(specie_ids)
+            refresh_specie_summaries(specie_ids)
+
+        with connection.cursor() as cursor:
+            for model in LOADED_MODELS:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+        rebuild_facet_index()
+        bump_catalogue_version()
+        return self.stats
+
+    def _load_batch(self, batch: list[SpeciesModel], on_batch: t.Callable | None) -> list[int]:
+        specie_ids = [self._add_specie(sp) for sp in batch if self._is_new(sp)]
+        for model in LOADED_MODELS:
+            self._copy(model, self._rows.pop(model, []))
+        if on_batch:
+            on_batch(self.stats)
+        return specie_ids
+
+    def _is_new(self, sp: SpeciesModel) -> bool:
+        # Same outcome as the IntegrityError skip in create_db_specie: the first species with a name wins
+        keys = {sp.latin_name, slugify(sp.latin_name)}
+        if keys & self._species_names:
+            self.stats.skipped += 1
+            return False
+        self._species_names.update(keys)
+        return True
+
+    def _add(self, model: type[models.Model], **values) -> int:
+        values['id'] = self._next_id(model)
+        self._rows.setdefault(model, []).append(values)
+        return values['id']
+
+    def _add_interval(self, interval) -> int | None:
+        return interval and self._add(IntervalValue, from_value=interval.from_value, to_value=interval.to_value)
+
+    def _add_lookup(self, model: type[models.Model], name: str, **values) -> int:
+        lookup = self._lookups[model]
+        if (obj_id := lookup.get(name)) is None:
+            obj_id = lookup[name] = self._add(model, name=name, **values)
+        return obj_id
+
+    def _add_specie(self, sp: SpeciesModel) -> int:  # noqa: C901
+        classification_id = None
+        if sclass := sp.scientific_classification:
+            classification_id = self._add(
+                ScientificClassification,
+                family=sclass.family or '',
+                phylum=sclass.phylum or '',
+                classify=sclass.classify or '',
+                genus=sclass.genus or '',
+                species=sclass.species or '',
+            )
+            for order in sclass.order:
+                self._add(Order, scientific_classification_id=classification_id, name=order)
+
+        specie_id = self._add(
+            Specie,
+            slug=slugify(sp.latin_name),
+            height_cm_id=self._add_interval(sp.size.height_cm),
+            years_to_max_height_id=self._add_interval(sp.size.years_to_max_height),
+            spread_cm_id=self._add_interval(sp.size.spread_cm),
+            scientific_classification_id=classification_id,
+            created=self._now,
+            modified=self._now,
+            **get_specie_fields(sp),
+        )
+        self.stats.species += 1
+
+        # Names are unique across species, the first one loaded keeps it
+        names = [(name, lang, True) for lang, name in sp.main_common_name.items()]
+        names.extend((name, lang, False) for lang, common_names in sp.common_names.items() for name in common_names)
+        for name, lang, is_main in names:
+            if name not in self._unique_names[CommonName]:
+                self._unique_names[CommonName].add(name)
+                self._add(CommonName, specie_id=specie_id, name=name, lang=lang, is_main=is_main)
+        for name in sp.synonyms:
+            if name not in self._unique_names[Synonym]:
+                self._unique_names[Synonym].add(name)
+                self._add(Synonym, specie_id=specie_id, name=name)
+
+        for plant_part, images in sp.images:
+            for image in images:
+                self._add(
+                    Image,
+                    specie_id=specie_id,
+                    image_url=image.image_url,
+                    image_copyright=image.copyright,
+                    part=plant_part,
+                )
+        for source in sp.sources:
+            self._add(
+                Source,
+                specie_id=specie_id,
+                last_update=source.last_update,
+                sid=source.id,
+                name=source.name,
+                source_url=source.url,
+                citation=source.citation or '',
+            )
+
+        if water := sp.soil.water:
+            self._add(
+                RegularEvent,
+                specie_id=specie_id,
+                name='water',
+                frequency_id=self._add_interval(water.frequency) or self._add(IntervalValue),
+                frequency_count=water.frequency_count,
+                frequency_unit=water.frequency_unit,
+            )
+
+        for tag_id in {self._add_lookup(Tag, name) for name in sp.tags}:
+            self._add(Tag.specie.through, specie_id=specie_id, tag_id=tag_id)
+        pathogen_ids = {
+            self._add_lookup(Pathogen, name, pathogen_type=Pathogen.PathogenTypesChoices.DISEASE)
+            for name in sp.diseases_and_pests
+        }
+        for pathogen_id in pathogen_ids:
+            self._add(Pathogen.specie.through, specie_id=specie_id, pathogen_id=pathogen_id)
+        growth_tip_ids = {
+            self._add_lookup(GrowthTip, name, tip_type=tip_type)
+            for tip_type, tips in sp.how_to_grow if tip_type != 'cultivation' for name in tips
+        }
+        for growth_tip_id in growth_tip_ids:
+            self._add(GrowthTip.specie.through, specie_id=specie_id, growthtip_id=growth_tip_id)
+
+        for distribution_type, distributions in sp.distributions:
+            for distribution in distributions:
+                self._add(
+                    DistributionSpecie,
+                    specie_id=specie_id,
+                    distribution_id=self._add_lookup(
+                        Distribution,
+                        distribution.name,
+                        tdwg_code=distribution.tdwg_code,
+                        tdwg_level=distribution.tdwg_level,
+                        species_count=distribution.species_count,
+                    ),
+                    statuses=get_bit_flag(distribution_type, DistributionSpecie.DistributionTypesChoices.values),
+                )
+
+        for season, colors_by_part in sp.colour_and_scent:
+            if season == 'fragrance':
+                continue
+            for part, colors in colors_by_part:
+                if not colors:
+                    continue
+                part_color_id = self._add(PartColor, specie_id=specie_id, plant_part=part, season=season)
+                for color_id in {self._add_lookup(Color, name) for name in colors}:
+                    self._add(Color.color.through, partcolor_id=part_color_id, color_id=color_id)
+        return specie_id
+
+    def _copy(self, model: type[models.Model], rows: list[Row]) -> None:
+        if not rows:
+            return
+        # BitField saves None as 0 through the ORM, COPY rows must match
+        fields = [
+            (field.attname, 0 if isinstance(field, BitField) else field.get_default())
+            for field in model._meta.concrete_fields
+        ]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([
+                _copy_value(default if (value := row.get(name)) is None else value) for name, default in fields
+            ])
+        buffer.seek(0)
+
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in model._meta.concrete_fields)
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(
+                f"COPY {connection.ops.quote_name(model._meta.db_table)} ({columns}) "
+                f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                buffer,
+            )
+        self.stats.rows += len(rows)
+
+    def _next_id(self, model: type[models.Model]) -> int:
+        next_id, last_id = self._id_blocks.get(model, (1, 0))
+        if next_id > last_id:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT setval(pg_get_serial_sequence(%s, %s), nextval(pg_get_serial_sequence(%s, %s)) + %s - 1)',
+                    [model._meta.db_table, 'id', model._meta.db_table, 'id', ID_BLOCK_SIZE],
+                )
+                last_id = cursor.fetchone()[0]
+            next_id = last_id - ID_BLOCK_SIZE + 1
+        self._id_blocks[model] = (next_id + 1, last_id)
+        return next_id
+
+    def _release_id_blocks(self) -> None:
+        # Hands the unused rest of every reserved block back, so the next id follows the loaded ones
+        with connection.cursor() as cursor:
+            for model, (next_id, _) in self._id_blocks.items():
+                cursor.execute(
+                    'SELECT setval(pg_get_serial_sequence(%s, %s), %s)',
+                    [model._meta.db_table, 'id', next_id - 1],
+                )
+
+    @staticmethod
+    def _drop_secondary_indexes() -> list[tuple[str, str]]:
+        with connection.cursor() as cursor:
+            cursor.execute(SECONDARY_INDEXES_SQL, [[model._meta.db_table for model in LOADED_MODELS]])
+            indexes = cursor.fetchall()
+            for name, _ in indexes:
+                cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+        return indexes
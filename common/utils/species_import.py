@@ -0,0 +1,509 @@
+import time
+import typing as t
+
+from django.db import IntegrityError, OperationalError, models, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from common.models import SpeciesModel
+from common.utils.mock_species import get_bit_flag, get_content_hash, get_specie_fields
+from qt_search.logic.details import invalidate_specie_details
+from qt_search.logic.facet_index import rebuild_facet_index
+from qt_search.logic.listing import bump_catalogue_version
+from qt_search.logic.search import refresh_search_documents
+from qt_search.logic.summary import refresh_specie_summaries
+from qt_search.models import (
+    Color,
+    CommonName,
+    Distribution,
+    DistributionSpecie,
+    GrowthTip,
+    Image,
+    IntervalValue,
+    Order,
+    PartColor,
+    Pathogen,
+    RegularEvent,
+    ScientificClassification,
+    Source,
+    Specie,
+    Synonym,
+    Tag,
+)
+
+INTERVAL_FIELDS = ('height_cm', 'years_to_max_height', 'spread_cm')
+
+Pairs = list[tuple[SpeciesModel, Specie]]
+
+
+class SpeciesImportError(Exception):
+    pass
+
+
+class ImportStats:
+    counters = ('species', 'updated', 'unchanged', 'skipped', 'rows')
+
+    def __init__(self):
+        self.species = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.skipped = 0
+        self.rows = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def get_counters(self) -> tuple[int, ...]:
+        return tuple(getattr(self, name) for name in self.counters)
+
+    def set_counters(self, values: t.Iterable[int]) -> None:
+        for name, value in zip(self.counters, values):
+            setattr(self, name, value)
+
+    def __str__(self):
+        return (
+            f'{self.species} species ({self.updated} updated, {self.unchanged} unchanged, {self.skipped} skipped), '
+            f'{self.rows} rows in {self.elapsed:.1f}s, {self.rows_per_second:.0f} rows/s'
+        )
+
+
+# Batched counterpart of create_db_specie: every table is written once per batch and each batch is one transaction.
+# Lookup tables (tags, colours, pathogens, distributions, growth tips) are kept in memory between batches.
+# With update=True a species that is already stored is re-imported when its content hash changed: the Specie row
+# is updated in place and its child rows are diffed against the new data, unchanged species cost one lookup.
+class SpeciesImporter:
+    def __init__(self, batch_size: int = 500, update: bool = False):
+        self.batch_size = batch_size
+        self.update = update
+        self.stats = ImportStats()
+        self._lookups: dict[type[models.Model], dict[str, int]] = {
+            Tag: {},
+            Color: {},
+            Pathogen: {},
+            Distribution: {},
+            GrowthTip: {},
+        }
+
+    def import_species(self, species: t.Iterable[SpeciesModel], on_batch: t.Callable | None = None) -> ImportStats:
+        batch = []
+        for sp in species:
+            batch.append(sp)
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+                if on_batch:
+                    on_batch(self.stats)
+        if batch:
+            self.import_batch(batch)
+            if on_batch:
+                on_batch(self.stats)
+        rebuild_facet_index()
+        return self.stats
+
+    def import_batch(self, batch: list[SpeciesModel], attempts: int = 3) -> list[int]:
+        # Parallel writers may collide on the same latin or lookup name (or deadlock on it); after the rollback
+        # the other writer's rows are committed and a retry simply skips or reuses them
+        for attempt in range(1, attempts + 1):
+            lookups = {model: dict(lookup) for model, lookup in self._lookups.items()}
+            counters = self.stats.get_counters()
+            try:
+                return self._import_batch(batch)
+            except (IntegrityError, OperationalError):
+                self._lookups = lookups
+                self.stats.set_counters(counters)
+                if attempt == attempts:
+                    raise
+
+    def _import_batch(self, batch: list[SpeciesModel]) -> list[int]:
+        with transaction.atomic():
+            batch, changed = self._split_existing(batch)
+            species = self._create_species(batch)
+            pairs = list(zip(batch, species))
+            self._create_children(pairs)
+            if changed:
+                self._update_species(changed)
+                self._update_children(changed)
+                invalidate_specie_details(slugs=[specie.slug for _, specie in changed])
+
+            specie_ids = [specie.id for _, specie in pairs + changed]
+            refresh_search_documents(specie_ids)
+            refresh_specie_summaries(specie_ids)
+            bump_catalogue_version()
+        return specie_ids
+
+    def _bulk_create(self, model: type[models.Model], objs: list, **kwargs) -> list:
+        if not objs:
+            return objs
+        self.stats.rows += len(objs)
+        return model.objects.bulk_create(objs, batch_size=self.batch_size * 10, **kwargs)
+
+    def _bulk_update(self, model: type[models.Model], objs: list, fields: t.Sequence[str]) -> None:
+        if not objs:
+            return
+        self.stats.rows += len(objs)
+        model.objects.bulk_update(objs, fields, batch_size=self.batch_size)
+
+    def _split_existing(self, batch: list[SpeciesModel]) -> tuple[list[SpeciesModel], Pairs]:
+        # Same outcome as the IntegrityError skip in create_db_specie: the first species with a name wins.
+        # Returns the species to create and, in update mode, the stored species whose data changed
+        names = {sp.latin_name for sp in batch}
+        slugs = {slugify(name) for name in names}
+        existing = {
+            specie.latin_name: specie
+            for specie in Specie.objects.filter(models.Q(latin_name__in=names) | models.Q(slug__in=slugs)).only(
+                'latin_name', 'slug', 'content_hash', *INTERVAL_FIELDS, 'scientific_classification')
+        }
+        taken = {value for specie in existing.values() for value in (specie.latin_name, specie.slug)}
+
+        new, changed = [], []
+        for sp in batch:
+            specie = existing.pop(sp.latin_name, None)
+            if self.update and specie is not None:
+                if specie.content_hash == get_content_hash(sp):
+                    self.stats.unchanged += 1
+                else:
+                    self.stats.updated += 1
+                    changed.append((sp, specie))
+                continue
+
+            slug = slugify(sp.latin_name)
+            if sp.latin_name in taken or slug in taken:
+                self.stats.skipped += 1
+                continue
+            taken.update((sp.latin_name, slug))
+            new.append(sp)
+        return new, changed
+
+    @staticmethod
+    def _build_classification(sclass) -> ScientificClassification:
+        return ScientificClassification(
+            family=sclass.family or '',
+            phylum=sclass.phylum or '',
+            classify=sclass.classify or '',
+            genus=sclass.genus or '',
+            species=sclass.species or '',
+        )
+
+    @staticmethod
+    def _build_orders(pairs: Pairs) -> list[Order]:
+        return [
+            Order(scientific_classification=specie.scientific_classification, name=order)
+            for sp, specie in pairs if sp.scientific_classification
+            for order in sp.scientific_classification.order
+        ]
+
+    def _create_species(self, batch: list[SpeciesModel]) -> list[Specie]:
+        intervals: list[IntervalValue] = []
+        classifications: list[ScientificClassification] = []
+        species = []
+        for sp in batch:
+            specie = Specie(slug=slugify(sp.latin_name), **get_specie_fields(sp))
+            for field in INTERVAL_FIELDS:
+                if value := getattr(sp.size, field):
+                    interval = IntervalValue(**value.model_dump())
+                    intervals.append(interval)
+                    setattr(specie, field, interval)
+            if sclass := sp.scientific_classification:
+                specie.scientific_classification = self._build_classification(sclass)
+                classifications.append(specie.scientific_classification)
+            species.append(specie)
+
+        self._bulk_create(IntervalValue, intervals)
+        self._bulk_create(ScientificClassification, classifications)
+        self._bulk_create(Order, self._build_orders(list(zip(batch, species))))
+        self.stats.species += len(species)
+        return self._bulk_create(Specie, species)
+
+    def _update_species(self, pairs: Pairs) -> None:  # noqa: C901
+        now = timezone.now()
+        new_intervals, intervals, stale_intervals = [], [], []
+        new_classifications, classifications, stale_classifications = [], [], []
+        for sp, specie in pairs:
+            for name, value in get_specie_fields(sp).items():
+                setattr(specie, name, value)
+            specie.modified = now
+
+            for field in INTERVAL_FIELDS:
+                value, current_id = getattr(sp.size, field), getattr(specie, f'{field}_id')
+                if value and current_id:
+                    intervals.append(IntervalValue(id=current_id, **value.model_dump()))
+                elif value:
+                    interval = IntervalValue(**value.model_dump())
+                    new_intervals.append(interval)
+                    setattr(specie, field, interval)
+                elif current_id:
+                    stale_intervals.append(current_id)
+                    setattr(specie, field, None)
+
+            sclass, current_id = sp.scientific_classification, specie.scientific_classification_id
+            if sclass:
+                classification = self._build_classification(sclass)
+                if current_id:
+                    classification.id = current_id
+                    classifications.append(classification)
+                else:
+                    new_classifications.append(classification)
+                specie.scientific_classification = classification
+            elif current_id:
+                stale_classifications.append(current_id)
+                specie.scientific_classification = None
+
+        self._bulk_create(IntervalValue, new_intervals)
+        self._bulk_update(IntervalValue, intervals, ('from_value', 'to_value'))
+        self._bulk_create(ScientificClassification, new_classifications)
+        self._bulk_update(
+            ScientificClassification, classifications, ('family', 'phylum', 'classify', 'genus', 'species'))
+        self._bulk_update(Specie, [specie for _, specie in pairs], (
+            *get_specie_fields(pairs[0][0]), 'modified', *INTERVAL_FIELDS, 'scientific_classification'))
+        # Species no longer point at them, so deleting does not cascade to the species
+        IntervalValue.objects.filter(id__in=stale_intervals).delete()
+        ScientificClassification.objects.filter(id__in=stale_classifications).delete()
+        self._sync(
+            Order,
+            'scientific_classification_id',
+            [specie.scientific_classification_id for _, specie in pairs if specie.scientific_classification_id],
+            self._build_orders(pairs),
+        )
+
+    def _create_children(self, pairs: Pairs) -> None:
+        common_names, synonyms = self._build_names(pairs)
+        # Names are unique across species, the first one imported keeps it
+        self._bulk_create(CommonName, common_names, ignore_conflicts=True)
+        self._bulk_create(Synonym, synonyms, ignore_conflicts=True)
+        self._bulk_create(Image, self._build_images(pairs))
+        self._bulk_create(Source, self._build_sources(pairs))
+
+        events = self._build_regular_events(pairs)
+        self._bulk_create(IntervalValue, [event.frequency for event in events])
+        self._bulk_create(RegularEvent, events)
+
+        for through, links in self._build_m2m(pairs).items():
+            self._bulk_create(through, links, ignore_conflicts=True)
+        self._bulk_create(DistributionSpecie, self._build_distributions(pairs))
+
+        part_colors = self._build_part_colors(pairs)
+        self._bulk_create(PartColor, [part_color for part_color, _ in part_colors])
+        self._bulk_create(Color.color.through, self._build_color_links(part_colors), ignore_conflicts=True)
+
+    def _update_children(self, pairs: Pairs) -> None:
+        specie_ids = [specie.id for _, specie in pairs]
+        common_names, synonyms = self._build_names(pairs)
+        self._sync(CommonName, 'specie_id', specie_ids, common_names, ('lang', 'is_main'), ignore_conflicts=True)
+        self._sync(Synonym, 'specie_id', specie_ids, synonyms, ignore_conflicts=True)
+        self._sync(Image, 'specie_id', specie_ids, self._build_images(pairs), ('image_copyright',))
+        self._sync(Source, 'specie_id', specie_ids, self._build_sources(pairs), (
+            'last_update', 'name', 'source_url', 'citation'))
+        self._sync_regular_events(specie_ids, self._build_regular_events(pairs))
+
+        for through, links in self._build_m2m(pairs).items():
+            self._sync(through, 'specie_id', specie_ids, links)
+        self._sync(DistributionSpecie, 'specie_id', specie_ids, self._build_distributions(pairs), ('statuses',))
+
+        part_colors = self._build_part_colors(pairs)
+        self._sync(PartColor, 'specie_id', specie_ids, [part_color for part_color, _ in part_colors])
+        self._sync(
+            Color.color.through,
+            'partcolor_id',
+            [part_color.id for part_color, _ in part_colors],
+            self._build_color_links(part_colors),
+        )
+
+    def _sync(
+            self,
+            model: type[models.Model],
+            parent_field: str,
+            parent_ids: list[int],
+            objs: list[models.Model],
+            update_fields: t.Sequence[str] = (),
+            **create_kwargs,
+    ) -> None:
+        # Diffs the stored children of parent_ids against objs, matched on every field but the primary key and
+        # update_fields: stored rows without a match are deleted, matches are updated if their update_fields
+        # differ and the rest of objs is created. Matched objs take over the stored primary key.
+        fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+        key_fields = [field for field in fields if field.name not in update_fields]
+        value_fields = [field for field in fields if field.name in update_fields]
+
+        def prep(obj: models.Model, model_fields: list[models.Field]) -> tuple:
+            return tuple(field.get_prep_value(getattr(obj, field.attname)) for field in model_fields)
+
+        pending: dict[tuple, list[models.Model]] = {}
+        for obj in objs:
+            pending.setdefault(prep(obj, key_fields), []).append(obj)
+
+        stale, changed = [], []
+        for stored in model.objects.filter(**{f'{parent_field}__in': parent_ids}).order_by('pk'):
+            if not (matches := pending.get(prep(stored, key_fields))):
+                stale.append(stored.pk)
+                continue
+            obj = matches.pop(0)
+            obj.pk = stored.pk
+            if prep(obj, value_fields) != prep(stored, value_fields):
+                changed.append(obj)
+
+        if stale:
+            self.stats.rows += len(stale)
+            model.objects.filter(pk__in=stale).delete()
+        self._bulk_update(model, changed, update_fields)
+        self._bulk_create(model, [obj for matches in pending.values() for obj in matches], **create_kwargs)
+
+    @staticmethod
+    def _build_names(pairs: Pairs) -> tuple[list[CommonName], list[Synonym]]:
+        common_names, synonyms = [], []
+        for sp, specie in pairs:
+            common_names.extend(
+                CommonName(specie=specie, name=name, lang=lang, is_main=True)
+                for lang, name in sp.main_common_name.items()
+            )
+            common_names.extend(
+                CommonName(specie=specie, name=name, lang=lang, is_main=False)
+                for lang, names in sp.common_names.items() for name in names
+            )
+            synonyms.extend(Synonym(specie=specie, name=name) for name in sp.synonyms)
+        # Rows go in name order (the sort is stable, so the first species still wins) to keep concurrent writers
+        # from deadlocking on each other
+        return sorted(common_names, key=lambda obj: obj.name), sorted(synonyms, key=lambda obj: obj.name)
+
+    @staticmethod
+    def _build_images(pairs: Pairs) -> list[Image]:
+        return [
+            Image(specie=specie, image_url=image.image_url, image_copyright=image.copyright, part=plant_part)
+            for sp, specie in pairs for plant_part, images in sp.images for image in images
+        ]
+
+    @staticmethod
+    def _build_sources(pairs: Pairs) -> list[Source]:
+        return [
+            Source(
+                specie=specie,
+                last_update=source.last_update,
+                sid=source.id,
+                name=source.name,
+                source_url=source.url,
+                citation=source.citation or '',
+            ) for sp, specie in pairs for source in sp.sources
+        ]
+
+    @staticmethod
+    def _build_regular_events(pairs: Pairs) -> list[RegularEvent]:
+        events = []
+        for sp, specie in pairs:
+            if not (water := sp.soil.water):
+                continue
+            frequency = IntervalValue(**water.frequency.model_dump()) if water.frequency else IntervalValue()
+            events.append(RegularEvent(
+                specie=specie,
+                name='water',
+                frequency=frequency,
+                frequency_count=water.frequency_count,
+                frequency_unit=water.frequency_unit,
+            ))
+        return events
+
+    def _sync_regular_events(self, specie_ids: list[int], events: list[RegularEvent]) -> None:
+        stored = {
+            (event.specie_id, event.name): event for event in RegularEvent.objects.filter(specie_id__in=specie_ids)
+        }
+        new_events, updated_events = [], []
+        for event in events:
+            if (current := stored.pop((event.specie_id, event.name), None)) is None:
+                new_events.append(event)
+                continue
+            event.pk, event.frequency.pk = current.pk, current.frequency_id
+            updated_events.append(event)
+
+        # The frequency interval goes with the event through the post_delete signal
+        RegularEvent.objects.filter(pk__in=[event.pk for event in stored.values()]).delete()
+        self._bulk_update(IntervalValue, [event.frequency for event in updated_events], ('from_value', 'to_value'))
+        self._bulk_update(RegularEvent, updated_events, ('frequency_count', 'frequency_unit'))
+        self._bulk_create(IntervalValue, [event.frequency for event in new_events])
+        self._bulk_create(RegularEvent, new_events)
+
+    def _resolve(self, model: type[models.Model], objs: dict[str, models.Model]) -> dict[str, int]:
+        # Returns name -> id for every object, creating the ones missing both in memory and in the database
+        lookup = self._lookups[model]
+        if missing := {name for name in objs if name not in lookup}:
+            lookup.update(model.objects.filter(name__in=missing).values_list('name', 'id'))
+        if missing := [obj for name, obj in sorted(objs.items()) if name not in lookup]:
+            self._bulk_create(model, missing, ignore_conflicts=True)
+            lookup.update(model.objects.filter(name__in=[obj.name for obj in missing]).values_list('name', 'id'))
+        return lookup
+
+    def _build_m2m(self, pairs: Pairs) -> dict[type[models.Model], list[models.Model]]:
+        tags = self._resolve(Tag, {name: Tag(name=name) for sp, _ in pairs for name in sp.tags})
+        pathogens = self._resolve(Pathogen, {
+            name: Pathogen(name=name, pathogen_type=Pathogen.PathogenTypesChoices.DISEASE)
+            for sp, _ in pairs for name in sp.diseases_and_pests
+        })
+        growth_tips = self._resolve(GrowthTip, {
+            name: GrowthTip(name=name, tip_type=tip_type)
+            for sp, _ in pairs for tip_type, names in sp.how_to_grow if tip_type != 'cultivation' for name in names
+        })
+
+        tag_through = Tag.specie.through
+        pathogen_through = Pathogen.specie.through
+        growth_tip_through = GrowthTip.specie.through
+        return {
+            tag_through: [
+                tag_through(specie_id=specie.id, tag_id=tags[name]) for sp, specie in pairs for name in set(sp.tags)
+            ],
+            pathogen_through: [
+                pathogen_through(specie_id=specie.id, pathogen_id=pathogens[name])
+                for sp, specie in pairs for name in set(sp.diseases_and_pests)
+            ],
+            growth_tip_through: [
+                growth_tip_through(specie_id=specie.id, growthtip_id=growth_tip_id)
+                for sp, specie in pairs
+                for growth_tip_id in {
+                    growth_tips[name]
+                    for tip_type, names in sp.how_to_grow if tip_type != 'cultivation' for name in names
+                }
+            ],
+        }
+
+    def _build_distributions(self, pairs: Pairs) -> list[DistributionSpecie]:
+        distributions = self._resolve(Distribution, {
+            distribution.name: Distribution(
+                name=distribution.name,
+                tdwg_code=distribution.tdwg_code,
+                tdwg_level=distribution.tdwg_level,
+                species_count=distribution.species_count,
+            ) for sp, _ in pairs for _distribution_type, items in sp.distributions for distribution in items
+        })
+        return [
+            DistributionSpecie(
+                specie=specie,
+                distribution_id=distributions[distribution.name],
+                statuses=get_bit_flag(distribution_type, DistributionSpecie.DistributionTypesChoices.values),
+            ) for sp, specie in pairs for distribution_type, items in sp.distributions for distribution in items
+        ]
+
+    @staticmethod
+    def _build_part_colors(pairs: Pairs) -> list[tuple[PartColor, list[str]]]:
+        part_colors = []
+        for sp, specie in pairs:
+            for season, colors_by_part in sp.colour_and_scent:
+                if season == 'fragrance':
+                    continue
+                part_colors.extend(
+                    (PartColor(specie=specie, plant_part=part, season=season), colors)
+                    for part, colors in colors_by_part if colors
+                )
+        return part_colors
+
+    def _build_color_links(self, part_colors: list[tuple[PartColor, list[str]]]) -> list[models.Model]:
+        # Part colours must be saved by now, links point at their ids
+        colors = self._resolve(Color, {
+            name: Color(name=name) for _, names in part_colors for name in names
+        })
+        color_through = Color.color.through
+        return [
+            color_through(partcolor_id=part_color.id, color_id=colors[name])
+            for part_color, names in part_colors for name in set(names)
+        ]
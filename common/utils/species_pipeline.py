@@ -0,0 +1,246 @@
+import multiprocessing as mp
+import multiprocessing.util
+import os
+import queue
+import traceback
+import typing as t
+import zipfile
+
+import orjson
+from django.db import connections
+
+from common.models import SpeciesModel
+from common.utils.species_import import ImportStats, SpeciesImporter, SpeciesImportError
+from qt_search.logic.facet_index import rebuild_facet_index
+
+MemberKey = tuple[str, str]
+
+
+def iter_zip_members(folder: str) -> t.Iterator[MemberKey]:
+    # Sorted, so that a checkpoint taken by one run means the same position for the next one
+    for zip_filename in sorted(os.listdir(folder)):
+        if not zip_filename.endswith('.zip'):
+            continue
+        zip_path = os.path.join(folder, zip_filename)
+        with zipfile.ZipFile(zip_path, 'r') as zip_file:
+            members = zip_file.namelist()
+        yield from ((zip_path, name) for name in members if name.endswith('.json'))
+
+
+# Members come sorted by archive, so only the archive being read is kept open
+class ZipMemberReader:
+    def __init__(self):
+        self._zip_path: str | None = None
+        self._zip_file: zipfile.ZipFile | None = None
+
+    def __enter__(self) -> 'ZipMemberReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def parse(self, key: MemberKey) -> tuple[MemberKey, SpeciesModel]:
+        zip_path, name = key
+        if zip_path != self._zip_path:
+            self.close()
+            self._zip_file = zipfile.ZipFile(zip_path, 'r')
+            self._zip_path = zip_path
+        with self._zip_file.open(name) as member:
+            return key, SpeciesModel(**orjson.loads(member.read()))
+
+    def close(self) -> None:
+        if self._zip_file is not None:
+            self._zip_file.close()
+        self._zip_path = self._zip_file = None
+
+
+_worker_reader: ZipMemberReader | None = None
+
+
+def _init_parser() -> None:
+    # Closed when the pool worker exits, the pool has to be closed and joined rather than terminated for that
+    global _worker_reader
+    _worker_reader = ZipMemberReader()
+    multiprocessing.util.Finalize(_worker_reader, _worker_reader.close, exitpriority=0)
+
+
+def _parse_in_worker(key: MemberKey) -> tuple[MemberKey, SpeciesModel]:
+    return _worker_reader.parse(key)
+
+
+class ImportCheckpoint:
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> MemberKey | None:
+        try:
+            with open(self.path, 'rb') as f:
+                data = orjson.loads(f.read())
+        except FileNotFoundError:
+            return None
+        return data['zip'], data['member']
+
+    def save(self, key: MemberKey) -> None:
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps({'zip': key[0], 'member': key[1]}))
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    @staticmethod
+    def skip_done(members: t.Iterable[MemberKey], last_done: MemberKey | None) -> t.Iterator[MemberKey]:
+        members = iter(members)
+        if last_done is None:
+            return members
+        for key in members:
+            if key == last_done:
+                return members
+        raise SpeciesImportError(f'{last_done[1]} from the checkpoint is no longer in {last_done[0]}')
+
+
+def _write_batches(batches: mp.Queue, results: mp.Queue, batch_size: int, update: bool) -> None:
+    # Forked from the command process, the inherited database connection must not be shared
+    connections.close_all()
+    importer = SpeciesImporter(batch_size=batch_size, update=update)
+    while (item := batches.get()) is not None:
+        number, batch = item
+        counters = importer.stats.get_counters()
+        try:
+            importer.import_batch(batch)
+        except Exception:
+            results.put((number, None, traceback.format_exc()))
+            return
+        delta = tuple(value - before for value, before in zip(importer.stats.get_counters(), counters))
+        results.put((number, delta, None))
+
+
+# Parser processes read and validate zip members, validated batches go through a bounded queue to writer
+# processes. Batches commit out of order, the checkpoint only moves past a batch once all earlier ones committed.
+class SpeciesImportPipeline:
+    def __init__(
+            self,
+            workers: int,
+            writers: int = 1,
+            batch_size: int = 500,
+            update: bool = False,
+            checkpoint: ImportCheckpoint | None = None,
+            on_batch: t.Callable[[ImportStats], None] | None = None,
+    ):
+        self.workers = workers
+        self.writers = writers
+        self.batch_size = batch_size
+        self.update = update
+        self.checkpoint = checkpoint
+        self.on_batch = on_batch
+        self.stats = ImportStats()
+
+        self._batch_keys: dict[int, MemberKey] = {}
+        self._committed: set[int] = set()
+        self._next_to_checkpoint = 0
+
+    def run(self, members: t.Iterable[MemberKey]) -> ImportStats:
+        if self.workers:
+            self._run_parallel(members)
+        else:
+            self._run_serial(members)
+        rebuild_facet_index()
+        return self.stats
+
+    def _run_serial(self, members: t.Iterable[MemberKey]) -> None:
+        importer = SpeciesImporter(batch_size=self.batch_size, update=self.update)
+        importer.stats = self.stats
+        batch: list[SpeciesModel] = []
+        with ZipMemberReader() as reader:
+            for key, sp in map(reader.parse, members):
+                batch.append(sp)
+                if len(batch) >= self.batch_size:
+                    self._import_serial(importer, batch, key)
+                    batch = []
+        if batch:
+            self._import_serial(importer, batch, key)
+
+    def _import_serial(self, importer: SpeciesImporter, batch: list[SpeciesModel], last_key: MemberKey) -> None:
+        importer.import_batch(batch)
+        if self.checkpoint:
+            self.checkpoint.save(last_key)
+        if self.on_batch:
+            self.on_batch(self.stats)
+
+    def _run_parallel(self, members: t.Iterable[MemberKey]) -> None:
+        context = mp.get_context('fork')
+        connections.close_all()
+        batches = context.Queue(maxsize=self.writers * 2)
+        results = context.Queue()
+        writers = [
+            context.Process(
+                target=_write_batches,
+                args=(batches, results, self.batch_size, self.update),
+                daemon=True,
+            )
+            for _ in range(self.writers)
+        ]
+        for writer in writers:
+            writer.start()
+
+        try:
+            with context.Pool(self.workers, initializer=_init_parser) as pool:
+                batch: list[SpeciesModel] = []
+                for key, sp in pool.imap(_parse_in_worker, members, chunksize=16):
+                    batch.append(sp)
+                    if len(batch) >= self.batch_size:
+                        self._put(batches, results, batch, key)
+                        batch = []
+                if batch:
+                    self._put(batches, results, batch, key)
+                pool.close()
+                pool.join()
+
+            for _ in writers:
+                batches.put(None)
+            while len(self._committed) < len(self._batch_keys):
+                if not any(writer.is_alive() for writer in writers) and results.empty():
+                    raise SpeciesImportError('Writer processes exited before committing all batches')
+                self._collect(results, block=True)
+        finally:
+            for writer in writers:
+                writer.join(timeout=5)
+                if writer.is_alive():
+                    writer.terminate()
+
+    def _put(self, batches: mp.Queue, results: mp.Queue, batch: list[SpeciesModel], last_key: MemberKey) -> None:
+        number = len(self._batch_keys)
+        self._batch_keys[number] = last_key
+        while True:
+            try:
+                batches.put((number, batch), timeout=1)
+                break
+            except queue.Full:
+                self._collect(results, block=False)
+        self._collect(results, block=False)
+
+    def _collect(self, results: mp.Queue, block: bool) -> None:
+        while True:
+            try:
+                number, delta, error = results.get(block=block, timeout=5 if block else None)
+            except queue.Empty:
+                return
+            if error:
+                raise SpeciesImportError(error)
+
+            self._committed.add(number)
+            self.stats.set_counters(value + added for value, added in zip(self.stats.get_counters(), delta))
+            self._advance_checkpoint()
+            if self.on_batch:
+                self.on_batch(self.stats)
+            block = False
+
+    def _advance_checkpoint(self) -> None:
+        last_key = None
+        while self._next_to_checkpoint in self._committed:
+            last_key = self._batch_keys[self._next_to_checkpoint]
+            self._next_to_checkpoint += 1
+        if last_key is not None and self.checkpoint:
+            self.checkpoint.save(last_key)
@@ -1,13 +1,14 @@
 from ninja import NinjaAPI
 from ninja.errors import ValidationError
 
+from common.renderers import ORJSONParser, ORJSONRenderer
 from common.schemas import ErrorResponse
 from qt_auth.api.auth import router as qt_auth_router
 from qt_garden.api.garden import router as qt_plant_router
 from qt_search.api import app as qt_search_app
 from qt_space.api.rooms import router as qt_rooms_router
 
-ninja = NinjaAPI()
+ninja = NinjaAPI(renderer=ORJSONRenderer(), parser=ORJSONParser())
 
 ninja.add_router('/search/', qt_search_app, tags=['search'])
 ninja.add_router('/space/', qt_rooms_router, tags=['space'])
@@ -15,6 +15,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Libs
     'ninja',
@@ -57,20 +58,43 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'core.wsgi.application'
 
+# A worker's threads share POSTGRES_POOL_SIZE connections, which go back to the pool after every request. Without the
+# pool each thread keeps its own connection for POSTGRES_CONN_MAX_AGE seconds, checked before a request reuses it.
+# Under ASGI every request runs in a new thread, so enable the pool there.
+POSTGRES_POOL_SIZE = env.int('POSTGRES_POOL_SIZE', default=0)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'ENGINE': 'common.db_pool' if POSTGRES_POOL_SIZE else 'django.db.backends.postgresql_psycopg2',
         'NAME': env('POSTGRES_DB', default='species'),
         'USER': env('POSTGRES_USER', default='postgres'),
         'PASSWORD': env('POSTGRES_PASSWORD', default='speciespassword'),
         'HOST': env('POSTGRES_HOST', default='localhost'),
         'PORT': env('POSTGRES_PORT', default='5434'),
+        'CONN_MAX_AGE': 0 if POSTGRES_POOL_SIZE else env.int('POSTGRES_CONN_MAX_AGE', default=60),  # seconds
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'connect_timeout': env.int('POSTGRES_CONNECT_TIMEOUT', default=5),  # seconds
+        },
+        'POOL': {
+            'SIZE': POSTGRES_POOL_SIZE,
+            'TIMEOUT': env.int('POSTGRES_POOL_TIMEOUT', default=10),  # seconds waiting for a free connection
+            'MAX_LIFETIME': env.int('POSTGRES_POOL_MAX_LIFETIME', default=30 * 60),  # seconds before it is reopened
+        },
     }
 }
 
 REDIS_HOST = env('REDIS_HOST', default='localhost')
-REDIS_PORT = env('REDIS_PORT', default='6379')
-REDIS_DB_INDEX = env('REDIS_DB_INDEX', default='1')
+REDIS_PORT = env.int('REDIS_PORT', default=6379)
+REDIS_DB_INDEX = env.int('REDIS_DB_INDEX', default=1)
+REDIS_PERSISTENT_DB_INDEX = env.int('REDIS_PERSISTENT_DB_INDEX', default=2)  # auth stores
+# Per process and database, async clients get their own per event loop
+REDIS_MAX_CONNECTIONS = env.int('REDIS_MAX_CONNECTIONS', default=50)
+REDIS_POOL_TIMEOUT = env.int('REDIS_POOL_TIMEOUT', default=5)  # seconds waiting for a free connection
+REDIS_SOCKET_TIMEOUT = env.int('REDIS_SOCKET_TIMEOUT', default=5)  # seconds
+REDIS_SOCKET_CONNECT_TIMEOUT = env.int('REDIS_SOCKET_CONNECT_TIMEOUT', default=2)  # seconds
+REDIS_RETRIES = env.int('REDIS_RETRIES', default=2)  # on connection errors and timeouts
+REDIS_HEALTH_CHECK_INTERVAL = env.int('REDIS_HEALTH_CHECK_INTERVAL', default=30)  # seconds idle before a ping
 
 CACHES = {
     'default': {
@@ -80,6 +104,7 @@ CACHES = {
                     f'{REDIS_DB_INDEX}',
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            'CONNECTION_FACTORY': 'common.redis_connection.RedisConnectionFactory',
         },
     },
 }
@@ -117,3 +142,13 @@ AUTH_USER_MODEL = 'qt_user.User'
 AUTH_ACCESS_TOKEN_EXPIRATION = 60 * 15  # seconds
 AUTH_REFRESH_TOKEN_EXPIRATION = 30 * 24 * 60 * 60  # seconds
 AUTH_KEY = env('AUTH_KEY', default='superauthkey')
+AUTH_USER_SNAPSHOT_TTL = env.int('AUTH_USER_SNAPSHOT_TTL', default=60)  # seconds
+SEARCH_FACET_COUNTS_TTL = env.int('SEARCH_FACET_COUNTS_TTL', default=5 * 60)  # seconds
+SEARCH_DETAILS_TTL = env.int('SEARCH_DETAILS_TTL', default=24 * 60 * 60)  # seconds
+SEARCH_DETAILS_STALE_TTL = env.int('SEARCH_DETAILS_STALE_TTL', default=60 * 60)  # seconds served stale while refreshed
+SEARCH_DETAILS_LOCAL_SIZE = env.int('SEARCH_DETAILS_LOCAL_SIZE', default=1000)  # 0 disables the in-process tier
+SEARCH_DETAILS_LOCAL_TTL = env.int('SEARCH_DETAILS_LOCAL_TTL', default=5 * 60)  # seconds
+SEARCH_DETAILS_BATCH_SIZE = env.int('SEARCH_DETAILS_BATCH_SIZE', default=50)  # species per batch details request
+SEARCH_LISTING_TTL = env.int('SEARCH_LISTING_TTL', default=60 * 60)  # seconds
+SEARCH_LISTING_LOCAL_SIZE = env.int('SEARCH_LISTING_LOCAL_SIZE', default=1000)  # cached pages and counts per process
+SEARCH_SUMMARY_LOCAL_SIZE = env.int('SEARCH_SUMMARY_LOCAL_SIZE', default=10000)  # listing rows per process
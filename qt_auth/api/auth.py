@@ -1,9 +1,11 @@
-from django.http import HttpRequest
-from ninja import Router
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest, HttpResponse
+from ninja import Router, Schema
 
 from common.exceptions import BaseQtError
 from common.http_response import QtORJSONResponse
 from common.schemas import ErrorResponse
+from qt_auth.logic.jwt_auth_bear import AsyncAuthBearer
 from qt_auth.logic.services.auth_service import AuthService
 from qt_auth.logic.services.jwt_service import JWTService
 from qt_auth.logic.services.registration_service import RegistrationService
@@ -25,9 +27,9 @@ router = Router()
         (400, 409): ErrorResponse,
     },
 )
-def signup(request: HttpRequest, data: SignUpRequestSchema) -> QtORJSONResponse:
+async def signup(request: HttpRequest, data: SignUpRequestSchema) -> QtORJSONResponse:
     try:
-        user = RegistrationService.register_user(data)
+        user = await sync_to_async(RegistrationService.register_user)(data)
     except BaseQtError as e:
         return e.to_response()
 
@@ -44,9 +46,9 @@ def signup(request: HttpRequest, data: SignUpRequestSchema) -> QtORJSONResponse:
         (400, 401, 404): ErrorResponse,
     },
 )
-def signin(request: HttpRequest, data: SignInResponseSchema) -> QtORJSONResponse:
+async def signin(request: HttpRequest, data: SignInResponseSchema) -> QtORJSONResponse:
     try:
-        access_token, refresh_token = AuthService.login(data)
+        access_token, refresh_token = await sync_to_async(AuthService.login)(data)
     except BaseQtError as e:
         return e.to_response()
 
@@ -63,10 +65,10 @@ def signin(request: HttpRequest, data: SignInResponseSchema) -> QtORJSONResponse
         (400, 401): ErrorResponse,
     },
 )
-def refresh(request: HttpRequest, data: JWTRefreshTokenSchema) -> QtORJSONResponse:
+async def refresh(request: HttpRequest, data: JWTRefreshTokenSchema) -> QtORJSONResponse:
     service = JWTService()
     try:
-        service.verify_refresh_token(data.refresh)
+        await service.averify_refresh_token(data.refresh)
     except BaseQtError as e:
         return e.to_response()
 
@@ -76,3 +78,15 @@ def refresh(request: HttpRequest, data: JWTRefreshTokenSchema) -> QtORJSONRespon
         data=JWTTokenSchema(access=access_token, refresh=refresh_token).model_dump(),
         status=200,
     )
+
+
+@router.post(
+    path="/logout-all",
+    auth=AsyncAuthBearer(),
+    response={
+        204: Schema,
+    },
+)
+async def logout_all(request: HttpRequest) -> HttpResponse:
+    await JWTService.arevoke_all_tokens(request.auth)
+    return HttpResponse(status=204)
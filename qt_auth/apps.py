@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class QtAuthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'qt_auth'
+
+    def ready(self):
+        from . import signals
@@ -39,9 +39,17 @@ class JWTTokenRevokedError(JWTError):
     detail = 'Refresh token has been revoked'
 
 
+class JWTGenerationRevokedError(JWTError):
+    detail = 'Token has been revoked'
+
+
 class UserNotFoundJWTError(JWTError):
     detail = 'User not found'
 
 
+class UserInactiveJWTError(JWTError):
+    detail = 'User is inactive'
+
+
 class InvalidPayloadError(JWTError):
     detail = 'Invalid payload'
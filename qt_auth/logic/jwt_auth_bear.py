@@ -4,11 +4,12 @@ from qt_auth.logic.exceptions import JWTError
 from qt_auth.logic.services.jwt_service import JWTService
 
 
-class AuthBearer(HttpBearer):
-    def authenticate(self, request, token):
+# For async operations only, ninja awaits it because authenticate is a coroutine function
+class AsyncAuthBearer(HttpBearer):
+    async def authenticate(self, request, token):
         service = JWTService()
         try:
-            service.verify_access_token(token)
+            await service.averify_access_token(token)
         except JWTError:
             return None
 
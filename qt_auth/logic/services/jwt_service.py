@@ -4,59 +4,116 @@ from datetime import datetime
 
 import jwt
 from django.conf import settings
+from django.db.models import F
+from redis.commands.core import AsyncScript
 
-from common.redis_connection import persistent_client
+from common.redis_connection import get_async_persistent_client
 from qt_auth.logic.exceptions import (
     InvalidJWTRefreshTypeError,
     InvalidPayloadError,
     JWTError,
     JWTExpiredError,
+    JWTGenerationRevokedError,
     JWTTokenRevokedError,
+    UserInactiveJWTError,
     UserNotFoundJWTError,
 )
+from qt_auth.logic.user_snapshot import aget_user_snapshot, ainvalidate_user_snapshot, user_from_snapshot
 from qt_auth.logic.utils import get_token_secure_key
-from qt_user.models import User
+from qt_user.models import User, generate_token_secret
 
 ACCESS_TOKEN_TYPE, REFRESH_TOKEN_TYPE = 'access', 'refresh'  # noqa: S105
 ALGORITHM_TYPE = 'HS256'
 KEY = base64.b64decode(settings.AUTH_KEY)
+REFRESH_FAMILY_KEY_PREFIX = 'qt_auth:refresh_family'
+
+# Rotates a refresh token atomically and in one round trip, so two concurrent refreshes of the same token cannot both
+# pass. A family, every token rotated from the same sign-in, keeps one key: the rotation number of its latest token.
+# A token with an older number was used before, which revokes the family. Returns the next rotation number, or -1.
+# KEYS: the family. ARGV: the token's rotation number, seconds the family key is kept.
+ROTATE_REFRESH_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current == 'revoked' then
+    return -1
+end
+if current and tonumber(current) ~= tonumber(ARGV[1]) then
+    redis.call('SET', KEYS[1], 'revoked', 'EX', ARGV[2])
+    return -1
+end
+local rotation = tonumber(ARGV[1]) + 1
+redis.call('SET', KEYS[1], rotation, 'EX', ARGV[2])
+return rotation
+"""
+
+# Registered once, so each rotation is a single EVALSHA with the SHA computed at registration. Calls pass the client
+# of the running event loop
+_arotate_script: AsyncScript | None = None
+
+
+def _get_arotate_script() -> AsyncScript:
+    global _arotate_script
+    if _arotate_script is None:
+        _arotate_script = get_async_persistent_client().register_script(ROTATE_REFRESH_SCRIPT)
+    return _arotate_script
 
 
 class JWTService:
 
     def __init__(self, user: User | None = None):
         self.current_user = user
+        # Key of current_user, derived once and shared by the verification and the tokens issued after it
+        self.signing_key: str | None = None
+        # Set by averify_refresh_token(), the rotated refresh token stays in the family
+        self.refresh_family: str | None = None
+        self.refresh_rotation = 0
 
     def get_user(self) -> User:
         return self.current_user
 
     def create_access_token(self) -> str:
         return self._create_token(
-            user=self.current_user,
             token_type=ACCESS_TOKEN_TYPE,
             exp_delta=settings.AUTH_ACCESS_TOKEN_EXPIRATION,
         )
 
     def create_refresh_token(self) -> str:
         return self._create_token(
-            user=self.current_user,
             token_type=REFRESH_TOKEN_TYPE,
             exp_delta=settings.AUTH_REFRESH_TOKEN_EXPIRATION,
+            refresh_claims={'fam': self.refresh_family or str(uuid.uuid4()), 'rot': self.refresh_rotation},
         )
 
-    def verify_access_token(self, token: str) -> None:
-        self._get_verify_payload_from_unverified_token(token=token, expected_type=ACCESS_TOKEN_TYPE)
+    async def averify_access_token(self, token: str) -> None:
+        await self._aget_verify_payload_from_unverified_token(
+            token=token,
+            expected_type=ACCESS_TOKEN_TYPE,
+            from_snapshot=True,
+        )
 
-    def verify_refresh_token(self, token: str) -> None:
-        verified_payload = self._get_verify_payload_from_unverified_token(token=token, expected_type=REFRESH_TOKEN_TYPE)
+    async def averify_refresh_token(self, token: str) -> None:
+        verified_payload = await self._aget_verify_payload_from_unverified_token(
+            token=token,
+            expected_type=REFRESH_TOKEN_TYPE,
+        )
 
-        if self._is_token_revoked(verified_payload):
+        if (rotation := await self._arotate_refresh_token(verified_payload)) < 0:
             raise JWTTokenRevokedError()
 
-        self._revoke_token(verified_payload)
+        self.refresh_family = verified_payload['fam']
+        self.refresh_rotation = rotation
 
     @staticmethod
-    def _create_token(user: User, token_type: str, exp_delta: int) -> str:
+    async def arevoke_all_tokens(user: User) -> None:
+        # A new secret changes the signing key and tokens carry the generation they were issued in, either logs the
+        # user out everywhere
+        await User.objects.filter(id=user.id).aupdate(
+            token_generation=F('token_generation') + 1,
+            token_secret=generate_token_secret(),
+        )
+        await ainvalidate_user_snapshot(user.id)
+
+    def _create_token(self, token_type: str, exp_delta: int, refresh_claims: dict | None = None) -> str:
+        user = self.current_user
         current_timestamp = datetime.now().timestamp()
 
         token_body = {
@@ -65,46 +122,81 @@ class JWTService:
             'jti': str(uuid.uuid4()),
             'user_id': user.id,
             'type': token_type,
+            'gen': user.token_generation,
+            **(refresh_claims or {}),
         }
-        return jwt.encode(token_body, get_token_secure_key(user), ALGORITHM_TYPE)
-
-    def _get_verify_payload_from_unverified_token(self, token: str, expected_type: str) -> dict:
+        if self.signing_key is None:
+            self.signing_key = get_token_secure_key(user)
+        return jwt.encode(token_body, self.signing_key, ALGORITHM_TYPE)
+
+    async def _aget_verify_payload_from_unverified_token(
+            self,
+            token: str,
+            expected_type: str,
+            from_snapshot: bool = False,
+    ) -> dict:
+        user_id = self._get_unverified_user_id(token)
+        if from_snapshot:
+            user, key = await self._aget_snapshot_user_with_key(user_id)
+        else:
+            user, key = await self._aget_db_user_with_key(user_id)
+        return self._verify_payload(token, expected_type, user, key)
+
+    def _get_unverified_user_id(self, token: str) -> int:
         unverified_payload = self._decode_token_payload(token=token, is_verified=False)
         if not (user_id := unverified_payload.get('user_id')):
             raise InvalidPayloadError()
+        return user_id
 
-        try:
-            user = User.objects.get(id=user_id)
-            self._set_user(user)
-        except User.DoesNotExist as e:
-            raise UserNotFoundJWTError() from e
+    def _verify_payload(self, token: str, expected_type: str, user: User, key: str) -> dict:
+        if not user.is_active:
+            raise UserInactiveJWTError()
+        self._set_user(user, key)
 
-        verified_payload = self._decode_token_payload(token=token, is_verified=True, user=user)
+        verified_payload = self._decode_token_payload(token=token, is_verified=True, key=key)
 
         if verified_payload['type'] != expected_type:
             # For access token, this error is acceptable (check AuthBear)
             raise InvalidJWTRefreshTypeError()
 
-        return verified_payload
+        if verified_payload['gen'] != user.token_generation:
+            raise JWTGenerationRevokedError()
 
-    def _set_user(self, user: User):
-        self.current_user = user
+        return verified_payload
 
     @staticmethod
-    def _is_token_revoked(payload: dict) -> bool:
-        token_uuid = payload['jti']
-        return persistent_client.get(token_uuid) is not None
+    async def _aget_db_user_with_key(user_id: int) -> tuple[User, str]:
+        try:
+            user = await User.objects.aget(id=user_id)
+        except User.DoesNotExist as e:
+            raise UserNotFoundJWTError() from e
+        return user, get_token_secure_key(user)
 
     @staticmethod
-    def _revoke_token(payload: dict) -> None:
-        token_uuid = payload['jti']
-        exp_time_redis = int(payload['exp'] - datetime.now().timestamp())
-        persistent_client.set(token_uuid, 'revoked', ex=exp_time_redis)
+    async def _aget_snapshot_user_with_key(user_id: int) -> tuple[User, str]:
+        if not (snapshot := await aget_user_snapshot(user_id)):
+            raise UserNotFoundJWTError()
+
+        user = user_from_snapshot(snapshot)
+        return user, get_token_secure_key(user)
+
+    def _set_user(self, user: User, key: str):
+        self.current_user = user
+        self.signing_key = key
+
+    def _get_rotation_keys_and_args(self, payload: dict) -> tuple[list[str], list[int]]:
+        return (
+            [f'{REFRESH_FAMILY_KEY_PREFIX}:{payload["fam"]}'],
+            [payload['rot'], settings.AUTH_REFRESH_TOKEN_EXPIRATION],
+        )
+
+    async def _arotate_refresh_token(self, payload: dict) -> int:
+        keys, args = self._get_rotation_keys_and_args(payload)
+        return await _get_arotate_script()(keys=keys, args=args, client=get_async_persistent_client())
 
     @staticmethod
-    def _decode_token_payload(token: str, is_verified: bool, user: User | None = None) -> dict:
+    def _decode_token_payload(token: str, is_verified: bool, key: str | None = None) -> dict:
         options = {"verify_signature": is_verified}
-        key = get_token_secure_key(user) if user and is_verified else None
 
         try:
             payload = jwt.decode(
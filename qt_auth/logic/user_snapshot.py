@@ -0,0 +1,51 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from qt_user.models import User
+
+# Bump it whenever SNAPSHOT_FIELDS change, so old snapshots are never read back
+SNAPSHOT_VERSION = 3
+SNAPSHOT_FIELDS = (
+    'id', 'username', 'email', 'is_active', 'is_staff', 'is_superuser', 'token_generation', 'token_secret',
+)
+
+
+def _snapshot_cache_key(user_id: int) -> str:
+    return f'qt_auth:user_snapshot:v{SNAPSHOT_VERSION}:{user_id}'
+
+
+def make_user_snapshot(user: User) -> dict:
+    return {
+        'fields': {field: getattr(user, field) for field in SNAPSHOT_FIELDS},
+    }
+
+
+async def aget_user_snapshot(user_id: int) -> dict | None:
+    snapshot = await cache.aget(_snapshot_cache_key(user_id))
+    if snapshot is not None:
+        return snapshot
+
+    try:
+        user = await User.objects.aget(id=user_id)
+    except User.DoesNotExist:
+        return None
+
+    snapshot = make_user_snapshot(user)
+    await cache.aset(_snapshot_cache_key(user_id), snapshot, timeout=settings.AUTH_USER_SNAPSHOT_TTL)
+    return snapshot
+
+
+def invalidate_user_snapshot(user_id: int) -> None:
+    cache.delete(_snapshot_cache_key(user_id))
+
+
+async def ainvalidate_user_snapshot(user_id: int) -> None:
+    await cache.adelete(_snapshot_cache_key(user_id))
+
+
+def user_from_snapshot(snapshot: dict) -> User:
+    # Fields outside the snapshot are deferred, so Django loads them from Postgres only on first access
+    fields = snapshot['fields']
+    field_names = [f.attname for f in User._meta.concrete_fields if f.attname in fields]
+    return User.from_db(DEFAULT_DB_ALIAS, field_names, [fields[name] for name in field_names])
@@ -0,0 +1,80 @@
+import base64
+import hashlib
+import hmac
+import time
+import typing as t
+
+import jwt
+from django.core.management.base import BaseCommand
+
+from qt_auth.logic.services.jwt_service import ALGORITHM_TYPE, KEY, REFRESH_TOKEN_TYPE, JWTService
+from qt_auth.logic.utils import get_token_secure_key
+from qt_user.models import User, generate_token_secret
+
+LEGACY_KDF_ITERATIONS = 100000
+
+
+# Keys used to be derived from the password hash with PBKDF2, once for every token issued or verified
+def derive_legacy_key(user: User) -> str:
+    derived_key = hashlib.pbkdf2_hmac(
+        'sha256', user.password.encode('utf-8'), hashlib.sha256(str(user.id).encode('utf-8')).digest()[:16],
+        LEGACY_KDF_ITERATIONS,
+    )
+    return base64.b64encode(hmac.digest(KEY, derived_key, 'sha256')).decode('utf-8')
+
+
+# CPU cost of issuing a token pair at sign-in and of verifying a refresh token and issuing the next pair, keyed by the
+# random token secret against the PBKDF2 keys derived for every token before. Single threaded, so the tokens per second
+# are per core. Database and Redis round trips of the refresh endpoint are left out
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--pairs', type=int, default=200)
+
+    def handle(self, *args, **options):
+        user = User(id=1, token_secret=generate_token_secret())
+        user.set_password(generate_token_secret())
+        number = options['pairs']
+
+        def legacy_pair() -> None:
+            service = JWTService(user)
+            service.signing_key = derive_legacy_key(user)
+            service.create_access_token()
+            service.signing_key = derive_legacy_key(user)
+            service.create_refresh_token()
+
+        def signin_pair() -> None:
+            service = JWTService(user)
+            service.create_access_token()
+            service.create_refresh_token()
+
+        refresh = JWTService(user).create_refresh_token()
+        payload = jwt.decode(refresh, options={'verify_signature': False})
+        legacy_refresh_token = jwt.encode(payload, derive_legacy_key(user), ALGORITHM_TYPE)
+
+        def legacy_refresh() -> None:
+            JWTService()._verify_payload(legacy_refresh_token, REFRESH_TOKEN_TYPE, user, derive_legacy_key(user))
+            legacy_pair()
+
+        def refresh_pair() -> None:
+            service = JWTService()
+            service._verify_payload(refresh, REFRESH_TOKEN_TYPE, user, get_token_secure_key(user))
+            service.create_access_token()
+            service.create_refresh_token()
+
+        for name, legacy, current in (
+            ('sign-in', legacy_pair, signin_pair),
+            ('refresh', legacy_refresh, refresh_pair),
+        ):
+            legacy_time = self.measure(legacy, number)
+            current_time = self.measure(current, number * 100)
+            self.stdout.write(
+                f'{name}: pbkdf2 {2 / legacy_time:.0f} tokens/s per core, token secret {2 / current_time:.0f} '
+                f'tokens/s per core ({legacy_time / current_time:.0f}x)'
+            )
+
+    @staticmethod
+    def measure(call: t.Callable[[], t.Any], number: int) -> float:
+        started = time.process_time()
+        for _ in range(number):
+            call()
+        return (time.process_time() - started) / number
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from qt_auth.logic.user_snapshot import invalidate_user_snapshot
+from qt_user.models import User
+
+
+@receiver(post_save, sender=User)
+def invalidate_snapshot_on_user_save(sender, instance, **kwargs):
+    invalidate_user_snapshot(instance.id)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_snapshot_on_user_delete(sender, instance, **kwargs):
+    invalidate_user_snapshot(instance.id)
@@ -0,0 +1,59 @@
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from qt_auth.logic.services.jwt_service import JWTService
+from qt_auth.tests.factories import UserFactory
+
+
+class AccessTokenTestCase(TestCase):
+    def setUp(self):
+        self.rooms_url = '/api/space/rooms'
+        self.user = UserFactory()
+
+        self.access = JWTService(self.user).create_access_token()
+        self.auth_header = {'HTTP_AUTHORIZATION': f'Bearer {self.access}'}
+
+    def test_user_is_not_selected_on_each_request(self):
+        resp = self.client.get(self.rooms_url, **self.auth_header)
+        self.assertEqual(resp.status_code, 200)
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(self.rooms_url, **self.auth_header)
+            self.assertEqual(resp.status_code, 200)
+
+        user_queries = [q['sql'] for q in ctx.captured_queries if 'qt_user_user' in q['sql']]
+        self.assertListEqual(user_queries, [])
+
+    def test_lazy_user_fields(self):
+        service = JWTService()
+        async_to_sync(service.averify_access_token)(self.access)
+        async_to_sync(service.averify_access_token)(self.access)
+        user = service.get_user()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(user.id, self.user.id)
+            self.assertEqual(user.username, self.user.username)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(user.date_joined, self.user.date_joined)
+
+    def test_deactivated_user(self):
+        resp = self.client.get(self.rooms_url, **self.auth_header)
+        self.assertEqual(resp.status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+
+        resp = self.client.get(self.rooms_url, **self.auth_header)
+        self.assertEqual(resp.status_code, 401)
+
+    def test_deleted_user(self):
+        resp = self.client.get(self.rooms_url, **self.auth_header)
+        self.assertEqual(resp.status_code, 200)
+
+        self.user.delete()
+
+        resp = self.client.get(self.rooms_url, **self.auth_header)
+        self.assertEqual(resp.status_code, 401)
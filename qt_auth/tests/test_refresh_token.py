@@ -1,7 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch
 
+import jwt
+from asgiref.sync import async_to_sync
 from django.test import TestCase
 
+from qt_auth.logic.services import jwt_service as jwt_service_module
 from qt_auth.logic.services.jwt_service import JWTService
 from qt_auth.tests.factories import UserFactory
 
@@ -15,11 +19,15 @@ class RefreshTokenTestCase(TestCase):
             'username': 'test',
             'email': 'test@test.com',
         }
+        # Hardcoded tokens below are issued for user_id=1
+        UserFactory.reset_sequence()
         self.user = UserFactory()
 
         jwt_service = JWTService(self.user)
         self.refresh = jwt_service.create_refresh_token()
         self.access = jwt_service.create_access_token()
+        self.family = jwt.decode(self.refresh, options={'verify_signature': False})['fam']
+        self.other_refresh = JWTService(self.user).create_refresh_token()
 
     def test_ok(self):
         user_data = {
@@ -84,8 +92,8 @@ class RefreshTokenTestCase(TestCase):
         self.assertEqual(data['detail'], 'Token type is not refresh')
 
     def test_revoked_token(self):
-        with patch('qt_auth.logic.services.jwt_service.JWTService._is_token_revoked') as m_is_token_revoked:
-            m_is_token_revoked.return_value = True
+        with patch('qt_auth.logic.services.jwt_service.JWTService._arotate_refresh_token') as m_rotate_refresh_token:
+            m_rotate_refresh_token.return_value = -1
 
             refresh_token = {
                 'refresh': self.refresh,
@@ -95,3 +103,72 @@ class RefreshTokenTestCase(TestCase):
 
             data = resp.json()
             self.assertEqual(data['detail'], 'Refresh token has been revoked')
+
+    def test_reused_token(self):
+        refresh_token = {'refresh': self.refresh}
+        resp = self.client.post(self.refresh_url, data=refresh_token, content_type='application/json')
+        self.assertEqual(resp.status_code, 200)
+
+        resp = self.client.post(self.refresh_url, data=refresh_token, content_type='application/json')
+        self.assertEqual(resp.status_code, 401)
+        self.assertEqual(resp.json()['detail'], 'Refresh token has been revoked')
+
+    def test_reuse_revokes_family(self):
+        resp = self.client.post(self.refresh_url, data={'refresh': self.refresh}, content_type='application/json')
+        rotated = resp.json()['refresh']
+        payload = jwt.decode(rotated, options={'verify_signature': False})
+        self.assertEqual((payload['fam'], payload['rot']), (self.family, 1))
+
+        # The stolen token is replayed, the family is revoked for the legitimate client too
+        resp = self.client.post(self.refresh_url, data={'refresh': self.refresh}, content_type='application/json')
+        self.assertEqual(resp.status_code, 401)
+        resp = self.client.post(self.refresh_url, data={'refresh': rotated}, content_type='application/json')
+        self.assertEqual(resp.status_code, 401)
+        self.assertEqual(resp.json()['detail'], 'Refresh token has been revoked')
+
+        resp = self.client.post(self.refresh_url, data={'refresh': self.other_refresh}, content_type='application/json')
+        self.assertEqual(resp.status_code, 200)
+
+    def test_rotation_script_is_registered_once(self):
+        scripts = []
+        for refresh in (self.refresh, self.other_refresh):
+            resp = self.client.post(self.refresh_url, data={'refresh': refresh}, content_type='application/json')
+            self.assertEqual(resp.status_code, 200)
+            scripts.append(jwt_service_module._arotate_script)
+        self.assertIsNotNone(scripts[0])
+        self.assertIs(scripts[0], scripts[1])
+
+    def test_concurrent_rotation(self):
+        # Threads don't see the test transaction, so the rotation step is raced directly
+        payload = jwt.decode(self.refresh, options={'verify_signature': False})
+        with ThreadPoolExecutor(8) as pool:
+            rotated = list(pool.map(lambda _: async_to_sync(JWTService()._arotate_refresh_token)(payload), range(8)))
+        self.assertEqual(sum(rotation > 0 for rotation in rotated), 1)
+
+    def test_logout_all(self):
+        resp = self.client.post(self.refresh_url, data={'refresh': self.refresh}, content_type='application/json')
+        tokens = resp.json()
+        headers = {'Authorization': f'Bearer {tokens["access"]}'}
+        self.assertEqual(self.client.get('/api/space/rooms', headers=headers).status_code, 200)
+
+        resp = self.client.post('/api/auth/logout-all', headers={'Authorization': f'Bearer {self.access}'})
+        self.assertEqual(resp.status_code, 204)
+
+        self.assertEqual(self.client.get('/api/space/rooms', headers=headers).status_code, 401)
+        for refresh in (tokens['refresh'], self.other_refresh):
+            resp = self.client.post(self.refresh_url, data={'refresh': refresh}, content_type='application/json')
+            self.assertEqual(resp.status_code, 401)
+            # Signed with the previous secret
+            self.assertEqual(resp.json()['detail'], 'JWT token decode error')
+
+        resp = self.client.post(
+            self.signin_url,
+            data={'password': 'superpass', 'username': 'test'},
+            content_type='application/json',
+        )
+        resp = self.client.post(
+            self.refresh_url,
+            data={'refresh': resp.json()['refresh']},
+            content_type='application/json',
+        )
+        self.assertEqual(resp.status_code, 200)
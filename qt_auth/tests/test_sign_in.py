@@ -1,5 +1,6 @@
 from datetime import datetime
 
+from asgiref.sync import async_to_sync
 from django.test import TestCase
 
 from qt_auth.logic.services.jwt_service import JWTService
@@ -73,8 +74,9 @@ class SignInTestCase(TestCase):
         data = resp.json()
         access, refresh = data['access'], data['refresh']
         jwt_service = JWTService()
-        verified_payload_access = jwt_service._get_verify_payload_from_unverified_token(access, 'access')
-        verified_payload_refresh = jwt_service._get_verify_payload_from_unverified_token(refresh, 'refresh')
+        verify = async_to_sync(jwt_service._aget_verify_payload_from_unverified_token)
+        verified_payload_access = verify(access, 'access')
+        verified_payload_refresh = verify(refresh, 'refresh')
         fifteen_minutes_timestamp = datetime.now().timestamp() + 60 * 15
         one_day_timestamp = datetime.now().timestamp() + 30 * 24 * 60 * 60
 
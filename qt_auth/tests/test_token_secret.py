@@ -0,0 +1,73 @@
+from unittest.mock import patch
+
+from django.contrib.auth.hashers import make_password
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from qt_auth.logic.services.jwt_service import JWTService
+from qt_auth.logic.user_snapshot import invalidate_user_snapshot
+from qt_auth.logic.utils import get_token_secure_key
+from qt_auth.tests.factories import UserFactory
+from qt_user.models import User
+
+
+class TokenSecretTestCase(TestCase):
+    def setUp(self):
+        self.signin_url = '/api/auth/signin'
+        self.refresh_url = '/api/auth/refresh'
+        self.rooms_url = '/api/space/rooms'
+        self.user = UserFactory()
+
+        jwt_service = JWTService(self.user)
+        self.access = jwt_service.create_access_token()
+        self.refresh = jwt_service.create_refresh_token()
+
+    def test_key_is_derived_once_per_token_pair(self):
+        user_data = {'password': 'superpass', 'username': 'test'}
+        with patch(
+                'qt_auth.logic.services.jwt_service.get_token_secure_key',
+                wraps=get_token_secure_key,
+        ) as m_get_key:
+            resp = self.client.post(self.signin_url, data=user_data, content_type='application/json')
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(m_get_key.call_count, 1)
+
+            m_get_key.reset_mock()
+            resp = self.client.post(self.refresh_url, data={'refresh': self.refresh}, content_type='application/json')
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(m_get_key.call_count, 1)
+
+    def test_password_change_invalidates_token(self):
+        self.user.set_password('newsuperpass')
+        self.user.save()
+
+        resp = self.client.get(self.rooms_url, HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        self.assertEqual(resp.status_code, 401)
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_password_hash_upgrade_keeps_secret(self):
+        # Sign-in rehashes a password stored with an older hasher, it must not log the user out
+        User.objects.filter(id=self.user.id).update(password=make_password('superpass', hasher='md5'))
+        resp = self.client.post(
+            self.signin_url,
+            data={'password': 'superpass', 'username': 'test'},
+            content_type='application/json',
+        )
+        self.assertEqual(resp.status_code, 200)
+
+        user = User.objects.get(id=self.user.id)
+        self.assertFalse(user.password.startswith('md5$'))
+        self.assertEqual(user.token_secret, self.user.token_secret)
+        resp = self.client.get(self.rooms_url, HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        self.assertEqual(resp.status_code, 200)
+
+    def test_revoked_generation(self):
+        User.objects.filter(id=self.user.id).update(token_generation=F('token_generation') + 1)
+        invalidate_user_snapshot(self.user.id)
+
+        resp = self.client.post(self.refresh_url, data={'refresh': self.refresh}, content_type='application/json')
+        self.assertEqual(resp.status_code, 401)
+        self.assertEqual(resp.json()['detail'], 'Token has been revoked')
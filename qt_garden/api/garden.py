@@ -4,7 +4,7 @@ from ninja import Router, Schema
 from common.exceptions import BaseQtError
 from common.http_response import QtORJSONResponse
 from common.schemas import ErrorResponse
-from qt_auth.logic.jwt_auth_bear import AuthBearer
+from qt_auth.logic.jwt_auth_bear import AsyncAuthBearer
 from qt_garden.logic.garden_service import GardenServie
 from qt_garden.schemas.garden import (
     GardenRequestSchema,
@@ -18,15 +18,15 @@ router = Router()
 
 @router.post(
     path='/plant',
-    auth=AuthBearer(),
+    auth=AsyncAuthBearer(),
     response={
         201: GardenResponseSchema,
         (400, 409): ErrorResponse,
     },
 )
-def create_garden_plant(request: HttpRequest, data: GardenRequestSchema) -> QtORJSONResponse:
+async def create_garden_plant(request: HttpRequest, data: GardenRequestSchema) -> QtORJSONResponse:
     service = GardenServie(request.auth)
-    plant = service.create(data)
+    plant = await service.acreate(data)
     return QtORJSONResponse(
         data=GardenResponseSchema.from_orm(plant).model_dump(),
         status=201,
@@ -35,14 +35,14 @@ def create_garden_plant(request: HttpRequest, data: GardenRequestSchema) -> QtOR
 
 @router.get(
     path='/plants',
-    auth=AuthBearer(),
+    auth=AsyncAuthBearer(),
     response={
         200: ListGardenResponseSchema
     },
 )
-def get_garden_plants_list(request: HttpRequest) -> QtORJSONResponse:
+async def get_garden_plants_list(request: HttpRequest) -> QtORJSONResponse:
     service = GardenServie(request.auth)
-    plants = service.get_list()
+    plants = await service.aget_list()
     return QtORJSONResponse(
         data=[GardenResponseSchema.from_orm(plant).model_dump() for plant in plants],
         status=200,
@@ -51,16 +51,16 @@ def get_garden_plants_list(request: HttpRequest) -> QtORJSONResponse:
 
 @router.get(
     path='/plant/{id}',
-    auth=AuthBearer(),
+    auth=AsyncAuthBearer(),
     response={
         200: GardenResponseDetailedSchema,
         404: ErrorResponse,
     },
 )
-def get_garden_plant_by_id(request: HttpRequest, uid: int) -> QtORJSONResponse:
+async def get_garden_plant_by_id(request: HttpRequest, uid: int) -> QtORJSONResponse:
     service = GardenServie(request.auth)
     try:
-        garden = service.get(uid)
+        garden = await service.aget(uid)
     except BaseQtError as e:
         return e.to_response()
 
@@ -72,16 +72,16 @@ def get_garden_plant_by_id(request: HttpRequest, uid: int) -> QtORJSONResponse:
 
 @router.put(
     path='/plant/{id}',
-    auth=AuthBearer(),
+    auth=AsyncAuthBearer(),
     response={
         201: GardenResponseDetailedSchema,
         404: ErrorResponse,
     },
 )
-def update_garden_plant_by_id(request, uid: int, data: GardenRequestSchema) -> QtORJSONResponse:
+async def update_garden_plant_by_id(request, uid: int, data: GardenRequestSchema) -> QtORJSONResponse:
     service = GardenServie(request.auth)
     try:
-        plant = service.update(uid, data)
+        plant = await service.aupdate(uid, data)
     except BaseQtError as e:
         return e.to_response()
 
@@ -93,16 +93,16 @@ def update_garden_plant_by_id(request, uid: int, data: GardenRequestSchema) -> Q
 
 @router.delete(
     path='/plant/{id}',
-    auth=AuthBearer(),
+    auth=AsyncAuthBearer(),
     response={
         204: Schema,
         404: ErrorResponse,
     },
 )
-def delete_garden_plant_by_id(request, uid: int) -> HttpResponse:
+async def delete_garden_plant_by_id(request, uid: int) -> HttpResponse:
     service = GardenServie(request.auth)
     try:
-        service.delete(uid)
+        await service.adelete(uid)
     except BaseQtError as e:
         return e.to_response()
     return HttpResponse(status=204)
@@ -1,3 +1,4 @@
+from asgiref.sync import sync_to_async
 from django.db import transaction
 from django.db.models import QuerySet
 
@@ -11,15 +12,25 @@ class GardenServie:
     def __init__(self, user: User):
         self.current_user = user
 
-    def get(self, uid: int) -> Garden:
-        qs = Garden.objects.select_related('parameters', 'room', 'specie').filter(id=uid, user=self.current_user)
+    def _get_queryset(self, uid: int) -> QuerySet[Garden]:
+        return Garden.objects.select_related('parameters', 'room', 'specie').filter(id=uid, user=self.current_user)
+
+    def _get(self, uid: int) -> Garden:
         try:
-            return qs.get()
+            return self._get_queryset(uid).get()
         except Garden.DoesNotExist as e:
             raise GardenItemNotFoundError() from e
 
+    async def aget(self, uid: int) -> Garden:
+        try:
+            return await self._get_queryset(uid).aget()
+        except Garden.DoesNotExist as e:
+            raise GardenItemNotFoundError() from e
+
+    # transaction.atomic has no async form, so writes run in a thread. The plant is read back with its relations,
+    # the response needs them and they cannot be lazy loaded from async code
     @transaction.atomic
-    def create(self, data: GardenRequestSchema) -> Garden:
+    def _create(self, data: GardenRequestSchema) -> Garden:
         garden_parameters = data.parameters
         garden_data = data.model_dump(exclude={'parameters'})
         garden = Garden(
@@ -32,12 +43,16 @@ class GardenServie:
         garden.save()
         return garden
 
-    def get_list(self) -> QuerySet[Garden]:
-        return Garden.objects.select_related('specie').filter(user=self.current_user).all()
+    async def acreate(self, data: GardenRequestSchema) -> Garden:
+        garden = await sync_to_async(self._create)(data)
+        return await self.aget(garden.id)
+
+    async def aget_list(self) -> list[Garden]:
+        return [garden async for garden in Garden.objects.select_related('specie').filter(user=self.current_user)]
 
     @transaction.atomic
-    def update(self, uid: int, data: GardenRequestSchema) -> Garden:
-        garden = self.get(uid)
+    def _update(self, uid: int, data: GardenRequestSchema) -> Garden:
+        garden = self._get(uid)
 
         for attr, value in data.model_dump(exclude={'parameters'}).items():
             setattr(garden, attr, value)
@@ -52,6 +67,10 @@ class GardenServie:
             garden.save()
         return garden
 
-    def delete(self, uid: int) -> None:
-        plant = self.get(uid)
-        plant.delete()
+    async def aupdate(self, uid: int, data: GardenRequestSchema) -> Garden:
+        await sync_to_async(self._update)(uid, data)
+        return await self.aget(uid)
+
+    async def adelete(self, uid: int) -> None:
+        plant = await self.aget(uid)
+        await plant.adelete()
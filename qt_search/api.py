@@ -1,63 +1,82 @@
-from django.db.models import Prefetch
-from django.shortcuts import get_object_or_404
-from django.views.decorators.cache import cache_page
+from django.http import Http404, HttpResponse
 from ninja import Router
-from ninja.decorators import decorate_view
-from ninja.pagination import PageNumberPagination, paginate
+from ninja.errors import ValidationError
 from ninja.params import Query
 
-from qt_search.models import CommonName, DistributionSpecie, Specie
+from common.pagination import KeysetPagination
+from common.renderers import json_dumps
+from qt_search.logic.details import (
+    get_specie_details_document,
+    get_specie_details_documents,
+    get_specie_details_projection,
+    join_specie_details_documents,
+)
+from qt_search.logic.facet_index import FacetResult, get_facet_counts, get_facet_index
+from qt_search.logic.listing import CachedListing, get_catalogue_version, summary_listing
+from qt_search.logic.search import order_by_search_rank
+from qt_search.models import Specie
+from qt_search.schemas.facet import FacetCountsSchema
 from qt_search.schemas.filter import FiltersSchema
-from qt_search.schemas.specie import SpeciesDetailsSchema, SpeciesSchema
+from qt_search.schemas.serializers import serialize_specie
+from qt_search.schemas.specie import DETAIL_FIELDS, SpeciesBatchRequestSchema, SpeciesDetailsSchema, SpeciesPageSchema
 
 app = Router()
 
 
-@app.get('/species', response=list[SpeciesSchema])
-@paginate(PageNumberPagination, page_size=20)
-def get_species(request, filters: FiltersSchema = Query(...)):    # noqa: B008
+species_paginator = KeysetPagination(page_size=20)
+
+
+# Paginated by hand rather than with @paginate, so the page is dumped straight to JSON instead of being validated
+# item by item through SpeciesSchema
+@app.get('/species', response=SpeciesPageSchema)
+def get_species(
+        request,
+        filters: FiltersSchema = Query(...),    # noqa: B008
+        pagination: KeysetPagination.Input = Query(...),    # noqa: B008
+):
+    page = species_paginator.paginate_queryset(get_species_listing(filters), pagination)
+    page['items'] = [serialize_specie(item) for item in page['items']]
+    return HttpResponse(json_dumps(page), content_type='application/json')
+
+
+def get_species_listing(filters: FiltersSchema) -> CachedListing:
+    if (selection := filters.get_facet_selection()) is not None:
+        index = get_facet_index()
+        return CachedListing(FacetResult(index, index.match(selection)), filters.get_cache_key())
+
     # Need to remove distinct for neste query!!!
-    species = filters.filter(
-        Specie.objects
-        .prefetch_related(
-            Prefetch(
-                'common_names',
-                queryset=CommonName.objects.filter(is_main=True, lang='en')[:1],
-                to_attr='main_common_name',
-            )).only('slug', 'latin_name', 'image_url').order_by('rating').distinct().all()
-    )
-    return species
+    species = filters.filter(Specie.objects.order_by('rating', 'id').distinct().all())
+    if filters.search:
+        return CachedListing(order_by_search_rank(species, filters.search), filters.get_cache_key())
+    return CachedListing(summary_listing(species), filters.get_cache_key())
+
+
+@app.get('/species/facets', response=FacetCountsSchema)
+def get_species_facets(request, filters: FiltersSchema = Query(...)):    # noqa: B008
+    base_ids = None
+    if filters.has_non_facet_filters():
+        base_ids = filters.without_facets().filter(Specie.objects.all()).values_list('id', flat=True).distinct()
+    # The index version misses changes to tags, names and sizes that the non-facet filters match on
+    cache_key = f'{get_catalogue_version()}:{filters.get_cache_key()}'
+    return get_facet_counts(filters.get_facet_values(), base_ids, cache_key)
+
+
+@app.post('/species/batch', response=dict[str, SpeciesDetailsSchema])
+def get_species_details_batch(request, data: SpeciesBatchRequestSchema):
+    # Keyed by slug in request order, unknown slugs are left out
+    documents = get_specie_details_documents(list(dict.fromkeys(data.slugs)))
+    return HttpResponse(join_specie_details_documents(documents), content_type='application/json')
 
 
 @app.get('/species/{slug}', response=SpeciesDetailsSchema)
-@decorate_view(cache_page(24 * 60 * 60))
-def get_specie_details(request, slug: str):
-    return get_object_or_404(
-        Specie.objects.prefetch_related(
-            'tags',
-            Prefetch(
-                'common_names',
-                queryset=CommonName.objects.filter(is_main=True, lang='en'),
-                to_attr='main_common_name',
-            ),
-            Prefetch(
-                'distributions_specie',
-                queryset=DistributionSpecie.objects.select_related('distribution'),
-            ),
-            'tags',
-            'parts_color__colors_part',
-            'synonyms',
-            'growth_tips',
-            'regular_events',
-            'parts_color',
-            'images',
-            'sources',
-            'pathogens',
-        ).select_related(
-            'height_cm',
-            'years_to_max_height',
-            'spread_cm',
-            'scientific_classification',
-        ),
-        slug=slug,
-    )
+def get_specie_details(request, slug: str, fields: str | None = None):
+    # fields: comma separated details fields to return (e.g. "images,tags"), everything when omitted
+    if names := frozenset(name.strip() for name in (fields or '').split(',') if name.strip()):
+        if unknown := names.difference(DETAIL_FIELDS):
+            raise ValidationError([{'loc': ('fields',), 'msg': f'Unknown fields: {", ".join(sorted(unknown))}'}])
+        document = get_specie_details_projection(slug, names)
+    else:
+        document = get_specie_details_document(slug)
+    if document is None:
+        raise Http404
+    return HttpResponse(document, content_type='application/json')
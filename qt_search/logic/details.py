@@ -0,0 +1,126 @@
+import typing as t
+
+import orjson
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, QuerySet
+
+from common.cache import TieredCache
+from common.renderers import json_dumps
+from qt_search.models import CommonName, DistributionSpecie, Specie
+from qt_search.schemas.serializers import serialize_specie_details
+from qt_search.schemas.specie import DETAIL_FIELDS
+
+details_cache = TieredCache(
+    'species_details',
+    maxsize=settings.SEARCH_DETAILS_LOCAL_SIZE,
+    local_ttl=settings.SEARCH_DETAILS_LOCAL_TTL,
+    ttl=settings.SEARCH_DETAILS_TTL,
+    stale_ttl=settings.SEARCH_DETAILS_STALE_TTL,
+)
+
+
+# What the relation fields of the details need loaded, other fields are columns of the species row
+DETAIL_PREFETCHES: dict[str, tuple[str | Prefetch, ...]] = {
+    'main_common_name': (
+        Prefetch(
+            'common_names',
+            queryset=CommonName.objects.filter(is_main=True, lang='en'),
+            to_attr='main_common_name',
+        ),
+    ),
+    'tags': ('tags',),
+    'synonyms': ('synonyms',),
+    'sources': ('sources',),
+    'common_names': ('common_names',),
+    'images': ('images',),
+    'pathogens': ('pathogens',),
+    'growth_tips': ('growth_tips',),
+    'distributions': (
+        Prefetch(
+            'distributions_specie',
+            queryset=DistributionSpecie.objects.select_related('distribution'),
+        ),
+    ),
+    'regular_events': ('regular_events__frequency',),
+    'parts_color': ('parts_color__colors_part',),
+    'scientific_classification': ('scientific_classification__orders',),
+}
+DETAIL_JOINS = ('height_cm', 'years_to_max_height', 'spread_cm', 'scientific_classification')
+
+
+def specie_details_queryset(fields: t.Collection[str] | None = None) -> QuerySet[Specie]:
+    # Only the relations of the given details fields are loaded, all of them by default
+    fields = DETAIL_FIELDS if fields is None else fields
+    return Specie.objects.prefetch_related(
+        *(lookup for name in fields for lookup in DETAIL_PREFETCHES.get(name, ())),
+    ).select_related(
+        *(name for name in DETAIL_JOINS if name in fields),
+    )
+
+
+def render_specie_details(specie: Specie, fields: t.Container[str] | None = None) -> bytes:
+    # Encoded like every other response, so documents match SpeciesDetailsSchema output byte for byte
+    return json_dumps(serialize_specie_details(specie, fields))
+
+
+def get_specie_details_document(slug: str) -> bytes | None:
+    # None means there is no such species
+    def build() -> bytes | None:
+        specie = specie_details_queryset().filter(slug=slug).first()
+        return specie and render_specie_details(specie)
+
+    return details_cache.get_or_set(slug, build)
+
+
+def get_specie_details_projection(slug: str, fields: frozenset[str]) -> bytes | None:
+    # A cached full document is cut down, otherwise only the relations of the requested fields are queried.
+    # Projections are not cached themselves
+    fields |= {'slug'}
+    if (document := details_cache.get_many([slug]).get(slug)) is not None:
+        return orjson.dumps({name: value for name, value in orjson.loads(document).items() if name in fields})
+    specie = specie_details_queryset(fields).filter(slug=slug).first()
+    return specie and render_specie_details(specie, fields)
+
+
+def get_specie_details_documents(slugs: list[str]) -> dict[str, bytes]:
+    # Cached documents first, the misses are rendered together from one set of prefetch queries
+    documents = details_cache.get_many(slugs)
+    if missing := [slug for slug in slugs if slug not in documents]:
+        rendered = {
+            specie.slug: render_specie_details(specie) for specie in specie_details_queryset().filter(slug__in=missing)
+        }
+        details_cache.set_many(rendered)
+        documents.update(rendered)
+    return {slug: documents[slug] for slug in slugs if slug in documents}
+
+
+def join_specie_details_documents(documents: dict[str, bytes]) -> bytes:
+    # The documents are already JSON, they are spliced into one object instead of being parsed again
+    return b'{' + b','.join(orjson.dumps(slug) + b':' + document for slug, document in documents.items()) + b'}'
+
+
+def warm_specie_details(species: QuerySet[Specie], batch_size: int = 200) -> int:
+    count = 0
+    ids = list(species.values_list('id', flat=True))
+    for start in range(0, len(ids), batch_size):
+        documents = {
+            specie.slug: render_specie_details(specie)
+            for specie in specie_details_queryset().filter(id__in=ids[start:start + batch_size])
+        }
+        details_cache.set_many(documents)
+        count += len(documents)
+    return count
+
+
+def invalidate_specie_details(specie_ids: t.Iterable[int] = (), slugs: t.Iterable[str] = ()) -> None:
+    # Dropped right away and once more after the commit, the second time removes a document that a concurrent
+    # request rebuilt from the rows as they were before the commit
+    slugs = set(slugs)
+    if specie_ids := set(specie_ids):
+        slugs.update(Specie.objects.filter(id__in=specie_ids).values_list('slug', flat=True))
+    if not slugs:
+        return
+
+    details_cache.delete_many(slugs)
+    transaction.on_commit(lambda: details_cache.delete_many(slugs))
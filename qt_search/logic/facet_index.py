@@ -0,0 +1,300 @@
+import bisect
+import threading
+import typing as t
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+
+from qt_search.models import Specie, SpecieSummary
+
+BIT_FACETS = (
+    'soil_type',
+    'soil_moisture',
+    'soil_ph',
+    'position_sunlight',
+    'position_side',
+    'edible_part',
+    'fragrance',
+    'harvest',
+    'planting',
+    'foliage',
+    'toxicity',
+    'habit',
+)
+CHOICE_FACETS = ('exposure', 'duration')
+FACET_FIELDS = BIT_FACETS + CHOICE_FACETS
+
+VERSION_KEY = 'qt_search:facet_index:version'
+PAYLOAD_KEY = 'qt_search:facet_index:payload'
+CHANGE_KEY = 'qt_search:facet_index:change'
+COUNTS_KEY = 'qt_search:facet_counts'
+CHANGE_TTL = 24 * 60 * 60
+# Beyond this many pending changes a worker reloads the whole index instead of patching it
+MAX_INCREMENTAL_CHANGES = 500
+FULL_REBUILD = 'full'
+
+FACET_CHOICES = {
+    **{field_name: list(Specie._meta.get_field(field_name).flags) for field_name in BIT_FACETS},
+    **{field_name: [value for value, _ in Specie._meta.get_field(field_name).choices] for field_name in CHOICE_FACETS},
+}
+
+FacetSelection = dict[str, list[str]]
+
+
+def specie_facet_keys(values: dict[str, t.Any]) -> list[tuple[str, str]]:
+    keys = []
+    for field_name in BIT_FACETS:
+        if not (flags := int(values[field_name] or 0)):
+            continue
+        keys.extend(
+            (field_name, choice) for bit, choice in enumerate(FACET_CHOICES[field_name]) if flags & (1 << bit)
+        )
+    keys.extend((field_name, values[field_name]) for field_name in CHOICE_FACETS if values[field_name])
+    return keys
+
+
+def get_facet_rows(**filters) -> QuerySet:
+    # Read from the narrow summary table rather than the wide species one
+    return SpecieSummary.objects.filter(lang=SpecieSummary.DEFAULT_LANGUAGE, **filters).values(
+        'specie_id', 'rating', *FACET_FIELDS,
+    )
+
+
+# One bitmap (a Python int) per facet option over all species ordered by (rating, id): bit N is the species
+# at position N, so a multi-facet filter is a few big-int AND/OR operations and its set bits come in listing order
+class FacetIndex:
+    def __init__(self, version: int, ids: array, ratings: array, bitmaps: dict[tuple[str, str], int]):
+        self.version = version
+        self.ids = ids
+        self.ratings = ratings
+        self.bitmaps = bitmaps
+        self._positions_by_id: dict[int, int] | None = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, version: int) -> 'FacetIndex':
+        ids, ratings, bitmaps = array('q'), array('q'), {}
+        rows = get_facet_rows().order_by('rating', 'specie_id')
+        for position, row in enumerate(rows.iterator(chunk_size=5000)):
+            ids.append(row['specie_id'])
+            ratings.append(row['rating'])
+            for key in specie_facet_keys(row):
+                bitmaps[key] = bitmaps.get(key, 0) | (1 << position)
+        return cls(version, ids, ratings, bitmaps)
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> 'FacetIndex':
+        return cls(payload['version'], array('q', payload['ids']), array('q', payload['ratings']), payload['bitmaps'])
+
+    def to_payload(self) -> dict:
+        return {
+            'version': self.version,
+            'ids': self.ids.tobytes(),
+            'ratings': self.ratings.tobytes(),
+            'bitmaps': self.bitmaps,
+        }
+
+    @property
+    def all_bitmap(self) -> int:
+        return (1 << len(self.ids)) - 1
+
+    def match(self, selection: FacetSelection) -> int:
+        # Flags of one BitField are ANDed and choice fields are ORed, like FiltersSchema does in SQL
+        result = self.all_bitmap
+        for field_name, values in selection.items():
+            if field_name in BIT_FACETS:
+                for value in values:
+                    result &= self.bitmaps.get((field_name, value), 0)
+            else:
+                any_of = 0
+                for value in values:
+                    any_of |= self.bitmaps.get((field_name, value), 0)
+                result &= any_of
+        return result
+
+    def counts(self, selection: FacetSelection, base: int | None = None) -> dict[str, dict[str, int]]:
+        # "How many if I also tick X": a BitField option narrows the current match, while a choice option
+        # widens its own field's OR group, so the other fields are matched without it
+        base = self.all_bitmap if base is None else base
+        current = base & self.match(selection)
+        counts = {}
+        for field_name, choices in FACET_CHOICES.items():
+            if field_name in BIT_FACETS:
+                counts[field_name] = {
+                    choice: (current & self.bitmaps.get((field_name, choice), 0)).bit_count() for choice in choices
+                }
+                continue
+            others = base & self.match({k: v for k, v in selection.items() if k != field_name})
+            selected = self.match({field_name: selection[field_name]}) if selection.get(field_name) else 0
+            counts[field_name] = {
+                choice: (others & (selected | self.bitmaps.get((field_name, choice), 0))).bit_count()
+                for choice in choices
+            }
+        return counts
+
+    def bitmap_for_ids(self, specie_ids: t.Iterable[int]) -> int:
+        if self._positions_by_id is None:
+            self._positions_by_id = {specie_id: position for position, specie_id in enumerate(self.ids)}
+        bits = bytearray(len(self.ids) // 8 + 1)
+        for specie_id in specie_ids:
+            if (position := self._positions_by_id.get(specie_id)) is not None:
+                bits[position >> 3] |= 1 << (position & 7)
+        return int.from_bytes(bits, 'little')
+
+    def position_after(self, rating: int, specie_id: int) -> int:
+        return bisect.bisect_right(
+            range(len(self.ids)),
+            (rating, specie_id),
+            key=lambda position: (self.ratings[position], self.ids[position]),
+        )
+
+    @staticmethod
+    def positions(bitmap: int, skip: int = 0, limit: int | None = None) -> list[int]:
+        bits = bin(bitmap)[:1:-1]
+        result: list[int] = []
+        position = bits.find('1')
+        while position != -1 and (limit is None or len(result) < limit):
+            if skip:
+                skip -= 1
+            else:
+                result.append(position)
+            position = bits.find('1', position + 1)
+        return result
+
+    def with_changes(self, version: int, specie_ids: set[int]) -> 'FacetIndex':
+        # Requests may still be reading this index, so the changes are made to a copy
+        index = FacetIndex(version, array('q', self.ids), array('q', self.ratings), dict(self.bitmaps))
+        rows = get_facet_rows(specie_id__in=specie_ids)
+        for position in sorted((p for p, sid in enumerate(index.ids) if sid in specie_ids), reverse=True):
+            index._remove_position(position)
+        for row in rows:
+            index._insert_row(row)
+        return index
+
+    def _remove_position(self, position: int) -> None:
+        self._positions_by_id = None
+        low_mask = (1 << position) - 1
+        del self.ids[position]
+        del self.ratings[position]
+        for key, bitmap in self.bitmaps.items():
+            self.bitmaps[key] = (bitmap & low_mask) | ((bitmap >> (position + 1)) << position)
+
+    def _insert_row(self, row: dict[str, t.Any]) -> None:
+        self._positions_by_id = None
+        position = self.position_after(row['rating'], row['specie_id'])
+        low_mask = (1 << position) - 1
+        self.ids.insert(position, row['specie_id'])
+        self.ratings.insert(position, row['rating'])
+        for key, bitmap in self.bitmaps.items():
+            self.bitmaps[key] = (bitmap & low_mask) | ((bitmap >> position) << (position + 1))
+        for key in specie_facet_keys(row):
+            self.bitmaps[key] = self.bitmaps.get(key, 0) | (1 << position)
+
+
+class FacetResult:
+    ordering = ('rating', 'id')
+
+    def __init__(self, index: FacetIndex, bitmap: int):
+        self.index = index
+        self.bitmap = bitmap
+
+    def count(self) -> int:
+        return self.bitmap.bit_count()
+
+    def fetch_rows(self, offset: int, limit: int) -> list[tuple[int, list[int]]]:
+        # (id, ordering values) without touching the database
+        return self._rows(self.index.positions(self.bitmap, skip=offset, limit=limit))
+
+    def fetch_rows_after(self, values: list[t.Any], limit: int) -> list[tuple[int, list[int]]]:
+        rating, specie_id = values
+        start = self.index.position_after(int(rating), int(specie_id))
+        return self._rows(self.index.positions(self.bitmap >> start << start, limit=limit))
+
+    def _rows(self, positions: list[int]) -> list[tuple[int, list[int]]]:
+        return [(self.index.ids[p], [self.index.ratings[p], self.index.ids[p]]) for p in positions]
+
+
+_index: FacetIndex | None = None
+_index_lock = threading.Lock()
+
+
+def _get_remote_version() -> int:
+    if (version := cache.get(VERSION_KEY)) is None:
+        cache.add(VERSION_KEY, 0, timeout=None)
+        version = cache.get(VERSION_KEY, 0)
+    return version
+
+
+def _bump_version(change: int | str) -> int:
+    cache.add(VERSION_KEY, 0, timeout=None)
+    version = cache.incr(VERSION_KEY)
+    cache.set(f'{CHANGE_KEY}:{version}', change, timeout=CHANGE_TTL)
+    return version
+
+
+def _get_pending_changes(local_version: int, remote_version: int) -> set[int] | None:
+    if not 0 < remote_version - local_version <= MAX_INCREMENTAL_CHANGES:
+        return None
+    keys = [f'{CHANGE_KEY}:{version}' for version in range(local_version + 1, remote_version + 1)]
+    changes = cache.get_many(keys)
+    if len(changes) != len(keys) or FULL_REBUILD in changes.values():
+        return None
+    return set(changes.values())
+
+
+def get_facet_index() -> FacetIndex:
+    global _index
+
+    remote_version = _get_remote_version()
+    with _index_lock:
+        if _index is not None and _index.version == remote_version:
+            return _index
+
+        if _index is not None and (changes := _get_pending_changes(_index.version, remote_version)) is not None:
+            _index = _index.with_changes(remote_version, changes)
+            return _index
+
+        payload = cache.get(PAYLOAD_KEY)
+        if payload is not None and payload['version'] == remote_version:
+            _index = FacetIndex.from_payload(payload)
+        else:
+            _index = FacetIndex.build(remote_version)
+            cache.set(PAYLOAD_KEY, _index.to_payload(), timeout=None)
+        return _index
+
+
+def rebuild_facet_index() -> FacetIndex:
+    global _index
+
+    index = FacetIndex.build(_bump_version(FULL_REBUILD))
+    cache.set(PAYLOAD_KEY, index.to_payload(), timeout=None)
+    with _index_lock:
+        _index = index
+    return index
+
+
+def get_facet_counts(selection: FacetSelection, base_ids: QuerySet | None, cache_key: str) -> dict:
+    # base_ids narrows the counts to species matched by the non-facet filters, None means all species. cache_key has
+    # to change whenever base_ids can
+    index = get_facet_index()
+    key = f'{COUNTS_KEY}:v{index.version}:{cache_key}'
+    if (result := cache.get(key)) is not None:
+        return result
+
+    base = index.all_bitmap if base_ids is None else index.bitmap_for_ids(base_ids)
+    result = {
+        'count': (base & index.match(selection)).bit_count(),
+        'facets': index.counts(selection, base),
+    }
+    cache.set(key, result, timeout=settings.SEARCH_FACET_COUNTS_TTL)
+    return result
+
+
+def mark_specie_changed(specie_id: int) -> None:
+    # Other workers re-read the row when patching their index, so it has to be committed by then
+    transaction.on_commit(lambda: _bump_version(specie_id))
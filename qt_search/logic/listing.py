@@ -0,0 +1,149 @@
+import typing as t
+from types import SimpleNamespace
+
+import orjson
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+
+from common.cache import TieredCache
+from common.pagination import KeysetSequence, estimate_count, get_keyset_ordering, get_keyset_q
+from qt_search.logic.facet_index import FacetResult
+from qt_search.models import Specie, SpecieSummary
+
+CATALOGUE_VERSION_KEY = 'qt_search:catalogue_version'
+
+# Every key starts with the catalogue version, so entries never go stale: a write moves readers to new keys
+# and the old ones simply expire
+listing_cache = TieredCache(
+    'species_listing',
+    maxsize=settings.SEARCH_LISTING_LOCAL_SIZE,
+    local_ttl=settings.SEARCH_LISTING_TTL,
+    ttl=settings.SEARCH_LISTING_TTL,
+)
+summary_cache = TieredCache(
+    'species_summary',
+    maxsize=settings.SEARCH_SUMMARY_LOCAL_SIZE,
+    local_ttl=settings.SEARCH_LISTING_TTL,
+    ttl=settings.SEARCH_LISTING_TTL,
+)
+
+SUMMARY_FIELDS = ('slug', 'latin_name', 'image_url', 'main_common_name')
+SUMMARY_ORDERING = ('rating', 'specie_id')
+
+Row = tuple[int, list[t.Any]]
+
+
+def get_catalogue_version() -> int:
+    if (version := cache.get(CATALOGUE_VERSION_KEY)) is None:
+        cache.add(CATALOGUE_VERSION_KEY, 0, timeout=None)
+        version = cache.get(CATALOGUE_VERSION_KEY, 0)
+    return version
+
+
+def _incr_catalogue_version() -> None:
+    cache.add(CATALOGUE_VERSION_KEY, 0, timeout=None)
+    cache.incr(CATALOGUE_VERSION_KEY)
+
+
+def bump_catalogue_version() -> None:
+    # Bumped right away and once more after the commit, the second time drops what a concurrent request cached
+    # from the rows as they were before the commit
+    _incr_catalogue_version()
+    transaction.on_commit(_incr_catalogue_version)
+
+
+def summary_listing(species: QuerySet[Specie]) -> QuerySet[SpecieSummary]:
+    # One query walking the (lang, rating, specie) index, the filters on species become a semi-join
+    return SpecieSummary.objects.filter(
+        lang=SpecieSummary.DEFAULT_LANGUAGE,
+        specie__in=species.values('id'),
+    ).order_by(*SUMMARY_ORDERING)
+
+
+def get_specie_summaries(specie_ids: list[int], version: int) -> dict[int, dict[str, t.Any]]:
+    keys = {f'{version}:{specie_id}': specie_id for specie_id in specie_ids}
+    summaries = {keys[key]: orjson.loads(value) for key, value in summary_cache.get_many(keys).items()}
+    if missing := [specie_id for specie_id in specie_ids if specie_id not in summaries]:
+        rows = SpecieSummary.objects.filter(lang=SpecieSummary.DEFAULT_LANGUAGE, specie_id__in=missing)
+        loaded = {row.pop('specie_id'): row for row in rows.values('specie_id', *SUMMARY_FIELDS)}
+        set_specie_summaries(loaded, version)
+        summaries.update(loaded)
+    return summaries
+
+
+def set_specie_summaries(summaries: dict[int, dict[str, t.Any]], version: int) -> None:
+    summary_cache.set_many({f'{version}:{specie_id}': orjson.dumps(value) for specie_id, value in summaries.items()})
+
+
+# Listing page cache over a filtered queryset (of species or their summaries) or a facet index result. Only the
+# ordered (id, ordering values) rows of a page are cached, keyed by the catalogue version, the normalised filters and
+# the page or cursor; the rows are turned into items from the per-species summary cache. Counts are cached as well,
+# approximate ones are the planner's estimate for a queryset and exact for a facet index result.
+class CachedListing(KeysetSequence):
+    def __init__(self, source: QuerySet[Specie] | QuerySet[SpecieSummary] | FacetResult, filters_key: str):
+        self.source = source
+        self.version = get_catalogue_version()
+        self.key_prefix = f'{self.version}:{filters_key}'
+        self.from_summaries = not isinstance(source, FacetResult) and source.model is SpecieSummary
+        self.id_field = 'specie_id' if self.from_summaries else 'id'
+        if isinstance(source, FacetResult):
+            self.ordering = source.ordering
+        elif self.from_summaries:
+            self.ordering = SUMMARY_ORDERING
+        else:
+            self.ordering = get_keyset_ordering(source)
+
+    def count(self) -> int:
+        def build() -> bytes:
+            return orjson.dumps(self.source.count())
+
+        return orjson.loads(listing_cache.get_or_set(f'{self.key_prefix}:count', build))
+
+    def estimate_count(self) -> int:
+        if isinstance(self.source, FacetResult):
+            return self.count()
+
+        def build() -> bytes:
+            return orjson.dumps(estimate_count(self.source))
+
+        return orjson.loads(listing_cache.get_or_set(f'{self.key_prefix}:estimate', build))
+
+    def fetch(self, offset: int, limit: int) -> list[SimpleNamespace]:
+        def build() -> bytes:
+            if isinstance(self.source, FacetResult):
+                return orjson.dumps(self.source.fetch_rows(offset, limit))
+            return orjson.dumps(self._query_rows(self.source, offset, limit))
+
+        return self._hydrate(listing_cache.get_or_set(f'{self.key_prefix}:page:{offset}:{limit}', build))
+
+    def fetch_after(self, values: list[t.Any], limit: int) -> list[SimpleNamespace]:
+        def build() -> bytes:
+            if isinstance(self.source, FacetResult):
+                return orjson.dumps(self.source.fetch_rows_after(values, limit))
+            return orjson.dumps(self._query_rows(self.source.filter(get_keyset_q(self.ordering, values)), 0, limit))
+
+        key = f'{self.key_prefix}:after:{orjson.dumps(values).decode()}:{limit}'
+        return self._hydrate(listing_cache.get_or_set(key, build))
+
+    def _query_rows(self, queryset: QuerySet, offset: int, limit: int) -> list[Row]:
+        fields = [field.lstrip('-') for field in self.ordering]
+        columns = [self.id_field, *fields, *(SUMMARY_FIELDS if self.from_summaries else ())]
+        rows = list(queryset.order_by(*self.ordering).values_list(*columns)[offset:offset + limit])
+        if self.from_summaries:
+            # The listing fields come with the page, hydrating it then finds them in the cache
+            set_specie_summaries(
+                {row[0]: dict(zip(SUMMARY_FIELDS, row[len(fields) + 1:])) for row in rows},
+                self.version,
+            )
+        return [(row[0], list(row[1:len(fields) + 1])) for row in rows]
+
+    def _hydrate(self, document: bytes) -> list[SimpleNamespace]:
+        rows = orjson.loads(document)
+        summaries = get_specie_summaries([specie_id for specie_id, _ in rows], self.version)
+        fields = [field.lstrip('-') for field in self.ordering]
+        return [
+            SimpleNamespace(**summaries[specie_id], **dict(zip(fields, values)))
+            for specie_id, values in rows if specie_id in summaries
+        ]
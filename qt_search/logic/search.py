@@ -0,0 +1,72 @@
+import re
+import typing as t
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F, Q, QuerySet
+
+from qt_search.models import Specie
+
+SEARCH_CONFIG = 'simple'
+SEARCH_TOKEN_RE = re.compile(r'\w+')
+
+DOCUMENT_SELECT_SQL = f'''
+    SELECT
+        s.id,
+        concat_ws(' ', s.latin_name, cn.names, sy.names),
+        setweight(to_tsvector('{SEARCH_CONFIG}', s.latin_name), 'A')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(cn.names, '')), 'B')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(sy.names, '')), 'C')
+    FROM qt_search_specie s
+    LEFT JOIN LATERAL (
+        SELECT string_agg(name, ' ') AS names FROM qt_search_commonname WHERE specie_id = s.id
+    ) cn ON true
+    LEFT JOIN LATERAL (
+        SELECT string_agg(name, ' ') AS names FROM qt_search_synonym WHERE specie_id = s.id
+    ) sy ON true
+    WHERE s.id = ANY(%s)
+'''  # noqa: S608
+
+UPSERT_DOCUMENTS_SQL = f'''
+    INSERT INTO qt_search_speciesearchdocument (specie_id, document, search_vector)
+    {DOCUMENT_SELECT_SQL}
+    ON CONFLICT (specie_id) DO UPDATE
+    SET document = EXCLUDED.document, search_vector = EXCLUDED.search_vector
+'''  # noqa: S608
+
+# Only touches existing documents, so it is safe to run while a species is being cascade deleted
+UPDATE_DOCUMENTS_SQL = f'''
+    UPDATE qt_search_speciesearchdocument d
+    SET document = src.document, search_vector = src.search_vector
+    FROM ({DOCUMENT_SELECT_SQL}) AS src (specie_id, document, search_vector)
+    WHERE d.specie_id = src.specie_id
+'''  # noqa: S608
+
+
+def refresh_search_documents(specie_ids: t.Iterable[int], create: bool = True) -> None:
+    if not (specie_ids := list(specie_ids)):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(UPSERT_DOCUMENTS_SQL if create else UPDATE_DOCUMENTS_SQL, [specie_ids])
+
+
+def get_prefix_search_query(value: str) -> SearchQuery | None:
+    if not (tokens := SEARCH_TOKEN_RE.findall(value.lower())):
+        return None
+    raw_query = ' & '.join(f'{token}:*' for token in tokens)
+    return SearchQuery(raw_query, search_type='raw', config=SEARCH_CONFIG)
+
+
+def get_search_q(value: str) -> Q:
+    # Prefix matching goes through tsvector, typos are caught by pg_trgm word similarity
+    q = Q(search_document__document__trigram_word_similar=value)
+    if query := get_prefix_search_query(value):
+        q |= Q(search_document__search_vector=query)
+    return q
+
+
+def order_by_search_rank(queryset: QuerySet[Specie], value: str) -> QuerySet[Specie]:
+    rank = TrigramWordSimilarity(value, 'search_document__document')
+    if query := get_prefix_search_query(value):
+        rank += SearchRank(F('search_document__search_vector'), query)
+    return queryset.annotate(search_rank=rank).order_by('-search_rank', 'rating', 'id')
@@ -0,0 +1,54 @@
+import typing as t
+
+from django.db import connection
+
+from qt_search.logic.facet_index import BIT_FACETS, CHOICE_FACETS
+from qt_search.models import SpecieSummary
+
+_COLUMNS = ', '.join(('rating', *BIT_FACETS, *CHOICE_FACETS))
+_VALUES = ', '.join((
+    's.rating',
+    *(f'coalesce(s.{field_name}, 0)' for field_name in BIT_FACETS),
+    *(f's.{field_name}' for field_name in CHOICE_FACETS),
+))
+_UPDATES = ', '.join(
+    f'{column} = EXCLUDED.{column}'
+    for column in ('slug', 'latin_name', 'image_url', 'main_common_name', 'rating', *BIT_FACETS, *CHOICE_FACETS)
+)
+
+SUMMARY_SELECT_SQL = f'''
+    SELECT s.id, l.lang, s.slug, s.latin_name, s.image_url, cn.name, {_VALUES}
+    FROM qt_search_specie s
+    CROSS JOIN unnest(%s::varchar[]) AS l (lang)
+    LEFT JOIN LATERAL (
+        SELECT name FROM qt_search_commonname
+        WHERE specie_id = s.id AND lang = l.lang AND is_main
+        ORDER BY id
+        LIMIT 1
+    ) cn ON true
+    WHERE s.id = ANY(%s)
+'''  # noqa: S608
+
+UPSERT_SUMMARIES_SQL = f'''
+    INSERT INTO qt_search_speciesummary (specie_id, lang, slug, latin_name, image_url, main_common_name, {_COLUMNS})
+    {SUMMARY_SELECT_SQL}
+    ON CONFLICT (specie_id, lang) DO UPDATE SET {_UPDATES}
+'''  # noqa: S608
+
+# Only touches existing rows, so it is safe to run while a species is being cascade deleted
+UPDATE_SUMMARIES_SQL = f'''
+    UPDATE qt_search_speciesummary d
+    SET main_common_name = src.main_common_name
+    FROM ({SUMMARY_SELECT_SQL}) AS src (specie_id, lang, slug, latin_name, image_url, main_common_name)
+    WHERE d.specie_id = src.specie_id AND d.lang = src.lang
+'''  # noqa: S608
+
+
+def refresh_specie_summaries(specie_ids: t.Iterable[int], create: bool = True) -> None:
+    if not (specie_ids := list(specie_ids)):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            UPSERT_SUMMARIES_SQL if create else UPDATE_SUMMARIES_SQL,
+            [list(SpecieSummary.LANGUAGES), specie_ids],
+        )
@@ -0,0 +1,68 @@
+import time
+import typing as t
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, RequestFactory
+from ninja.parser import Parser
+from ninja.renderers import JSONRenderer
+
+from common.renderers import ORJSONParser, ORJSONRenderer
+from qt_search.models import Specie
+from qt_search.schemas.specie import SpeciesPageSchema
+
+
+# Requests per second of the listing endpoints (caches warmed by the first request) and the cost of rendering and
+# parsing their payloads with ninja's stdlib JSON renderer and parser against the orjson ones the API uses
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--host', default='localhost', help='Must be in ALLOWED_HOSTS.')
+
+    def handle(self, *args, **options):
+        client = Client(SERVER_NAME=options['host'])
+        urls = {
+            'listing': f'/api/search/species?page_size={options["page_size"]}',
+            'listing (cursor)': f'/api/search/species?cursor=&page_size={options["page_size"]}',
+            'facets': '/api/search/species/facets',
+        }
+        payloads = {}
+        for name, url in urls.items():
+            if (resp := client.get(url)).status_code != 200:
+                raise CommandError(f'{url}: {resp.status_code} {resp.content[:200]!r}')
+            payloads[name] = resp.json()
+            self.stdout.write(f'{name}: {self.throughput(client, url, options["requests"]):.0f} req/s')
+
+        payloads['listing'] = SpeciesPageSchema(**payloads['listing']).model_dump()
+        request = RequestFactory().get('/')
+        for name, payload in payloads.items():
+            stdlib_time = self.measure(JSONRenderer().render, request, payload, response_status=200)
+            orjson_time = self.measure(ORJSONRenderer().render, request, payload, response_status=200)
+            self.stdout.write(self.compare(f'render {name}', stdlib_time, orjson_time))
+
+        slugs = list(Specie.objects.order_by('rating', 'id').values_list('slug', flat=True)[:50])
+        request = RequestFactory().post('/', {'slugs': slugs}, content_type='application/json')
+        stdlib_time = self.measure(Parser().parse_body, request)
+        orjson_time = self.measure(ORJSONParser().parse_body, request)
+        self.stdout.write(self.compare('parse batch request', stdlib_time, orjson_time))
+
+    @staticmethod
+    def throughput(client: Client, url: str, requests: int) -> float:
+        started = time.perf_counter()
+        for _ in range(requests):
+            client.get(url)
+        return requests / (time.perf_counter() - started)
+
+    @staticmethod
+    def measure(call: t.Callable[..., t.Any], *args, number: int = 2000, **kwargs) -> float:
+        started = time.perf_counter()
+        for _ in range(number):
+            call(*args, **kwargs)
+        return (time.perf_counter() - started) / number
+
+    @staticmethod
+    def compare(name: str, stdlib_time: float, orjson_time: float) -> str:
+        return (
+            f'{name}: json {stdlib_time * 1e6:.1f} us, orjson {orjson_time * 1e6:.1f} us '
+            f'({stdlib_time / orjson_time:.1f}x)'
+        )
@@ -0,0 +1,66 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+
+
+# Latency of the species listing under the database connection handling of the current settings; run it with
+# POSTGRES_CONN_MAX_AGE=0, the default persistent connections and POSTGRES_POOL_SIZE set to compare them. Requests
+# close their connections the way the request handler does (the test client skips it), --thread-per-request runs
+# every request in a new thread like ASGI runs sync views
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=1, help='Requests in flight.')
+        parser.add_argument('--thread-per-request', action='store_true')
+        parser.add_argument('--url', default='/api/search/species?page_size=20')
+        parser.add_argument('--host', default='localhost', help='Must be in ALLOWED_HOSTS.')
+
+    def handle(self, *args, **options):
+        client = Client(SERVER_NAME=options['host'])
+        url = options['url']
+        if (resp := client.get(url)).status_code != 200:
+            raise CommandError(f'{url}: {resp.status_code} {resp.content[:200]!r}')
+        connections.close_all()
+
+        latencies: list[float] = []
+        opened: list[str] = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        def request() -> None:
+            started = time.perf_counter()
+            close_old_connections()
+            client.get(url)
+            close_old_connections()
+            latencies.append(time.perf_counter() - started)
+
+        def request_in_thread() -> None:
+            thread = threading.Thread(target=request)
+            thread.start()
+            thread.join()
+
+        connection_created.connect(count_connection)
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(options['concurrency']) as executor:
+                call = request_in_thread if options['thread_per_request'] else request
+                for future in [executor.submit(call) for _ in range(options['requests'])]:
+                    future.result()
+        finally:
+            connection_created.disconnect(count_connection)
+        elapsed = time.perf_counter() - started
+
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f'{url}: p50 {percentiles[49] * 1e3:.2f} ms, p99 {percentiles[98] * 1e3:.2f} ms, '
+            f'{len(latencies) / elapsed:.0f} req/s, {len(opened)} connects',
+        )
+        if (pool := getattr(connections['default'], 'pool', None)) is not None:
+            self.stdout.write(f'pool: {pool.stats()}')
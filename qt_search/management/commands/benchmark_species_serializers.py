@@ -0,0 +1,58 @@
+import time
+import typing as t
+
+import orjson
+from django.core.management.base import BaseCommand, CommandError
+from ninja.responses import NinjaJSONEncoder
+
+from qt_search.logic.details import specie_details_queryset
+from qt_search.schemas.serializers import serialize_specie, serialize_specie_details
+from qt_search.schemas.specie import SpeciesDetailsSchema, SpeciesSchema
+
+
+# Per-object cost of rendering the same prefetched species through the pydantic schemas and the plain serializers.
+# Database time is left out, the species are loaded once up front
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=200, help='Species to render.')
+        parser.add_argument('--rounds', type=int, default=5, help='Best of this many rounds is reported.')
+
+    def handle(self, *args, **options):
+        species = list(specie_details_queryset().order_by('rating', 'id')[:options['limit']])
+        if not species:
+            raise CommandError('No species to render')
+
+        default = NinjaJSONEncoder().default
+
+        def dump(data: t.Any) -> bytes:
+            return orjson.dumps(data, default=default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+
+        cases = {
+            'listing': (
+                lambda specie: dump(SpeciesSchema.from_orm(specie).model_dump()),
+                lambda specie: dump(serialize_specie(specie)),
+            ),
+            'details': (
+                lambda specie: dump(SpeciesDetailsSchema.from_orm(specie).model_dump()),
+                lambda specie: dump(serialize_specie_details(specie)),
+            ),
+        }
+        for name, (schema_render, fast_render) in cases.items():
+            if any(schema_render(specie) != fast_render(specie) for specie in species):
+                raise CommandError(f'{name}: serializer output differs from the schema')
+            schema_time = self.measure(schema_render, species, options['rounds'])
+            fast_time = self.measure(fast_render, species, options['rounds'])
+            self.stdout.write(
+                f'{name}: schema {schema_time * 1e6:.1f} us, serializer {fast_time * 1e6:.1f} us per species '
+                f'({schema_time / fast_time:.1f}x)',
+            )
+
+    @staticmethod
+    def measure(render: t.Callable[[t.Any], bytes], species: list, rounds: int) -> float:
+        best = float('inf')
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for specie in species:
+                render(specie)
+            best = min(best, time.perf_counter() - started)
+        return best / len(species)
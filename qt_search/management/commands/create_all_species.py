@@ -1,33 +1,55 @@
-import json
 import os
-import zipfile
 
-from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.core.management.base import BaseCommand, CommandError
 from tqdm import tqdm
 
-from common.models import SpeciesModel
-from common.utils.mock_species import create_db_specie
+from common.utils.species_import import ImportStats, SpeciesImportError
+from common.utils.species_pipeline import ImportCheckpoint, SpeciesImportPipeline, iter_zip_members
 
 SPECIES_DATA_FOLDER = 'qt_search/management/commands/data/species-data'
 
 
 class Command(BaseCommand):
-    def handle(self, *args, **options):  # noqa: C901
-        try:
-            list_zips = os.listdir(SPECIES_DATA_FOLDER)
-        except FileNotFoundError:
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--workers', type=int, default=0, help='Parser processes, 0 parses in the main process.')
+        parser.add_argument('--writers', type=int, default=1, help='Database writer processes used with --workers.')
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Re-import stored species whose data changed instead of skipping them.',
+        )
+        parser.add_argument('--resume', action='store_true', help='Continue after the last committed zip member.')
+        parser.add_argument('--checkpoint', default=os.path.join(SPECIES_DATA_FOLDER, '.import-checkpoint.json'))
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(SPECIES_DATA_FOLDER):
             return
-        for zip_filename in list_zips:
-            if not zip_filename.endswith('.zip'):
-                continue
-            with zipfile.ZipFile(f'{SPECIES_DATA_FOLDER}/{zip_filename}', 'r') as zip_file:
-                for json_filename in tqdm(zip_file.namelist()):
-                    if not json_filename.endswith('.json'):
-                        continue
-                    with zip_file.open(json_filename) as json_file:
-                        json_content = json_file.read()
-                        data = json.loads(json_content)
-                        sp = SpeciesModel(**data)
-                        with transaction.atomic():
-                            create_db_specie(sp)
+
+        checkpoint = ImportCheckpoint(options['checkpoint'])
+        last_done = checkpoint.load() if options['resume'] else None
+        if last_done is None:
+            checkpoint.clear()
+
+        try:
+            members = ImportCheckpoint.skip_done(iter_zip_members(SPECIES_DATA_FOLDER), last_done)
+        except SpeciesImportError as e:
+            raise CommandError(f'Cannot resume, rerun without --resume to start over: {e}') from e
+        pipeline = SpeciesImportPipeline(
+            workers=options['workers'],
+            writers=options['writers'],
+            batch_size=options['batch_size'],
+            update=options['update'],
+            checkpoint=checkpoint,
+            on_batch=self.report,
+        )
+        try:
+            stats = pipeline.run(tqdm(members))
+        except SpeciesImportError as e:
+            raise CommandError(f'Import failed, rerun with --resume to continue:\n{e}') from e
+
+        checkpoint.clear()
+        self.stdout.write(self.style.SUCCESS(f'Imported {stats}'))
+
+    def report(self, stats: ImportStats) -> None:
+        tqdm.write(str(stats), file=self.stdout)
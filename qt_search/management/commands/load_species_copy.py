@@ -0,0 +1,31 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from tqdm import tqdm
+
+from common.utils.species_copy import SpeciesCopyLoader
+from common.utils.species_import import ImportStats, SpeciesImportError
+from common.utils.species_pipeline import ZipMemberReader, iter_zip_members
+
+SPECIES_DATA_FOLDER = 'qt_search/management/commands/data/species-data'
+
+
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--folder', default=SPECIES_DATA_FOLDER)
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options['folder']):
+            raise CommandError(f'{options["folder"]} does not exist')
+
+        try:
+            with ZipMemberReader() as reader:
+                species = (sp for _, sp in map(reader.parse, tqdm(iter_zip_members(options['folder']))))
+                stats = SpeciesCopyLoader(batch_size=options['batch_size']).load(species, on_batch=self.report)
+        except SpeciesImportError as e:
+            raise CommandError(str(e)) from e
+        self.stdout.write(self.style.SUCCESS(f'Loaded {stats}'))
+
+    def report(self, stats: ImportStats) -> None:
+        tqdm.write(str(stats), file=self.stdout)
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+
+from qt_search.logic.facet_index import rebuild_facet_index
+
+
+class Command(BaseCommand):
+    def handle(self, *args, **options):
+        index = rebuild_facet_index()
+        self.stdout.write(f'Facet index v{index.version}: {len(index)} species, {len(index.bitmaps)} bitmaps')
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from qt_search.logic.details import warm_specie_details
+from qt_search.models import Specie
+
+
+class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000, help='Most popular species to prebuild, 0 for all.')
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        species = Specie.objects.order_by('rating', 'id')
+        if options['limit']:
+            species = species[:options['limit']]
+        count = warm_specie_details(species, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Cached {count} species details documents'))
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+BACKFILL_SQL = """
+    INSERT INTO qt_search_speciesearchdocument (specie_id, document, search_vector)
+    SELECT
+        s.id,
+        concat_ws(' ', s.latin_name, cn.names, sy.names),
+        setweight(to_tsvector('simple', s.latin_name), 'A')
+        || setweight(to_tsvector('simple', coalesce(cn.names, '')), 'B')
+        || setweight(to_tsvector('simple', coalesce(sy.names, '')), 'C')
+    FROM qt_search_specie s
+    LEFT JOIN LATERAL (
+        SELECT string_agg(name, ' ') AS names FROM qt_search_commonname WHERE specie_id = s.id
+    ) cn ON true
+    LEFT JOIN LATERAL (
+        SELECT string_agg(name, ' ') AS names FROM qt_search_synonym WHERE specie_id = s.id
+    ) sy ON true
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qt_search', '0003_rename_image_url_source_source_url'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='SpecieSearchDocument',
+            fields=[
+                ('specie', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='qt_search.specie')),
+                ('document', models.TextField(default='', help_text='Latin name, common names and synonyms of the species.')),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+            ],
+            options={
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='specie_search_vector_idx'), django.contrib.postgres.indexes.GinIndex(fields=['document'], name='specie_search_trgm_idx', opclasses=['gin_trgm_ops'])],
+            },
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
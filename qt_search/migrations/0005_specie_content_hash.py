@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 15:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qt_search', '0004_specie_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='specie',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', help_text='Fingerprint of the imported data, re-imports skip species whose data did not change.', max_length=64),
+        ),
+    ]
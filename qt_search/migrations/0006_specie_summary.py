@@ -0,0 +1,70 @@
+# Generated by Django 5.0.6 on 2026-10-18 16:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BACKFILL_SQL = """
+    INSERT INTO qt_search_speciesummary (
+        specie_id, lang, slug, latin_name, image_url, main_common_name, rating,
+        soil_type, soil_moisture, soil_ph, position_sunlight, position_side, edible_part,
+        fragrance, harvest, planting, foliage, toxicity, habit, exposure, duration
+    )
+    SELECT
+        s.id, 'en', s.slug, s.latin_name, s.image_url, cn.name, s.rating,
+        coalesce(s.soil_type, 0), coalesce(s.soil_moisture, 0), coalesce(s.soil_ph, 0),
+        coalesce(s.position_sunlight, 0), coalesce(s.position_side, 0), coalesce(s.edible_part, 0),
+        coalesce(s.fragrance, 0), coalesce(s.harvest, 0), coalesce(s.planting, 0),
+        coalesce(s.foliage, 0), coalesce(s.toxicity, 0), coalesce(s.habit, 0), s.exposure, s.duration
+    FROM qt_search_specie s
+    LEFT JOIN LATERAL (
+        SELECT name FROM qt_search_commonname
+        WHERE specie_id = s.id AND lang = 'en' AND is_main
+        ORDER BY id
+        LIMIT 1
+    ) cn ON true
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qt_search', '0005_specie_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpecieSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lang', models.CharField(max_length=8)),
+                ('slug', models.SlugField(db_index=False, max_length=256)),
+                ('latin_name', models.CharField(max_length=256)),
+                ('image_url', models.URLField(blank=True, null=True)),
+                ('main_common_name', models.CharField(max_length=256, null=True)),
+                ('rating', models.PositiveIntegerField()),
+                ('soil_type', models.BigIntegerField(default=0)),
+                ('soil_moisture', models.BigIntegerField(default=0)),
+                ('soil_ph', models.BigIntegerField(default=0)),
+                ('position_sunlight', models.BigIntegerField(default=0)),
+                ('position_side', models.BigIntegerField(default=0)),
+                ('edible_part', models.BigIntegerField(default=0)),
+                ('fragrance', models.BigIntegerField(default=0)),
+                ('harvest', models.BigIntegerField(default=0)),
+                ('planting', models.BigIntegerField(default=0)),
+                ('foliage', models.BigIntegerField(default=0)),
+                ('toxicity', models.BigIntegerField(default=0)),
+                ('habit', models.BigIntegerField(default=0)),
+                ('exposure', models.CharField(max_length=64, null=True)),
+                ('duration', models.CharField(max_length=64, null=True)),
+                ('specie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='qt_search.specie')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['lang', 'rating', 'specie'], name='specie_summary_order_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='speciesummary',
+            constraint=models.UniqueConstraint(fields=('specie', 'lang'), name='specie_summary_lang_uniq'),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
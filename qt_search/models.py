@@ -1,6 +1,8 @@
 from enum import Enum
 
 from bitfield import BitField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils.text import slugify
 
@@ -250,6 +252,12 @@ class Specie(models.Model):
     modified = models.DateTimeField(auto_now=True)
 
     misc = models.JSONField(null=True, blank=True)
+    content_hash = models.CharField(
+        default='',
+        blank=True,
+        max_length=64,
+        help_text='Fingerprint of the imported data, re-imports skip species whose data did not change.',
+    )
 
     def save(self, *args, **kwargs):
         self.slug = slugify(self.latin_name)
@@ -259,6 +267,67 @@ class Specie(models.Model):
         return self.latin_name
 
 
+class SpecieSearchDocument(models.Model):
+    specie = models.OneToOneField(
+        Specie,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='search_document',
+    )
+    document = models.TextField(default='', help_text='Latin name, common names and synonyms of the species.')
+    search_vector = SearchVectorField(null=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='specie_search_vector_idx'),
+            GinIndex(fields=['document'], name='specie_search_trgm_idx', opclasses=['gin_trgm_ops']),
+        ]
+
+    def __str__(self):
+        return self.document
+
+
+# Denormalised listing row, one per species and language: what a list response shows plus the sort key and the
+# facet columns. Kept in sync by signals and the importers, see qt_search.logic.summary
+class SpecieSummary(models.Model):
+    LANGUAGES = ('en',)
+    DEFAULT_LANGUAGE = 'en'
+
+    specie = models.ForeignKey(Specie, on_delete=models.CASCADE, related_name='summaries')
+    lang = models.CharField(max_length=8)
+    slug = models.SlugField(max_length=256, db_index=False)
+    latin_name = models.CharField(max_length=256)
+    image_url = models.URLField(null=True, blank=True)
+    main_common_name = models.CharField(null=True, max_length=256)
+    rating = models.PositiveIntegerField()
+
+    soil_type = models.BigIntegerField(default=0)
+    soil_moisture = models.BigIntegerField(default=0)
+    soil_ph = models.BigIntegerField(default=0)
+    position_sunlight = models.BigIntegerField(default=0)
+    position_side = models.BigIntegerField(default=0)
+    edible_part = models.BigIntegerField(default=0)
+    fragrance = models.BigIntegerField(default=0)
+    harvest = models.BigIntegerField(default=0)
+    planting = models.BigIntegerField(default=0)
+    foliage = models.BigIntegerField(default=0)
+    toxicity = models.BigIntegerField(default=0)
+    habit = models.BigIntegerField(default=0)
+    exposure = models.CharField(null=True, max_length=64)
+    duration = models.CharField(null=True, max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['specie', 'lang'], name='specie_summary_lang_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['lang', 'rating', 'specie'], name='specie_summary_order_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.latin_name}::{self.lang}'
+
+
 # There are duplicates by name for one plant, they need to be removed and added accordingly. constrain
 class CommonName(models.Model):
     specie = models.ForeignKey(Specie, on_delete=models.CASCADE, related_name='common_names')
@@ -0,0 +1,6 @@
+from ninja import Schema
+
+
+class FacetCountsSchema(Schema):
+    count: int
+    facets: dict[str, dict[str, int]]
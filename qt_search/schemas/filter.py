@@ -1,9 +1,13 @@
+import hashlib
 import typing as t
 
+import orjson
 from django.db.models import Q, TextChoices
 from ninja import Field, FilterSchema
 from pydantic.fields import FieldInfo
 
+from qt_search.logic.facet_index import FACET_FIELDS, FacetSelection
+from qt_search.logic.search import get_search_q
 from qt_search.models import Specie
 
 BIT_FIELD_VALUES = {
@@ -23,14 +27,7 @@ BIT_FIELD_VALUES = {
 
 
 class FiltersSchema(FilterSchema):
-    search: str = Field(
-        None,
-        q=[
-            'latin_name__icontains',
-            'common_names__name__icontains',
-            'synonyms__name__icontains'
-        ],
-    )
+    search: str = Field(None, max_length=256)
     tag: str = Field(None, q=['tags__name__icontains'])
 
     soil_type: list[Specie.SoilTypeChoices] = None
@@ -66,7 +63,34 @@ class FiltersSchema(FilterSchema):
     spread_cm_to_gte: int = Field(None, q=['spread_cm__to_value__gte'], gt=0)
     spread_cm_to_lte: int = Field(None, q=['spread_cm__to_value__lte'], gt=0)
 
+    def get_filter_values(self) -> dict[str, t.Any]:
+        values = {}
+        for field_name, value in self.model_dump(exclude_none=True).items():
+            if value in ('', []):
+                continue
+            values[field_name] = sorted(str(choice) for choice in value) if isinstance(value, list) else value
+        return values
+
+    def get_cache_key(self) -> str:
+        # Same key for the same filters regardless of parameter and value order
+        return hashlib.sha256(orjson.dumps(self.get_filter_values(), option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+    def get_facet_values(self) -> FacetSelection:
+        return {name: value for name, value in self.get_filter_values().items() if name in FACET_FIELDS}
+
+    def has_non_facet_filters(self) -> bool:
+        return any(name not in FACET_FIELDS for name in self.get_filter_values())
+
+    def without_facets(self) -> 'FiltersSchema':
+        return self.model_copy(update=dict.fromkeys(FACET_FIELDS))
+
+    def get_facet_selection(self) -> FacetSelection | None:
+        # None when some filter can't be answered by the facet index and the query has to go to Postgres
+        return None if self.has_non_facet_filters() else self.get_facet_values()
+
     def _resolve_field_expression(self, field_name: str, field_value: t.Any, field: FieldInfo) -> Q:
+        if field_name == 'search' and field_value:
+            return get_search_q(field_value)
         if field_name in BIT_FIELD_VALUES and field_value:
             return self._filter_bit_field(field_name, field_value)
         return super()._resolve_field_expression(field_name, field_value, field)
@@ -0,0 +1,238 @@
+import typing as t
+
+from django.db import models
+
+from qt_search.models import DistributionSpecie, GrowthTip, PartColor, Pathogen, RegularEvent, Specie
+
+# Plain-dict serializers producing exactly what SpeciesSchema and SpeciesDetailsSchema dump, without building
+# pydantic models per object. Choice labels and bit masks are looked up once at import time.
+
+Serializer = t.Callable[[t.Any], t.Any]
+
+PLANT_PARTS = tuple(Specie.PlantPartsChoices.values)
+PATHOGEN_TYPES = tuple(Pathogen.PathogenTypesChoices.values)
+GROWTH_TIP_TYPES = tuple(GrowthTip.GrowthTipChoices.values)
+
+
+def _labels(model: type[models.Model], field_name: str) -> dict[str, str]:
+    return dict(model._meta.get_field(field_name).flatchoices)
+
+
+def _choice(model: type[models.Model], field_name: str) -> t.Callable[[str], dict[str, str]]:
+    # Same label as get_<field>_display()
+    labels = _labels(model, field_name)
+
+    def serialize(value: str) -> dict[str, str]:
+        return {'value': value, 'label': labels.get(value, value)}
+
+    return serialize
+
+
+def _optional_choice(model: type[models.Model], field_name: str) -> Serializer:
+    choice = _choice(model, field_name)
+
+    def serialize(obj: models.Model) -> dict[str, str] | None:
+        value = getattr(obj, field_name)
+        return choice(value) if value else None
+
+    return serialize
+
+
+def _bits(model: type[models.Model], field_name: str) -> t.Callable[[t.Any], list[dict[str, str]]]:
+    # Same items as BitHandler.get_set_data(), in flag order
+    field = model._meta.get_field(field_name)
+    table = [(1 << bit, flag, label) for bit, (flag, label) in enumerate(zip(field.flags, field.labels))]
+
+    def serialize(handler: t.Any) -> list[dict[str, str]]:
+        if handler is None:
+            return []
+        value = int(handler)
+        return [{'value': flag, 'label': label} for mask, flag, label in table if value & mask]
+
+    return serialize
+
+
+def _specie_bits(field_name: str) -> Serializer:
+    bits = _bits(Specie, field_name)
+    return lambda specie: bits(getattr(specie, field_name))
+
+
+def _interval(interval: t.Any) -> dict[str, int | None] | None:
+    if interval is None:
+        return None
+    return {'from_value': interval.from_value, 'to_value': interval.to_value}
+
+
+def _main_common_name(obj: t.Any) -> str | None:
+    # Cached listing rows carry the name itself, ORM rows the prefetched main names
+    if isinstance(obj.main_common_name, str):
+        return obj.main_common_name
+    if main_common_name := next(iter(obj.main_common_name or []), None):
+        return main_common_name.name
+    return None
+
+
+def _sources(specie: Specie) -> list[dict[str, t.Any]]:
+    return [
+        {
+            'last_update': source.last_update,
+            'sid': source.sid,
+            'name': source.name,
+            'source_url': source.source_url,
+            'citation': source.citation,
+        }
+        for source in specie.sources.all()
+    ]
+
+
+def _common_names(specie: Specie) -> dict[str, list[str]]:
+    grouped: dict[str, list[str]] = {}
+    for common_name in specie.common_names.all():
+        grouped.setdefault(common_name.lang, []).append(common_name.name.capitalize())
+    return grouped
+
+
+def _images(specie: Specie) -> dict[str, list[dict[str, str]]]:
+    grouped: dict[str, list[dict[str, str]]] = {part: [] for part in PLANT_PARTS}
+    for image in specie.images.all():
+        if (part := grouped.get(image.part)) is None:
+            raise ValueError("'plant_part' not founded")
+        part.append({'image_url': image.image_url, 'image_copyright': image.image_copyright})
+    return grouped
+
+
+def _grouped_names(
+        relation: str,
+        type_field: str,
+        types: tuple[str, ...],
+) -> t.Callable[[Specie], dict[str, list[str]]]:
+    # Types outside the schema are dropped, like pydantic ignores extra keys
+    def serialize(specie: Specie) -> dict[str, list[str]]:
+        grouped: dict[str, list[str]] = {item_type: [] for item_type in types}
+        for item in getattr(specie, relation).all():
+            if (names := grouped.get(getattr(item, type_field))) is not None:
+                names.append(item.name)
+        return grouped
+
+    return serialize
+
+
+_distribution_statuses = _bits(DistributionSpecie, 'statuses')
+
+
+def _distributions(specie: Specie) -> list[dict[str, t.Any]]:
+    return [
+        {
+            'statuses': _distribution_statuses(item.statuses),
+            'name': item.distribution.name,
+            'tdwg_code': item.distribution.tdwg_code,
+            'tdwg_level': item.distribution.tdwg_level,
+            'species_count': item.distribution.species_count,
+        }
+        for item in specie.distributions_specie.all()
+    ]
+
+
+_frequency_unit = _choice(RegularEvent, 'frequency_unit')
+
+
+def _regular_events(specie: Specie) -> list[dict[str, t.Any]]:
+    return [
+        {
+            'frequency': _interval(event.frequency),
+            'frequency_unit': _frequency_unit(event.frequency_unit),
+            'name': event.name,
+            'frequency_count': event.frequency_count,
+        }
+        for event in specie.regular_events.all()
+    ]
+
+
+_season = _choice(PartColor, 'season')
+
+
+def _parts_color(specie: Specie) -> dict[str, list[dict[str, t.Any]]]:
+    grouped: dict[str, list[dict[str, t.Any]]] = {part: [] for part in PLANT_PARTS}
+    for item in specie.parts_color.all():
+        if (part := grouped.get(item.plant_part)) is None:
+            raise ValueError("'plant_part' not founded")
+        part.append({
+            'season': _season(item.season) if item.season else None,
+            'colors': [color.name for color in item.colors_part.all()],
+        })
+    return grouped
+
+
+def _scientific_classification(specie: Specie) -> dict[str, t.Any] | None:
+    if (classification := specie.scientific_classification) is None:
+        return None
+    return {
+        'orders': [order.name for order in classification.orders.all()],
+        'family': classification.family,
+        'phylum': classification.phylum,
+        'classify': classification.classify,
+        'genus': classification.genus,
+        'species': classification.species,
+    }
+
+
+# In SpeciesDetailsSchema field order
+DETAIL_SERIALIZERS: dict[str, Serializer] = {
+    'main_common_name': _main_common_name,
+    'tags': lambda specie: [tag.name for tag in specie.tags.all()],
+    'synonyms': lambda specie: [synonym.name for synonym in specie.synonyms.all()],
+    'sources': _sources,
+    'common_names': _common_names,
+    'images': _images,
+    'pathogens': _grouped_names('pathogens', 'pathogen_type', PATHOGEN_TYPES),
+    'growth_tips': _grouped_names('growth_tips', 'tip_type', GROWTH_TIP_TYPES),
+    'distributions': _distributions,
+    'regular_events': _regular_events,
+    'parts_color': _parts_color,
+    'exposure': _optional_choice(Specie, 'exposure'),
+    'duration': _optional_choice(Specie, 'duration'),
+    'edible_part': _specie_bits('edible_part'),
+    'soil_type': _specie_bits('soil_type'),
+    'soil_moisture': _specie_bits('soil_moisture'),
+    'soil_ph': _specie_bits('soil_ph'),
+    'position_sunlight': _specie_bits('position_sunlight'),
+    'position_side': _specie_bits('position_side'),
+    'fragrance': _specie_bits('fragrance'),
+    'harvest': _specie_bits('harvest'),
+    'planting': _specie_bits('planting'),
+    'toxicity': _specie_bits('toxicity'),
+    'foliage': _specie_bits('foliage'),
+    'habit': _specie_bits('habit'),
+    'height_cm': lambda specie: _interval(specie.height_cm),
+    'years_to_max_height': lambda specie: _interval(specie.years_to_max_height),
+    'spread_cm': lambda specie: _interval(specie.spread_cm),
+    'scientific_classification': _scientific_classification,
+    'slug': lambda specie: specie.slug,
+    'latin_name': lambda specie: specie.latin_name,
+    'image_url': lambda specie: specie.image_url,
+    'genus_description': lambda specie: specie.genus_description,
+    'edible': lambda specie: specie.edible,
+    'rating': lambda specie: specie.rating,
+    'cultivation': lambda specie: specie.cultivation,
+    'created': lambda specie: specie.created,
+    'modified': lambda specie: specie.modified,
+    'misc': lambda specie: specie.misc,
+}
+
+
+def serialize_specie(obj: t.Any) -> dict[str, t.Any]:
+    return {
+        'main_common_name': _main_common_name(obj),
+        'slug': obj.slug,
+        'latin_name': obj.latin_name,
+        'image_url': obj.image_url,
+    }
+
+
+def serialize_specie_details(specie: Specie, fields: t.Container[str] | None = None) -> dict[str, t.Any]:
+    # Relations of fields left out are never touched
+    return {
+        name: serialize(specie)
+        for name, serialize in DETAIL_SERIALIZERS.items()
+        if fields is None or name in fields
+    }
@@ -2,10 +2,12 @@ import typing as t
 from collections import defaultdict
 
 import annotated_types
+from django.conf import settings
 from ninja import Field, ModelSchema, Schema
 from pydantic import create_model as create_pydantic_model
 from typing_extensions import Annotated
 
+from common.pagination import KeysetPagination
 from qt_search.models import (
     CommonName,
     DistributionSpecie,
@@ -215,11 +217,23 @@ class SpeciesSchema(ModelSchema):
 
     @staticmethod
     def resolve_main_common_name(obj: Specie) -> LimitStr | None:
+        # Cached listing rows carry the name itself
+        if isinstance(obj.main_common_name, str):
+            return obj.main_common_name
         if main_common_name := next(iter(obj.main_common_name or []), None):
             return main_common_name.name
         return None
 
 
+# What the listing endpoint returns, it is rendered without the schema and declared for the docs
+class SpeciesPageSchema(KeysetPagination.Output):
+    items: list[SpeciesSchema]
+
+
+class SpeciesBatchRequestSchema(Schema):
+    slugs: list[LimitStr] = Field(..., min_length=1, max_length=settings.SEARCH_DETAILS_BATCH_SIZE)
+
+
 class SpeciesDetailsSchema(ModelSchema):
     main_common_name: LimitStr | None
     tags: list[LimitStr]
@@ -336,3 +350,6 @@ class SpeciesDetailsSchema(ModelSchema):
         if main_common_name := next(iter(obj.main_common_name or []), None):
             return main_common_name.name
         return None
+
+
+DETAIL_FIELDS = tuple(SpeciesDetailsSchema.model_fields)
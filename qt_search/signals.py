@@ -1,7 +1,53 @@
-from django.db.models.signals import post_delete
+import typing as t
+
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 
-from qt_search.models import RegularEvent, Specie
+from qt_search.logic.details import invalidate_specie_details
+from qt_search.logic.facet_index import mark_specie_changed
+from qt_search.logic.listing import bump_catalogue_version
+from qt_search.logic.search import refresh_search_documents
+from qt_search.logic.summary import refresh_specie_summaries
+from qt_search.models import (
+    Color,
+    CommonName,
+    Distribution,
+    DistributionSpecie,
+    GrowthTip,
+    Image,
+    IntervalValue,
+    Order,
+    PartColor,
+    Pathogen,
+    RegularEvent,
+    ScientificClassification,
+    Source,
+    Specie,
+    Synonym,
+    Tag,
+)
+
+# Lookups from Specie to the rows its details document is rendered from
+SPECIE_PATHS = {
+    Specie: ('id',),
+    PartColor: ('parts_color',),
+    Tag: ('tags',),
+    Pathogen: ('pathogens',),
+    GrowthTip: ('growth_tips',),
+    Distribution: ('distributions_specie__distribution',),
+    Color: ('parts_color__colors_part',),
+    IntervalValue: ('height_cm', 'years_to_max_height', 'spread_cm', 'regular_events__frequency'),
+    ScientificClassification: ('scientific_classification',),
+    Order: ('scientific_classification__orders',),
+}
+
+
+def get_linked_slugs(model: type, pks: t.Iterable[int]) -> set[str]:
+    q = Q()
+    for path in SPECIE_PATHS[model]:
+        q |= Q(**{f'{path}__in': pks})
+    return set(Specie.objects.filter(q).values_list('slug', flat=True))
 
 
 @receiver(post_delete, sender=Specie)
@@ -21,3 +67,112 @@ def auto_delete_one_to_one_for_specie(sender, instance, **kwargs):
 def auto_delete_one_to_one_for_regular_event(sender, instance, **kwargs):
     if frequency := instance.frequency:
         frequency.delete()
+
+
+@receiver(post_save, sender=Specie)
+def refresh_search_document_for_specie(sender, instance, **kwargs):
+    refresh_search_documents([instance.id])
+
+
+@receiver(post_save, sender=CommonName)
+@receiver(post_save, sender=Synonym)
+def refresh_search_document_on_name_save(sender, instance, **kwargs):
+    refresh_search_documents([instance.specie_id])
+
+
+@receiver(post_delete, sender=CommonName)
+@receiver(post_delete, sender=Synonym)
+def refresh_search_document_on_name_delete(sender, instance, **kwargs):
+    refresh_search_documents([instance.specie_id], create=False)
+
+
+@receiver(post_save, sender=Specie)
+def refresh_summary_for_specie(sender, instance, **kwargs):
+    refresh_specie_summaries([instance.id])
+
+
+@receiver(post_save, sender=CommonName)
+def refresh_summary_on_name_save(sender, instance, **kwargs):
+    refresh_specie_summaries([instance.specie_id])
+
+
+@receiver(post_delete, sender=CommonName)
+def refresh_summary_on_name_delete(sender, instance, **kwargs):
+    refresh_specie_summaries([instance.specie_id], create=False)
+
+
+@receiver(post_save, sender=Specie)
+@receiver(post_delete, sender=Specie)
+def update_facet_index_for_specie(sender, instance, **kwargs):
+    mark_specie_changed(instance.id)
+
+
+@receiver(pre_save, sender=Specie)
+def invalidate_previous_specie_details(sender, instance, **kwargs):
+    # Documents are stored by slug, a renamed species must not leave its old document reachable
+    if instance.pk:
+        invalidate_specie_details(specie_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Specie)
+@receiver(post_delete, sender=Specie)
+def invalidate_details_for_specie(sender, instance, **kwargs):
+    invalidate_specie_details(slugs=[instance.slug])
+    bump_catalogue_version()
+
+
+@receiver(post_save, sender=CommonName)
+@receiver(post_delete, sender=CommonName)
+@receiver(post_save, sender=Synonym)
+@receiver(post_delete, sender=Synonym)
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+@receiver(post_save, sender=Source)
+@receiver(post_delete, sender=Source)
+@receiver(post_save, sender=RegularEvent)
+@receiver(post_delete, sender=RegularEvent)
+@receiver(post_save, sender=DistributionSpecie)
+@receiver(post_delete, sender=DistributionSpecie)
+@receiver(post_save, sender=PartColor)
+@receiver(post_delete, sender=PartColor)
+def invalidate_details_for_specie_child(sender, instance, **kwargs):
+    invalidate_specie_details(specie_ids=[instance.specie_id])
+    bump_catalogue_version()
+
+
+# Shared rows: deletes are handled before the links to the species are gone
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+@receiver(post_save, sender=Pathogen)
+@receiver(pre_delete, sender=Pathogen)
+@receiver(post_save, sender=GrowthTip)
+@receiver(pre_delete, sender=GrowthTip)
+@receiver(post_save, sender=Distribution)
+@receiver(pre_delete, sender=Distribution)
+@receiver(post_save, sender=Color)
+@receiver(pre_delete, sender=Color)
+@receiver(post_save, sender=IntervalValue)
+@receiver(pre_delete, sender=IntervalValue)
+@receiver(post_save, sender=ScientificClassification)
+@receiver(pre_delete, sender=ScientificClassification)
+@receiver(post_save, sender=Order)
+@receiver(pre_delete, sender=Order)
+def invalidate_details_for_shared_row(sender, instance, **kwargs):
+    invalidate_specie_details(slugs=get_linked_slugs(sender, [instance.pk]))
+    bump_catalogue_version()
+
+
+@receiver(m2m_changed, sender=Tag.specie.through)
+@receiver(m2m_changed, sender=Pathogen.specie.through)
+@receiver(m2m_changed, sender=GrowthTip.specie.through)
+@receiver(m2m_changed, sender=Distribution.specie.through)
+@receiver(m2m_changed, sender=Color.color.through)
+def invalidate_details_on_m2m_change(sender, instance, action, model, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if isinstance(instance, (Specie, PartColor)) or action == 'pre_clear':
+        slugs = get_linked_slugs(type(instance), [instance.pk])
+    else:
+        slugs = get_linked_slugs(model, pk_set)
+    invalidate_specie_details(slugs=slugs)
+    bump_catalogue_version()
@@ -1,14 +1,33 @@
+import io
 import json
-
-from django.db import transaction
-from django.test import TestCase
-
-from common.models import SpeciesModel
+import os
+import tempfile
+import zipfile
+from unittest.mock import patch
+
+import orjson
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from ninja.responses import NinjaJSONEncoder
+
+from common.models import IntervalValueModel, SpeciesModel
+from common.pagination import encode_cursor
 from common.utils.mock_species import create_db_specie
-from qt_search.schemas.filter import FiltersSchema
+from common.utils.species_copy import SpeciesCopyLoader
+from common.utils.species_import import SpeciesImporter, SpeciesImportError
+from common.utils.species_pipeline import ImportCheckpoint, SpeciesImportPipeline, iter_zip_members
+from qt_search.logic.details import details_cache, render_specie_details, specie_details_queryset
+from qt_search.logic.facet_index import FACET_FIELDS, get_facet_index, rebuild_facet_index
+from qt_search.logic.listing import bump_catalogue_version
+from qt_search.models import CommonName, Specie, SpecieSearchDocument, SpecieSummary, Synonym, Tag
+from qt_search.schemas.filter import BIT_FIELD_VALUES, FiltersSchema
+from qt_search.schemas.serializers import serialize_specie, serialize_specie_details
+from qt_search.schemas.specie import SpeciesDetailsSchema, SpeciesSchema
 
 FILTER_VALUES = {
-    'search': ('Rosa gallica', {'count': 20520}),  # баг их должно быть 1
+    'search': ('Rosa gallica', {'count': 1}),
     'tag': ('Roses', {'count': 1}),
     'soil_type': ('loam', {'count': 8}),
     'soil_moisture': ('well_drained', {'count': 5}),
@@ -44,13 +63,16 @@ FILTER_VALUES = {
 ALL_FILTER_FIELDS = FiltersSchema.model_fields
 
 
-def mock_data():
+def load_local_species() -> list[SpeciesModel]:
     with open('qt_search/management/commands/data/species_local.json', 'r') as f:
-        local_species_data = json.load(f)
-    for local_species in local_species_data:
-        sp = SpeciesModel(**local_species)
+        return [SpeciesModel(**local_species) for local_species in json.load(f)]
+
+
+def mock_data():
+    for sp in load_local_species():
         with transaction.atomic():
             create_db_specie(sp)
+    rebuild_facet_index()
 
 
 class ZalupaTestCase(TestCase):
@@ -58,7 +80,7 @@ class ZalupaTestCase(TestCase):
         mock_data()
 
     def test_ok(self):
-        resp = self.client.get('/api/species/')
+        resp = self.client.get('/api/search/species')
         self.assertEqual(resp.status_code, 200)
 
         data = resp.json()
@@ -68,52 +90,52 @@ class ZalupaTestCase(TestCase):
         for field in ALL_FILTER_FIELDS:
             self.assertIn(field, FILTER_VALUES)
             filter_data, resp_data = FILTER_VALUES[field]
-            resp = self.client.get('/api/species/', {field: filter_data})
+            resp = self.client.get('/api/search/species', {field: filter_data})
             data = resp.json()
             self.assertEqual(data['count'], resp_data['count'])
 
     def test_wrong_filter(self):
-        resp = self.client.get('/api/species/', {'soil_type': 'test'})
-        self.assertEqual(resp.status_code, 422)
+        resp = self.client.get('/api/search/species', {'soil_type': 'test'})
+        self.assertEqual(resp.status_code, 400)
 
         for field in ALL_FILTER_FIELDS:
-            resp_empty = self.client.get('/api/species/', {'soil_type': field})
-            self.assertEqual(resp_empty.status_code, 422)
+            resp_empty = self.client.get('/api/search/species', {'soil_type': field})
+            self.assertEqual(resp_empty.status_code, 400)
 
     def test_negative_filter(self):
-        resp = self.client.get('/api/species/', {'height_cm_from_lte': 0})
-        self.assertEqual(resp.status_code, 422)
+        resp = self.client.get('/api/search/species', {'height_cm_from_lte': 0})
+        self.assertEqual(resp.status_code, 400)
 
-        resp = self.client.get('/api/species/', {'spread_cm_from_lte': -1})
-        self.assertEqual(resp.status_code, 422)
+        resp = self.client.get('/api/search/species', {'spread_cm_from_lte': -1})
+        self.assertEqual(resp.status_code, 400)
 
     def test_detail_ok(self):
-        resp = self.client.get('/api/species/')
+        resp = self.client.get('/api/search/species')
         data = resp.json()
         items = data['items']
         slug = items[0].get('slug')
         self.assertIsNotNone(slug)
 
-        resp_detail = self.client.get(f'/api/species/{slug}/')
+        resp_detail = self.client.get(f'/api/search/species/{slug}')
         self.assertEqual(resp_detail.status_code, 200)
 
     def test_not_detail(self):
-        resp_detail = self.client.get('/api/species/test/')
+        resp_detail = self.client.get('/api/search/species/test')
         self.assertEqual(resp_detail.status_code, 404)
 
     def test_specific_detail(self):
-        resp_detail = self.client.get('/api/species/acer-negundo/')
+        resp_detail = self.client.get('/api/search/species/acer-negundo')
         self.assertEqual(resp_detail.status_code, 200)
 
     def test_order(self):
-        resp = self.client.get('/api/species/')
+        resp = self.client.get('/api/search/species')
         data = resp.json()
         items = data['items']
         slug_first = items[0].get('slug')
         slug_last = items[-1].get('slug')
 
-        resp_first = self.client.get(f'/api/species/{slug_first}/')
-        resp_last = self.client.get(f'/api/species/{slug_last}/')
+        resp_first = self.client.get(f'/api/search/species/{slug_first}')
+        resp_last = self.client.get(f'/api/search/species/{slug_last}')
         data_first = resp_first.json()
         data_last = resp_last.json()
 
@@ -121,7 +143,7 @@ class ZalupaTestCase(TestCase):
 
     # Не самый лучший тест, проверять конкретные значения конкретного растения, но это хоть как-то проверяет валидацию.
     def test_detail(self):
-        resp_detail = self.client.get('/api/species/acer-negundo/')
+        resp_detail = self.client.get('/api/search/species/acer-negundo')
         data_detail = resp_detail.json()
 
         self.assertEqual(data_detail['main_common_name'], 'Box elder')
@@ -256,3 +278,563 @@ class ZalupaTestCase(TestCase):
 
         self.assertEqual(data_detail['slug'], 'acer-negundo')
         self.assertEqual(data_detail['rating'], 190)
+
+
+class SpeciesSearchTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        mock_data()
+
+    def setUp(self):
+        self.url = '/api/search/species'
+
+    def search(self, value: str) -> list[str]:
+        resp = self.client.get(self.url, {'search': value})
+        self.assertEqual(resp.status_code, 200)
+        return [item['slug'] for item in resp.json()['items']]
+
+    def test_latin_name(self):
+        self.assertListEqual(self.search('Rosa gallica'), ['rosa-gallica'])
+
+    def test_prefix(self):
+        self.assertEqual(self.search('acer neg')[0], 'acer-negundo')
+        self.assertSetEqual(set(self.search('ace')[:3]), {'acer-negundo', 'acer-palmatum', 'acer-platanoides'})
+
+    def test_common_name(self):
+        self.assertEqual(self.search('box elder')[0], 'acer-negundo')
+
+    def test_typo(self):
+        self.assertIn('acer-negundo', self.search('negundp'))
+
+    def test_document_sync(self):
+        specie = Specie.objects.get(slug='vigna-radiata')
+        self.assertListEqual(self.search('zzgreengram'), [])
+
+        synonym = Synonym.objects.create(specie=specie, name='Zzgreengram')
+        self.assertListEqual(self.search('zzgreengram'), ['vigna-radiata'])
+
+        synonym.delete()
+        self.assertListEqual(self.search('zzgreengram'), [])
+
+
+class SpeciesPaginationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        mock_data()
+
+    def setUp(self):
+        self.url = '/api/search/species'
+
+    def test_cursor_walk(self):
+        resp = self.client.get(self.url, {'page_size': 100})
+        expected_slugs = [item['slug'] for item in resp.json()['items']]
+
+        slugs, cursor = [], ''
+        while cursor is not None:
+            resp = self.client.get(self.url, {'cursor': cursor, 'page_size': 3})
+            self.assertEqual(resp.status_code, 200)
+
+            data = resp.json()
+            self.assertIsNone(data['count'])
+            self.assertLessEqual(len(data['items']), 3)
+            slugs.extend(item['slug'] for item in data['items'])
+            cursor = data['next_cursor']
+
+        self.assertListEqual(slugs, expected_slugs)
+        self.assertEqual(len(slugs), 10)
+
+    def test_cursor_with_search(self):
+        resp = self.client.get(self.url, {'search': 'acer', 'cursor': '', 'page_size': 1})
+        data = resp.json()
+        first_slug = data['items'][0]['slug']
+
+        resp = self.client.get(self.url, {'search': 'acer', 'cursor': data['next_cursor'], 'page_size': 1})
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp.json()['items'][0]['slug'], first_slug)
+
+    def test_page_number_compatibility(self):
+        resp = self.client.get(self.url, {'page': 2, 'page_size': 4})
+        data = resp.json()
+        self.assertEqual(data['count'], 10)
+        self.assertEqual(len(data['items']), 4)
+        self.assertIsNotNone(data['next_cursor'])
+
+        resp = self.client.get(self.url, {'page': 3, 'page_size': 4})
+        data = resp.json()
+        self.assertEqual(len(data['items']), 2)
+        self.assertIsNone(data['next_cursor'])
+
+    def test_total(self):
+        resp = self.client.get(self.url, {'cursor': '', 'total': 'exact'})
+        self.assertEqual(resp.json()['count'], 10)
+
+        # Filtered in the database, the count is the planner's estimate
+        with patch('qt_search.logic.listing.estimate_count', return_value=1234) as m_estimate_count:
+            resp = self.client.get(self.url, {'cursor': '', 'total': 'approx', 'tag': 'Roses'})
+            self.assertEqual(resp.json()['count'], 1234)
+            m_estimate_count.assert_called_once()
+
+            # The facet index counts exactly at no extra cost
+            resp = self.client.get(self.url, {'cursor': '', 'total': 'approx', 'soil_ph': 'acid'})
+            self.assertEqual(resp.json()['count'], FILTER_VALUES['soil_ph'][1]['count'])
+            m_estimate_count.assert_called_once()
+
+    def test_page_size_limit(self):
+        resp = self.client.get(self.url, {'page_size': 1000})
+        self.assertEqual(resp.status_code, 200)
+
+        resp = self.client.get(self.url, {'page_size': 0})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_invalid_cursor(self):
+        resp = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.json()['errors'], [{'cursor': 'Invalid cursor'}])
+
+        resp = self.client.get(self.url, {'cursor': encode_cursor(['abc', 1])})
+        self.assertEqual(resp.status_code, 400)
+
+
+class SpeciesFacetIndexTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        mock_data()
+
+    def setUp(self):
+        self.url = '/api/search/species'
+
+    def db_slugs(self, params: dict) -> list[str]:
+        filters = FiltersSchema(**params)
+        species = filters.filter(Specie.objects.order_by('rating', 'id').distinct())
+        return list(species.values_list('slug', flat=True))
+
+    def index_slugs(self, params: dict) -> list[str]:
+        resp = self.client.get(self.url, {**params, 'page_size': 100})
+        self.assertEqual(resp.status_code, 200)
+        return [item['slug'] for item in resp.json()['items']]
+
+    def test_matches_db_filters(self):
+        for field in FACET_FIELDS:
+            value, _ = FILTER_VALUES[field]
+            self.assertListEqual(self.index_slugs({field: value}), self.db_slugs({field: [value]}), field)
+
+    def test_multiple_values(self):
+        cases = (
+            {'soil_type': ['loam', 'clay']},
+            {'exposure': ['exposed', 'exposed_or_sheltered']},
+            {'soil_ph': ['acid'], 'position_sunlight': ['partial_shade'], 'duration': ['perennial']},
+        )
+        for params in cases:
+            self.assertListEqual(self.index_slugs(params), self.db_slugs(params), params)
+
+    def test_cursor_walk(self):
+        expected_slugs = self.db_slugs({'soil_ph': ['acid']})
+
+        slugs, cursor = [], ''
+        while cursor is not None:
+            resp = self.client.get(self.url, {'soil_ph': 'acid', 'cursor': cursor, 'page_size': 3})
+            data = resp.json()
+            slugs.extend(item['slug'] for item in data['items'])
+            cursor = data['next_cursor']
+
+        self.assertListEqual(slugs, expected_slugs)
+
+    def test_non_facet_filter_uses_db(self):
+        self.assertIsNone(FiltersSchema(soil_ph=['acid'], tag='Roses').get_facet_selection())
+        self.assertEqual(FiltersSchema(soil_ph=['acid']).get_facet_selection(), {'soil_ph': ['acid']})
+
+    def test_incremental_update(self):
+        specie = Specie.objects.exclude(soil_ph=Specie.soil_ph.alkaline).order_by('-rating').first()
+        self.assertNotIn(specie.slug, self.index_slugs({'soil_ph': 'alkaline'}))
+        old_index = get_facet_index()
+        old_ids, old_bitmaps = list(old_index.ids), dict(old_index.bitmaps)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            specie.soil_ph = Specie.soil_ph.alkaline
+            specie.rating = 0
+            specie.save()
+
+        slugs = self.index_slugs({'soil_ph': 'alkaline'})
+        self.assertEqual(slugs[0], specie.slug)
+        self.assertListEqual(slugs, self.db_slugs({'soil_ph': ['alkaline']}))
+        self.assertEqual(len(get_facet_index()), Specie.objects.count())
+
+        # Results already handed out keep reading the index they were matched against
+        self.assertIsNot(get_facet_index(), old_index)
+        self.assertListEqual(list(old_index.ids), old_ids)
+        self.assertDictEqual(old_index.bitmaps, old_bitmaps)
+
+
+class SpeciesFacetCountsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        mock_data()
+
+    def setUp(self):
+        self.url = '/api/search/species/facets'
+
+    def db_count(self, params: dict) -> int:
+        return FiltersSchema(**params).filter(Specie.objects.distinct()).count()
+
+    def assertCountsMatchDb(self, params: dict):
+        resp = self.client.get(self.url, params)
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data['count'], self.db_count(params))
+
+        for field, choices in data['facets'].items():
+            for choice, count in choices.items():
+                expected_params = {**params, field: [*params.get(field, []), choice]}
+                self.assertEqual(count, self.db_count(expected_params), (field, choice))
+
+    def test_without_filters(self):
+        self.assertCountsMatchDb({})
+
+    def test_with_facets(self):
+        self.assertCountsMatchDb({'soil_ph': ['acid'], 'exposure': ['exposed_or_sheltered']})
+
+    def test_with_non_facet_filter(self):
+        self.assertCountsMatchDb({'tag': 'Roses', 'soil_type': ['loam']})
+
+    def test_tag_change(self):
+        params = {'tag': 'Tag test'}
+        self.assertCountsMatchDb(params)
+
+        specie = Specie.objects.order_by('id').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            specie.tags.add(Tag.objects.create(name='Tag test'))
+
+        self.assertEqual(self.client.get(self.url, params).json()['count'], 1)
+        self.assertCountsMatchDb(params)
+
+    def test_cache_key_is_normalised(self):
+        first = FiltersSchema(soil_type=['loam', 'clay'], soil_ph=['acid'])
+        second = FiltersSchema(soil_ph=['acid'], soil_type=['clay', 'loam'], tag='')
+        self.assertEqual(first.get_cache_key(), second.get_cache_key())
+        self.assertNotEqual(first.get_cache_key(), FiltersSchema(soil_type=['loam']).get_cache_key())
+
+
+class SpeciesDetailsCacheTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        mock_data()
+
+    def setUp(self):
+        details_cache.delete_many(Specie.objects.values_list('slug', flat=True))
+        self.specie = Specie.objects.order_by('rating', 'id').first()
+        self.url = f'/api/search/species/{self.specie.slug}'
+
+    def get_details(self) -> dict:
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()
+
+    def test_matches_schema(self):
+        data = self.get_details()
+        specie = specie_details_queryset().get(id=self.specie.id)
+        expected = json.dumps(SpeciesDetailsSchema.from_orm(specie).model_dump(), cls=NinjaJSONEncoder)
+        self.assertEqual(data, json.loads(expected))
+        self.assertIsNotNone(details_cache.get(self.specie.slug))
+
+    def test_serializers_match_schema(self):
+        for specie in specie_details_queryset():
+            self.assertEqual(
+                render_specie_details(specie),
+                orjson.dumps(
+                    SpeciesDetailsSchema.from_orm(specie).model_dump(),
+                    default=NinjaJSONEncoder().default,
+                    option=orjson.OPT_PASSTHROUGH_DATETIME,
+                ),
+            )
+            self.assertEqual(serialize_specie(specie), SpeciesSchema.from_orm(specie).model_dump())
+            self.assertListEqual(list(serialize_specie_details(specie)), list(SpeciesDetailsSchema.model_fields))
+
+    def test_child_change(self):
+        self.get_details()
+        Synonym.objects.create(specie=self.specie, name='Details cache synonym')
+        self.assertIn('Details cache synonym', self.get_details()['synonyms'])
+
+    def test_shared_row_change(self):
+        tag = Tag.objects.create(name='details-cache-tag')
+        self.get_details()
+        tag.specie.add(self.specie)
+        self.assertIn('details-cache-tag', self.get_details()['tags'])
+
+        tag.name = 'details-cache-renamed'
+        tag.save()
+        self.assertIn('details-cache-renamed', self.get_details()['tags'])
+
+        tag.delete()
+        self.assertNotIn('details-cache-renamed', self.get_details()['tags'])
+
+    def test_rename_and_delete(self):
+        self.get_details()
+        self.specie.latin_name = 'Details cache renamed'
+        self.specie.save()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+        self.url = '/api/search/species/details-cache-renamed'
+        self.assertEqual(self.get_details()['latin_name'], 'Details cache renamed')
+
+        self.specie.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_fields(self):
+        with self.assertNumQueries(3):
+            resp = self.client.get(self.url, {'fields': 'images, tags,height_cm'})
+        self.assertEqual(resp.status_code, 200)
+        projection = resp.json()
+        self.assertIsNone(details_cache.get(self.specie.slug))
+
+        data = self.get_details()
+        self.assertListEqual(list(projection), ['tags', 'images', 'height_cm', 'slug'])
+        self.assertEqual(projection, {name: data[name] for name in projection})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, {'fields': 'images,tags,height_cm'}).json(), projection)
+
+        resp = self.client.get(self.url, {'fields': 'images,secret'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_batch(self):
+        slugs = list(Specie.objects.order_by('-rating').values_list('slug', flat=True)[:3])
+        self.client.get(f'/api/search/species/{slugs[0]}')
+        resp = self.client.post(
+            '/api/search/species/batch',
+            {'slugs': [slugs[2], 'no-such-specie', *slugs]},
+            content_type='application/json',
+        )
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertListEqual(list(data), [slugs[2], slugs[0], slugs[1]])
+        for slug in slugs:
+            self.assertEqual(data[slug], self.client.get(f'/api/search/species/{slug}').json())
+
+        with self.assertNumQueries(0):
+            self.client.post('/api/search/species/batch', {'slugs': slugs}, content_type='application/json')
+
+    def test_batch_limit(self):
+        for slugs in ([], ['slug'] * (settings.SEARCH_DETAILS_BATCH_SIZE + 1)):
+            resp = self.client.post('/api/search/species/batch', {'slugs': slugs}, content_type='application/json')
+            self.assertEqual(resp.status_code, 400)
+
+    def test_warm_command(self):
+        slugs = list(Specie.objects.order_by('rating', 'id').values_list('slug', flat=True))
+        call_command('warm_species_cache', limit=3, stdout=io.StringIO())
+
+        details_cache.delete_local(None)
+        warmed = [slug for slug in slugs if details_cache.get(slug) is not None]
+        self.assertListEqual(warmed, slugs[:3])
+
+
+class SpeciesListingCacheTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        mock_data()
+
+    def setUp(self):
+        bump_catalogue_version()
+        self.url = '/api/search/species'
+
+    def get_items(self, params: dict) -> list[dict]:
+        resp = self.client.get(self.url, params)
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()['items']
+
+    def test_cached_pages(self):
+        for params in ({'page_size': 4}, {'search': 'acer', 'page_size': 4}, {'cursor': '', 'page_size': 4}):
+            items = self.get_items(params)
+            self.assertTrue(items)
+            with self.assertNumQueries(0):
+                self.assertListEqual(self.get_items(params), items)
+
+    def test_summaries(self):
+        items = self.get_items({'page_size': 100})
+        species = specie_details_queryset().order_by('rating', 'id')
+        self.assertListEqual(items, [SpeciesSchema.from_orm(specie).model_dump() for specie in species])
+
+    def test_write_invalidates(self):
+        specie = Specie.objects.order_by('rating', 'id').first()
+        self.get_items({'page_size': 4})
+
+        CommonName.objects.filter(specie=specie, is_main=True, lang='en').delete()
+        CommonName.objects.create(specie=specie, name='Listing cache name', lang='en', is_main=True)
+        self.assertEqual(self.get_items({'page_size': 4})[0]['main_common_name'], 'Listing cache name')
+
+        specie.rating = Specie.objects.order_by('-rating').first().rating + 1
+        with self.captureOnCommitCallbacks(execute=True):
+            specie.save()
+        self.assertNotEqual(self.get_items({'page_size': 4})[0]['slug'], specie.slug)
+
+    def test_summary_table(self):
+        specie = Specie.objects.order_by('rating', 'id').first()
+        specie.latin_name = 'Summary renamed'
+        specie.save()
+        CommonName.objects.filter(specie=specie, is_main=True, lang='en').delete()
+
+        summary = SpecieSummary.objects.get(specie=specie, lang=SpecieSummary.DEFAULT_LANGUAGE)
+        self.assertEqual((summary.slug, summary.main_common_name), ('summary-renamed', None))
+        self.assertEqual(summary.soil_type, int(specie.soil_type))
+
+        specie.delete()
+        self.assertFalse(SpecieSummary.objects.filter(specie_id=specie.id).exists())
+
+    def test_single_query(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(self.get_items({'tag': 'a', 'cursor': '', 'page_size': 4}))
+
+
+class SpeciesImportTestCase(TestCase):
+    @staticmethod
+    def snapshot() -> dict[str, dict]:
+        result = {}
+        for specie in Specie.objects.select_related(
+                'height_cm', 'years_to_max_height', 'spread_cm', 'scientific_classification'):
+            sclass = specie.scientific_classification
+            result[specie.latin_name] = {
+                'slug': specie.slug,
+                'rating': specie.rating,
+                'flags': [int(getattr(specie, field) or 0) for field in FACET_FIELDS if field in BIT_FIELD_VALUES],
+                'exposure': specie.exposure,
+                'duration': specie.duration,
+                'sizes': [
+                    interval and (interval.from_value, interval.to_value)
+                    for interval in (specie.height_cm, specie.years_to_max_height, specie.spread_cm)
+                ],
+                'classification': sclass and (sclass.family, sclass.genus, sorted(o.name for o in sclass.orders.all())),
+                'common_names': sorted(specie.common_names.values_list('name', 'lang', 'is_main')),
+                'synonyms': sorted(specie.synonyms.values_list('name', flat=True)),
+                'tags': sorted(specie.tags.values_list('name', flat=True)),
+                'pathogens': sorted(specie.pathogens.values_list('name', flat=True)),
+                'growth_tips': sorted(specie.growth_tips.values_list('name', 'tip_type')),
+                'images': sorted(specie.images.values_list('image_url', 'part')),
+                'sources': sorted(specie.sources.values_list('sid', 'name')),
+                'events': sorted(specie.regular_events.values_list(
+                    'name', 'frequency_count', 'frequency_unit', 'frequency__from_value', 'frequency__to_value')),
+                'distributions': sorted(
+                    (name, int(statuses or 0))
+                    for name, statuses in specie.distributions_specie.values_list('distribution__name', 'statuses')
+                ),
+                'colors': sorted(specie.parts_color.values_list('plant_part', 'season', 'colors_part__name')),
+                'search_document': SpecieSearchDocument.objects.filter(specie=specie).exists(),
+                'content_hash': specie.content_hash,
+            }
+        return result
+
+    @staticmethod
+    def index_names() -> set[str]:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename LIKE 'qt_search_%'")
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_copy_loader(self):
+        mock_data()
+        expected = self.snapshot()
+        indexes = self.index_names()
+        Specie.objects.all().delete()
+
+        species = load_local_species()
+        stats = SpeciesCopyLoader(batch_size=4).load(species + species[:1])
+
+        self.assertEqual((stats.species, stats.skipped), (len(species), 1))
+        self.assertDictEqual(self.snapshot(), expected)
+        self.assertSetEqual(self.index_names(), indexes)
+
+        specie = Specie.objects.create(latin_name='Copy loader sequence', slug='copy-loader-sequence')
+        self.assertGreater(specie.id, max(Specie.objects.exclude(id=specie.id).values_list('id', flat=True)))
+
+        with self.assertRaises(SpeciesImportError):
+            SpeciesCopyLoader().load(species)
+
+    def test_same_result_as_create_db_specie(self):
+        mock_data()
+        expected = self.snapshot()
+        Specie.objects.all().delete()
+
+        species = load_local_species()
+        stats = SpeciesImporter(batch_size=3).import_species(species + species[:2])
+
+        self.assertEqual(stats.species, len(species))
+        self.assertEqual(stats.skipped, 2)
+        self.assertDictEqual(self.snapshot(), expected)
+        self.assertEqual(len(get_facet_index()), len(species))
+
+    def test_update_changed_species(self):
+        species = load_local_species()
+        changed = [sp.model_copy(deep=True) for sp in species]
+        first, second = changed[:2]
+        first.rank += 1
+        first.synonyms = [*first.synonyms[1:], 'Update test synonym']
+        first.tags = ['update-test-tag']
+        first.size.height_cm = None
+        first.scientific_classification = None
+        first.soil.water = None
+        second.common_names = {'en': ['Update test name']}
+        second.size.height_cm = IntervalValueModel(from_value=10, to_value=20)
+        second.images.flower = []
+        second.colour_and_scent.spring.flower = ['update-test-colour']
+
+        SpeciesImporter(batch_size=3).import_species(changed)
+        expected = self.snapshot()
+        Specie.objects.all().delete()
+
+        SpeciesImporter(batch_size=3).import_species(species)
+        ids = dict(Specie.objects.values_list('latin_name', 'id'))
+        stats = SpeciesImporter(batch_size=3, update=True).import_species(changed)
+
+        self.assertEqual((stats.species, stats.updated, stats.unchanged), (0, 2, len(species) - 2))
+        self.assertDictEqual(self.snapshot(), expected)
+        self.assertDictEqual(dict(Specie.objects.values_list('latin_name', 'id')), ids)
+        self.assertTrue(Specie.objects.filter(search_document__document__contains='Update test synonym').exists())
+
+        stats = SpeciesImporter(batch_size=3, update=True).import_species(changed)
+        self.assertEqual((stats.updated, stats.unchanged, stats.rows), (0, len(species), 0))
+
+
+class SpeciesImportPipelineTestCase(TransactionTestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        with open('qt_search/management/commands/data/species_local.json', 'r') as f:
+            species_data = json.load(f)
+        for number, part in enumerate((species_data[:6], species_data[6:])):
+            with zipfile.ZipFile(os.path.join(self.folder.name, f'species-{number}.zip'), 'w') as zip_file:
+                for data in part:
+                    zip_file.writestr(f'{data["latin_name"]}.json', json.dumps(data))
+        self.members = list(iter_zip_members(self.folder.name))
+
+    @staticmethod
+    def snapshot() -> tuple:
+        # Which species keeps a name shared with another one depends on the writers' commit order
+        species = SpeciesImportTestCase.snapshot()
+        for data in species.values():
+            del data['common_names'], data['synonyms']
+        names = sorted(CommonName.objects.values_list('name', flat=True))
+        synonyms = sorted(Synonym.objects.values_list('name', flat=True))
+        return species, names, synonyms
+
+    def test_parallel_matches_serial(self):
+        SpeciesImportPipeline(workers=0, batch_size=4).run(self.members)
+        expected = self.snapshot()
+        Specie.objects.all().delete()
+
+        stats = SpeciesImportPipeline(workers=2, writers=2, batch_size=2).run(self.members)
+
+        self.assertEqual(stats.species, 10)
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_resume(self):
+        checkpoint = ImportCheckpoint(os.path.join(self.folder.name, 'checkpoint.json'))
+        SpeciesImportPipeline(workers=2, batch_size=4, checkpoint=checkpoint).run(self.members[:6])
+        self.assertEqual(checkpoint.load(), self.members[5])
+
+        members = ImportCheckpoint.skip_done(self.members, checkpoint.load())
+        stats = SpeciesImportPipeline(workers=0, batch_size=4, checkpoint=checkpoint).run(members)
+
+        self.assertEqual(stats.species, 4)
+        self.assertEqual(stats.skipped, 0)
+        self.assertEqual(Specie.objects.count(), 10)
+        self.assertEqual(checkpoint.load(), self.members[-1])
+
+    def test_resume_from_missing_member(self):
+        with self.assertRaises(SpeciesImportError):
+            ImportCheckpoint.skip_done(self.members, (self.members[0][0], 'Removed.json'))
@@ -6,7 +6,7 @@ from ninja import Router, Schema
 from common.exceptions import BaseQtError
 from common.http_response import QtORJSONResponse
 from common.schemas import ErrorResponse
-from qt_auth.logic.jwt_auth_bear import AuthBearer
+from qt_auth.logic.jwt_auth_bear import AsyncAuthBearer
 from qt_space.logic.rooms_service import RoomsServie
 from qt_space.schemas.space import ListSpaceResponseSchema, RoomRequestSchema, RoomResponseSchema
 
@@ -15,16 +15,16 @@ router = Router()
 
 @router.post(
     path='/room',
-    auth=AuthBearer(),
+    auth=AsyncAuthBearer(),
     response={
         201: RoomResponseSchema,
         (400, 409): ErrorResponse,
     },
 )
-def create_room(request: HttpRequest, data: RoomRequestSchema) -> QtORJSONResponse:
+async def create_room(request: HttpRequest, data: RoomRequestSchema) -> QtORJSONResponse:
     service = RoomsServie(request.auth)
     try:
-        room = service.create(data)
+        room = await service.acreate(data)
     except BaseQtError as e:
         return e.to_response()
 
@@ -36,14 +36,14 @@ def create_room(request: HttpRequest, data: RoomRequestSchema) -> QtORJSONRespon
 
 @router.get(
     path='/rooms',
-    auth=AuthBearer(),
+    auth=AsyncAuthBearer(),
     response={
         200: ListSpaceResponseSchema
     },
 )
-def get_rooms_list(request: HttpRequest) -> QtORJSONResponse:
+async def get_rooms_list(request: HttpRequest) -> QtORJSONResponse:
     service = RoomsServie(request.auth)
-    rooms = service.get_list()
+    rooms = await service.aget_list()
     return QtORJSONResponse(
         data=[RoomResponseSchema.from_orm(room).model_dump() for room in rooms],
         status=200,
@@ -52,16 +52,16 @@ def get_rooms_list(request: HttpRequest) -> QtORJSONResponse:
 
 @router.get(
     path='/room/{uid}',
-    auth=AuthBearer(),
+    auth=AsyncAuthBearer(),
     response={
         200: RoomResponseSchema,
         404: ErrorResponse,
     },
 )
-def get_room_by_uuid(request: HttpRequest, uid: uuid.UUID) -> QtORJSONResponse:
+async def get_room_by_uuid(request: HttpRequest, uid: uuid.UUID) -> QtORJSONResponse:
     service = RoomsServie(request.auth)
     try:
-        room = service.get(uid)
+        room = await service.aget(uid)
     except BaseQtError as e:
         return e.to_response()
 
@@ -73,16 +73,16 @@ def get_room_by_uuid(request: HttpRequest, uid: uuid.UUID) -> QtORJSONResponse:
 
 @router.put(
     path='/room/{uid}',
-    auth=AuthBearer(),
+    auth=AsyncAuthBearer(),
     response={
         200: RoomResponseSchema,
         404: ErrorResponse,
     },
 )
-def update_room_by_uuid(request, uid: uuid.UUID, data: RoomRequestSchema) -> QtORJSONResponse:
+async def update_room_by_uuid(request, uid: uuid.UUID, data: RoomRequestSchema) -> QtORJSONResponse:
     service = RoomsServie(request.auth)
     try:
-        room = service.update(uid, data)
+        room = await service.aupdate(uid, data)
     except BaseQtError as e:
         return e.to_response()
 
@@ -94,16 +94,16 @@ def update_room_by_uuid(request, uid: uuid.UUID, data: RoomRequestSchema) -> QtO
 
 @router.delete(
     path='/room/{uid}',
-    auth=AuthBearer(),
+    auth=AsyncAuthBearer(),
     response={
         204: Schema,
         404: ErrorResponse,
     },
 )
-def delete_room_by_uuid(request, uid: uuid.UUID) -> HttpResponse:
+async def delete_room_by_uuid(request, uid: uuid.UUID) -> HttpResponse:
     service = RoomsServie(request.auth)
     try:
-        service.delete(uid)
+        await service.adelete(uid)
     except BaseQtError as e:
         return e.to_response()
     return HttpResponse(status=204)
@@ -1,6 +1,5 @@
 from uuid import UUID
 
-from django.db.models import QuerySet
 from django.db.utils import IntegrityError
 
 from qt_space.logic.exceptions import SpaceConflictError, SpaceNotFoundError
@@ -13,14 +12,14 @@ class RoomsServie:
     def __init__(self, user: User):
         self.current_user = user
 
-    def get(self, uid: UUID) -> Space:
+    async def aget(self, uid: UUID) -> Space:
         qs = Space.objects.filter(uuid=uid, user=self.current_user)
         try:
-            return qs.get()
+            return await qs.aget()
         except Space.DoesNotExist as e:
             raise SpaceNotFoundError() from e
 
-    def create(self, data: RoomRequestSchema) -> Space:
+    async def acreate(self, data: RoomRequestSchema) -> Space:
         room = Space(
             name=data.name,
             description=data.description,
@@ -31,24 +30,24 @@ class RoomsServie:
             window_side=data.window_side,
         )
         try:
-            room.save()
+            await room.asave()
         except IntegrityError as e:
             raise SpaceConflictError() from e
         return room
 
-    def get_list(self) -> QuerySet[Space]:
-        return Space.objects.filter(user=self.current_user).all()
+    async def aget_list(self) -> list[Space]:
+        return [room async for room in Space.objects.filter(user=self.current_user)]
 
-    def update(self, uid: UUID, data: RoomRequestSchema) -> Space:
-        room = self.get(uid)
+    async def aupdate(self, uid: UUID, data: RoomRequestSchema) -> Space:
+        room = await self.aget(uid)
         for attr, value in data.dict().items():
             setattr(room, attr, value)
         try:
-            room.save()
+            await room.asave()
         except IntegrityError as e:
             raise SpaceConflictError() from e
         return room
 
-    def delete(self, uid: UUID) -> None:
-        room = self.get(uid)
-        room.delete()
+    async def adelete(self, uid: UUID) -> None:
+        room = await self.aget(uid)
+        await room.adelete()
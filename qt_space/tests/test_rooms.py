@@ -13,7 +13,7 @@ class RoomTestCase(TestCase):
         self.user = UserFactory()
         self.room = RoomFactory(user=self.user)
 
-        patcher = patch('qt_auth.logic.jwt_auth_bear.AuthBearer.authenticate')
+        patcher = patch('qt_auth.logic.jwt_auth_bear.AsyncAuthBearer.authenticate')
         self.mocked_object = patcher.start()
         self.mocked_object.return_value = self.user
         self.addCleanup(patcher.stop)
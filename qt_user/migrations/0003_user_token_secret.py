@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qt_user', '0002_user_token_generation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='token_secret',
+            field=models.CharField(max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:05
+
+from django.db import migrations
+
+import qt_user.models
+
+BATCH_SIZE = 1000
+
+
+# A callable default is evaluated once for all existing rows, so every user gets a secret of its own here
+def populate_token_secret(apps, schema_editor):
+    User = apps.get_model('qt_user', 'User')
+    users = User.objects.filter(token_secret__isnull=True).only('id')
+    while batch := list(users[:BATCH_SIZE]):
+        for user in batch:
+            user.token_secret = qt_user.models.generate_token_secret()
+        User.objects.bulk_update(batch, ['token_secret'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qt_user', '0003_user_token_secret'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_token_secret, migrations.RunPython.noop),
+    ]
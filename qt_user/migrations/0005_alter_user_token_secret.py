@@ -0,0 +1,20 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+import qt_user.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qt_user', '0004_populate_user_token_secret'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='token_secret',
+            field=models.CharField(default=qt_user.models.generate_token_secret, max_length=64),
+        ),
+    ]
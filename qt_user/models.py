@@ -1,7 +1,13 @@
+import secrets
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
 
+def generate_token_secret() -> str:
+    return secrets.token_urlsafe(32)
+
+
 class User(AbstractUser):
     class HemispheresChoices(models.TextChoices):
         NORTH = "north", "North"
@@ -17,3 +23,17 @@ class User(AbstractUser):
 
     location = models.CharField(max_length=50, null=True, blank=True)
     hemisphere = models.CharField(max_length=8, choices=HemispheresChoices.choices, null=True, blank=True)
+
+    # Embedded in every JWT, bumping it revokes all tokens of the user
+    token_generation = models.PositiveIntegerField(default=0)
+    # The user's tokens are signed with a key derived from it
+    token_secret = models.CharField(max_length=64, default=generate_token_secret)
+
+    def save(self, *args, **kwargs):
+        # A new password signs the user out everywhere. set_password() keeps the raw password until the save, hash
+        # upgrades on login clear it before saving and keep the secret
+        if self._password is not None:
+            self.token_secret = generate_token_secret()
+            if (update_fields := kwargs.get('update_fields')) is not None:
+                kwargs['update_fields'] = {*update_fields, 'token_secret'}
+        super().save(*args, **kwargs)